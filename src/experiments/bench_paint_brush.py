@@ -0,0 +1,84 @@
+"""
+Per-dab latency of the paint brush: legacy per-voxel loop vs. stencil engine.
+
+Usage (from the repo root):
+    python src/experiments/bench_paint_brush.py [--size 512 512 400] [--dabs 20]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import vtk
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "vtk_image_labeler_3d"))
+
+import brush_stencil  # noqa: E402
+
+
+def make_image(size):
+    image = vtk.vtkImageData()
+    image.SetDimensions(*size)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)
+    image.GetPointData().GetScalars().Fill(0)
+    return image
+
+
+def legacy_paint(segmentation, x, y, z, radius, axis, value=1):
+    """The PaintBrush.paint_ax/cr/sg/3d loops as they were before the stencil engine."""
+    dims = segmentation.GetDimensions()
+    scalars = segmentation.GetPointData().GetScalars()
+    extent = segmentation.GetExtent()
+
+    r_i = range(-radius, radius + 1) if axis != 0 else [0]
+    r_j = range(-radius, radius + 1) if axis != 1 else [0]
+    r_k = range(-radius, radius + 1) if axis != 2 else [0]
+
+    for i in r_i:
+        for j in r_j:
+            for k in r_k:
+                if ((i / radius) ** 2 + (j / radius) ** 2 + (k / radius) ** 2) <= 1.0:
+                    xi = x + i
+                    yj = y + j
+                    zk = z + k
+                    if extent[0] <= xi <= extent[1] and extent[2] <= yj <= extent[3] and extent[4] <= zk <= extent[5]:
+                        idx = (zk - extent[4]) * (dims[0] * dims[1]) + (yj - extent[2]) * dims[0] + (xi - extent[0])
+                        scalars.SetTuple1(idx, value)
+
+
+def time_per_dab(fn, centers):
+    t0 = time.perf_counter()
+    for c in centers:
+        fn(*c)
+    return (time.perf_counter() - t0) / len(centers) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, nargs=3, default=[512, 512, 400])
+    parser.add_argument("--dabs", type=int, default=20)
+    parser.add_argument("--radii", type=int, nargs="+", default=[5, 10, 20])
+    args = parser.parse_args()
+
+    image = make_image(args.size)
+    rng = np.random.default_rng(0)
+    centers = [tuple(int(rng.integers(0, s)) for s in args.size) for _ in range(args.dabs)]
+
+    modes = [("axial", 2), ("coronal", 1), ("sagittal", 0), ("3d", None)]
+    print(f"volume={tuple(args.size)} dabs={args.dabs}")
+    print(f"{'mode':<9} {'radius':>6} {'legacy ms':>10} {'stencil ms':>11} {'speedup':>8}")
+    for name, axis in modes:
+        for radius in args.radii:
+            legacy_axis = -1 if axis is None else axis
+            legacy = time_per_dab(lambda x, y, z: legacy_paint(image, x, y, z, radius, legacy_axis), centers)
+            brush_stencil.clear_stencil_cache()
+            stencil = time_per_dab(
+                lambda x, y, z: brush_stencil.paint_vtk_image(image, x, y, z, radius, axis=axis), centers
+            )
+            print(f"{name:<9} {radius:>6} {legacy:>10.3f} {stencil:>11.3f} {legacy / stencil:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
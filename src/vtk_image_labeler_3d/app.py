@@ -82,11 +82,12 @@ def main():
 
     from PyQt5.QtWidgets import QApplication
     from app_icon import load_app_icon
-    from logger import logger, _info, _err
+    from logger import logger, _info, _err, quiet_vtk_logging
     from splash_screen import create_splash, show_message
     from ui_theme import apply_material_theme
 
     _info("Application started")
+    quiet_vtk_logging()
 
     try:
         app = QApplication(sys.argv)
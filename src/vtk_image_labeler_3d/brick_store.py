@@ -0,0 +1,154 @@
+"""
+Sparse bricked storage for label volumes.
+
+A ``BrickStore`` holds a (z, y, x) volume as ``BRICK_SIZE``³ bricks. Bricks
+that are all zero are not stored, bricks holding a single value are stored
+as that value, and only mixed bricks keep a dense array, so memory scales
+with the labeled surface/volume rather than the image size. Dense data is
+materialized on request for a region, a slice or the whole volume.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+BRICK_SIZE = 32
+
+BrickKey = Tuple[int, int, int]
+Box = Tuple[int, int, int, int, int, int]  # inclusive (z0, z1, y0, y1, x0, x1)
+
+
+class BrickStore:
+    def __init__(self, shape, dtype=np.uint8, brick_size: int = BRICK_SIZE):
+        self.shape = tuple(int(n) for n in shape)
+        if len(self.shape) != 3:
+            raise ValueError(f"Expected a 3D shape, got {shape}")
+        self.dtype = np.dtype(dtype)
+        self.brick_size = int(brick_size)
+        if self.brick_size <= 0:
+            raise ValueError(f"Invalid brick size: {brick_size}")
+        self._dense: Dict[BrickKey, np.ndarray] = {}
+        self._uniform: Dict[BrickKey, int] = {}  # nonzero single-valued bricks
+
+    @classmethod
+    def from_dense(cls, volume: np.ndarray, brick_size: int = BRICK_SIZE) -> "BrickStore":
+        store = cls(volume.shape, volume.dtype, brick_size)
+        # find the bricks holding any label in one reduction, then store only those
+        occupied = volume != 0
+        for d in range(3):
+            occupied = np.logical_or.reduceat(occupied, np.arange(0, occupied.shape[d], store.brick_size), axis=d)
+        for key in np.argwhere(occupied):
+            key = tuple(int(k) for k in key)
+            store._store_brick(key, volume[store._brick_slices(key)])
+        return store
+
+    # ----- geometry -----
+
+    def _brick_slices(self, key: BrickKey) -> tuple[slice, slice, slice]:
+        b = self.brick_size
+        return tuple(slice(k * b, min((k + 1) * b, n)) for k, n in zip(key, self.shape))
+
+    def _clip(self, box: Box) -> Box | None:
+        lo = [max(int(box[2 * d]), 0) for d in range(3)]
+        hi = [min(int(box[2 * d + 1]), self.shape[d] - 1) for d in range(3)]
+        if any(h < l for l, h in zip(lo, hi)):
+            return None
+        return (lo[0], hi[0], lo[1], hi[1], lo[2], hi[2])
+
+    def _keys_in_box(self, box: Box):
+        b = self.brick_size
+        ranges = [range(box[2 * d] // b, box[2 * d + 1] // b + 1) for d in range(3)]
+        return [(z, y, x) for z in ranges[0] for y in ranges[1] for x in ranges[2]]
+
+    # ----- memory -----
+
+    def nbytes(self) -> int:
+        """Bytes held by brick payloads (dense bricks only; uniform bricks are a scalar each)."""
+        return sum(a.nbytes for a in self._dense.values())
+
+    def dense_nbytes(self) -> int:
+        """Bytes the equivalent dense volume would take."""
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def brick_counts(self) -> dict:
+        return {"dense": len(self._dense), "uniform": len(self._uniform)}
+
+    # ----- access -----
+
+    def _store_brick(self, key: BrickKey, data: np.ndarray) -> None:
+        self._dense.pop(key, None)
+        self._uniform.pop(key, None)
+        first = data.flat[0]
+        if not np.any(data != first):
+            if first != 0:
+                self._uniform[key] = first.item()
+            return
+        self._dense[key] = np.array(data, dtype=self.dtype, copy=True)
+
+    def read_region(self, box: Box, out: np.ndarray | None = None) -> np.ndarray:
+        """Dense copy of the (z0, z1, y0, y1, x0, x1) box (clipped to the volume)."""
+        c = self._clip(box)
+        if c is None:
+            return np.zeros((0, 0, 0), dtype=self.dtype)
+        size = (c[1] - c[0] + 1, c[3] - c[2] + 1, c[5] - c[4] + 1)
+        if out is None:
+            out = np.zeros(size, dtype=self.dtype)
+        else:
+            if out.shape != size:
+                raise ValueError(f"Output shape {out.shape} does not match region {size}")
+            out[...] = 0
+        for key in self._keys_in_box(c):
+            if key not in self._dense and key not in self._uniform:
+                continue
+            bs = self._brick_slices(key)
+            lo = [max(bs[d].start, c[2 * d]) for d in range(3)]
+            hi = [min(bs[d].stop, c[2 * d + 1] + 1) for d in range(3)]
+            dst = tuple(slice(lo[d] - c[2 * d], hi[d] - c[2 * d]) for d in range(3))
+            if key in self._uniform:
+                out[dst] = self._uniform[key]
+            else:
+                src = tuple(slice(lo[d] - bs[d].start, hi[d] - bs[d].start) for d in range(3))
+                out[dst] = self._dense[key][src]
+        return out
+
+    def write_region(self, box: Box, data: np.ndarray) -> None:
+        """Overwrite the box with ``data`` (shaped like the clipped box), re-bricking what it covers."""
+        c = self._clip(box)
+        if c is None:
+            return
+        size = (c[1] - c[0] + 1, c[3] - c[2] + 1, c[5] - c[4] + 1)
+        if tuple(data.shape) != size:
+            raise ValueError(f"Data shape {data.shape} does not match region {size}")
+        for key in self._keys_in_box(c):
+            bs = self._brick_slices(key)
+            lo = [max(bs[d].start, c[2 * d]) for d in range(3)]
+            hi = [min(bs[d].stop, c[2 * d + 1] + 1) for d in range(3)]
+            src = tuple(slice(lo[d] - c[2 * d], hi[d] - c[2 * d]) for d in range(3))
+            covers = all(lo[d] == bs[d].start and hi[d] == bs[d].stop for d in range(3))
+            if covers:
+                self._store_brick(key, data[src])
+                continue
+            brick = self.read_region((bs[0].start, bs[0].stop - 1, bs[1].start, bs[1].stop - 1, bs[2].start, bs[2].stop - 1))
+            dst = tuple(slice(lo[d] - bs[d].start, hi[d] - bs[d].start) for d in range(3))
+            brick[dst] = data[src]
+            self._store_brick(key, brick)
+
+    def to_dense(self, out: np.ndarray | None = None) -> np.ndarray:
+        return self.read_region((0, self.shape[0] - 1, 0, self.shape[1] - 1, 0, self.shape[2] - 1), out=out)
+
+    def get_slice(self, axis, index: int) -> np.ndarray:
+        """
+        Dense 2D slice perpendicular to VTK ``axis`` (x=0, y=1, z=2) at array
+        ``index``, in (z, y, x) order with that dimension dropped.
+        """
+        axis = int(axis)
+        if axis not in (0, 1, 2):
+            raise ValueError(f"Invalid axis: {axis}")
+        d = 2 - axis
+        if not (0 <= int(index) < self.shape[d]):
+            raise ValueError(f"Slice index {index} out of range along axis {axis}")
+        box = [0, self.shape[0] - 1, 0, self.shape[1] - 1, 0, self.shape[2] - 1]
+        box[2 * d] = box[2 * d + 1] = int(index)
+        return np.take(self.read_region(tuple(box)), 0, axis=d)
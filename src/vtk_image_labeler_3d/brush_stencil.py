@@ -0,0 +1,273 @@
+"""Precomputed brush stencils and vectorized stamping for segmentation painting."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+import numpy as np
+
+# Paint axes follow reslicer.AXIAL / CORONAL / SAGITTAL (VTK x=0, y=1, z=2).
+# ``None`` selects the 3D (sphere) brush.
+AXIS_SAGITTAL = 0
+AXIS_CORONAL = 1
+AXIS_AXIAL = 2
+
+_UNIT_SPACING = (1.0, 1.0, 1.0)
+
+
+def _normalize_spacing(spacing) -> tuple[float, float, float]:
+    if spacing is None:
+        return _UNIT_SPACING
+    s = tuple(abs(float(v)) for v in spacing)
+    if len(s) != 3 or any(v <= 0.0 for v in s):
+        raise ValueError(f"Invalid voxel spacing: {spacing}")
+    return s
+
+
+def _axes_in_use(axis) -> tuple[int, ...]:
+    """VTK axes (x=0, y=1, z=2) spanned by the brush."""
+    if axis is None:
+        return (0, 1, 2)
+    axis = int(axis)
+    if axis not in (0, 1, 2):
+        raise ValueError(f"Invalid axis: {axis}")
+    return tuple(a for a in (0, 1, 2) if a != axis)
+
+
+@lru_cache(maxsize=64)
+def _build_stencil(radius: int, spacing: tuple, axis) -> np.ndarray:
+    used = _axes_in_use(axis)
+
+    if radius <= 0:
+        mask = np.ones((1, 1, 1), dtype=bool)
+        mask.flags.writeable = False
+        return mask
+
+    # Radius is given in voxels along the finest in-plane axis; coarser axes
+    # get proportionally fewer voxels so the footprint stays round in mm.
+    # With unit spacing this is exactly the legacy (i/r)**2 + (j/r)**2 <= 1 test.
+    s_ref = min(spacing[a] for a in used)
+    half = [0, 0, 0]
+    for a in used:
+        half[a] = int(np.floor(radius * s_ref / spacing[a] + 1e-9))
+
+    # offsets in (z, y, x) order to match vtk_to_numpy(...).reshape(dims[::-1])
+    oz = np.arange(-half[2], half[2] + 1, dtype=np.float64).reshape(-1, 1, 1)
+    oy = np.arange(-half[1], half[1] + 1, dtype=np.float64).reshape(1, -1, 1)
+    ox = np.arange(-half[0], half[0] + 1, dtype=np.float64).reshape(1, 1, -1)
+
+    r = float(radius)
+    d2 = np.zeros((oz.shape[0], oy.shape[1], ox.shape[2]), dtype=np.float64)
+    for a, o in ((0, ox), (1, oy), (2, oz)):
+        if a in used:
+            d2 = d2 + ((o * (spacing[a] / s_ref)) / r) ** 2
+
+    mask = d2 <= 1.0
+    mask.flags.writeable = False
+    return mask
+
+
+def get_stencil(radius: int, spacing=None, axis=None) -> np.ndarray:
+    """
+    Return a cached, read-only boolean brush footprint shaped (z, y, x).
+
+    ``axis`` is the view normal for a 2D disk (the stencil has length 1 along
+    it) or ``None`` for a 3D sphere. ``spacing`` is the voxel spacing (x, y, z);
+    ``None`` means index space, which is what the paint brush uses.
+    """
+    return _build_stencil(int(radius), _normalize_spacing(spacing), None if axis is None else int(axis))
+
+
+def clear_stencil_cache() -> None:
+    _build_stencil.cache_clear()
+
+
+def vtk_image_as_zyx_view(vtk_image) -> np.ndarray:
+    """Writable (z, y, x) NumPy view onto single-component vtkImageData scalars."""
+    from vtk.util import numpy_support
+
+    dims = vtk_image.GetDimensions()
+    scalars = vtk_image.GetPointData().GetScalars()
+    if scalars is None:
+        raise ValueError("VTK image has no scalars")
+    if scalars.GetNumberOfComponents() != 1:
+        raise ValueError("Brush painting requires a single-component image")
+    arr = numpy_support.vtk_to_numpy(scalars)
+    return arr.reshape(dims[2], dims[1], dims[0])
+
+
+def _write(region: np.ndarray, mask: np.ndarray, value, where) -> None:
+    if where is not None:
+        mask = mask & where(region)
+    region[mask] = value
+
+
+def stamp_stencil(volume_zyx: np.ndarray, stencil: np.ndarray, center_zyx, value, where=None) -> tuple | None:
+    """
+    Write ``value`` into ``volume_zyx`` wherever the centered stencil is set.
+
+    ``center_zyx`` is the brush center in array indices. The stencil is
+    clipped against the volume bounds and applied with one masked slice
+    assignment; ``where``, if given, maps the region to the voxels that may
+    be written (label-aware painting). Returns the touched (z0, z1, y0, y1,
+    x0, x1) inclusive array-index box, or None if the brush lies entirely
+    outside.
+    """
+    vol_lo = []
+    st_lo = []
+    size = []
+    for d in range(3):
+        half = stencil.shape[d] // 2
+        lo = int(center_zyx[d]) - half
+        hi = lo + stencil.shape[d]
+        c_lo = max(lo, 0)
+        c_hi = min(hi, volume_zyx.shape[d])
+        if c_hi <= c_lo:
+            return None
+        vol_lo.append(c_lo)
+        st_lo.append(c_lo - lo)
+        size.append(c_hi - c_lo)
+
+    region = volume_zyx[
+        vol_lo[0]:vol_lo[0] + size[0],
+        vol_lo[1]:vol_lo[1] + size[1],
+        vol_lo[2]:vol_lo[2] + size[2],
+    ]
+    mask = stencil[
+        st_lo[0]:st_lo[0] + size[0],
+        st_lo[1]:st_lo[1] + size[1],
+        st_lo[2]:st_lo[2] + size[2],
+    ]
+    _write(region, mask, value, where)
+
+    return (
+        vol_lo[0], vol_lo[0] + size[0] - 1,
+        vol_lo[1], vol_lo[1] + size[1] - 1,
+        vol_lo[2], vol_lo[2] + size[2] - 1,
+    )
+
+
+def paint_vtk_image(vtk_image, x, y, z, radius, value=1, axis=None, spacing=None, where=None) -> tuple | None:
+    """
+    Stamp a brush centered at image index (x, y, z) into ``vtk_image``.
+
+    Returns the touched VTK extent (x0, x1, y0, y1, z0, z1) or None.
+    """
+    extent = vtk_image.GetExtent()
+    volume = vtk_image_as_zyx_view(vtk_image)
+    stencil = get_stencil(radius, spacing=spacing, axis=axis)
+    box = stamp_stencil(volume, stencil, (z - extent[4], y - extent[2], x - extent[0]), value, where=where)
+    if box is None:
+        return None
+    vtk_image.GetPointData().GetScalars().Modified()
+    return (
+        box[4] + extent[0], box[5] + extent[0],
+        box[2] + extent[2], box[3] + extent[2],
+        box[0] + extent[4], box[1] + extent[4],
+    )
+
+
+def brush_bounds(p0_zyx, p1_zyx, radius: int, axis=None, spacing=None) -> tuple:
+    """
+    Unclipped (z0, z1, y0, y1, x0, x1) box the brush can touch moving from
+    ``p0_zyx`` to ``p1_zyx`` (pass the same point twice for a single dab).
+    """
+    half = np.array(get_stencil(radius, spacing=spacing, axis=axis).shape) // 2
+    lo = np.minimum(np.asarray(p0_zyx), np.asarray(p1_zyx)) - half
+    hi = np.maximum(np.asarray(p0_zyx), np.asarray(p1_zyx)) + half
+    return (int(lo[0]), int(hi[0]), int(lo[1]), int(hi[1]), int(lo[2]), int(hi[2]))
+
+
+def _max_capsule_length(radius: int) -> float:
+    # Longer segments are split so the per-piece bounding box stays small.
+    return float(max(4 * int(radius), 8))
+
+
+def stamp_capsule(volume_zyx: np.ndarray, p0_zyx, p1_zyx, radius: int, value, spacing=None, axis=None, where=None) -> tuple | None:
+    """
+    Fill the capsule swept by the brush moving from ``p0_zyx`` to ``p1_zyx``.
+
+    This is the union of every brush dab along the segment, computed as one
+    point-to-segment distance test over the segment's bounding box. Both
+    end dabs are identical to ``stamp_stencil``. For a 2D brush (``axis`` set)
+    the two points must lie on the same slice; otherwise only the end dab is
+    stamped. Returns the touched (z0, z1, y0, y1, x0, x1) array-index box.
+    """
+    p0 = np.asarray(p0_zyx, dtype=np.int64)
+    p1 = np.asarray(p1_zyx, dtype=np.int64)
+    stencil = get_stencil(radius, spacing=spacing, axis=axis)
+
+    plane_dim = None if axis is None else 2 - int(axis)
+    if int(radius) <= 0 or np.array_equal(p0, p1) or (plane_dim is not None and p0[plane_dim] != p1[plane_dim]):
+        return stamp_stencil(volume_zyx, stencil, p1, value, where=where)
+
+    length = float(np.linalg.norm(p1 - p0))
+    n_pieces = int(np.ceil(length / _max_capsule_length(radius)))
+    if n_pieces > 1:
+        knots = [np.rint(p0 + (p1 - p0) * (k / n_pieces)).astype(np.int64) for k in range(n_pieces + 1)]
+        box = None
+        for a, b in zip(knots[:-1], knots[1:]):
+            box = union_boxes(box, stamp_capsule(volume_zyx, a, b, radius, value, spacing=spacing, axis=axis, where=where))
+        return box
+
+    spacing = _normalize_spacing(spacing)
+    used = _axes_in_use(None if axis is None else int(axis))
+    s_ref = min(spacing[a] for a in used)
+    # per-dimension scale in (z, y, x) order; the view normal does not count
+    scale = np.array([spacing[2 - d] / s_ref if (2 - d) in used else 0.0 for d in range(3)])
+
+    half = np.array(stencil.shape) // 2
+    lo = np.maximum(np.minimum(p0, p1) - half, 0)
+    hi = np.minimum(np.maximum(p0, p1) + half + 1, volume_zyx.shape)
+    if np.any(hi <= lo):
+        return None
+
+    gz = np.arange(lo[0], hi[0], dtype=np.float64).reshape(-1, 1, 1) - p0[0]
+    gy = np.arange(lo[1], hi[1], dtype=np.float64).reshape(1, -1, 1) - p0[1]
+    gx = np.arange(lo[2], hi[2], dtype=np.float64).reshape(1, 1, -1) - p0[2]
+    grid = (gz, gy, gx)
+
+    d = (p1 - p0).astype(np.float64) * scale
+    t = (gz * scale[0] * d[0] + gy * scale[1] * d[1] + gx * scale[2] * d[2]) / float(np.dot(d, d))
+    t = np.clip(t, 0.0, 1.0)
+
+    r = float(radius)
+    d2 = np.zeros(t.shape, dtype=np.float64)
+    for k in range(3):
+        if scale[k] != 0.0:
+            d2 = d2 + (((grid[k] - t * (p1[k] - p0[k])) * scale[k]) / r) ** 2
+
+    region = volume_zyx[lo[0]:hi[0], lo[1]:hi[1], lo[2]:hi[2]]
+    _write(region, d2 <= 1.0, value, where)
+
+    return (int(lo[0]), int(hi[0]) - 1, int(lo[1]), int(hi[1]) - 1, int(lo[2]), int(hi[2]) - 1)
+
+
+def union_boxes(a, b):
+    """Union of two inclusive (lo, hi, lo, hi, lo, hi) boxes; either may be None."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return tuple(min(a[i], b[i]) if i % 2 == 0 else max(a[i], b[i]) for i in range(6))
+
+
+def paint_stroke_vtk_image(vtk_image, start_xyz, end_xyz, radius, value=1, axis=None, spacing=None, where=None) -> tuple | None:
+    """
+    Paint the capsule swept from image index ``start_xyz`` to ``end_xyz``.
+
+    Returns the touched VTK extent (x0, x1, y0, y1, z0, z1) or None.
+    """
+    extent = vtk_image.GetExtent()
+    volume = vtk_image_as_zyx_view(vtk_image)
+    p0 = (start_xyz[2] - extent[4], start_xyz[1] - extent[2], start_xyz[0] - extent[0])
+    p1 = (end_xyz[2] - extent[4], end_xyz[1] - extent[2], end_xyz[0] - extent[0])
+    box = stamp_capsule(volume, p0, p1, radius, value, spacing=spacing, axis=axis, where=where)
+    if box is None:
+        return None
+    vtk_image.GetPointData().GetScalars().Modified()
+    return (
+        box[4] + extent[0], box[5] + extent[0],
+        box[2] + extent[2], box[3] + extent[2],
+        box[0] + extent[4], box[1] + extent[4],
+    )
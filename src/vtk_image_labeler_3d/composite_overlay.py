@@ -0,0 +1,331 @@
+"""
+One overlay pipeline per view for all segmentation layers.
+
+Instead of a reslice, a color map, a contour filter and two actors per
+layer, ``CompositeOverlay`` cuts the slice of every visible layer that has
+voxels on it (an array view with the Reslicer fast path, and one cut per
+shared labelmap for all of its layers) and blends their colors into a
+single RGBA image, later layers over earlier ones as the per-layer image
+actors did. For the borders the layers are packed into label planes, one
+slot per layer, a layer going into the first plane it does not overlap;
+each plane is contoured in one discrete pass (see label_border), so
+layers side by side cost one pass and nested ones (GTV inside CTV inside
+PTV) each keep their border. Layers without voxels on the slice are
+skipped using their occupancy index, so a slice change costs about the
+same however many layers there are.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+import label_border
+import reslicer
+
+# slot values of the label slice; slot 0 is background
+_SLOT_DTYPE = np.uint16
+
+
+class CompositeOverlay:
+    def __init__(self, axis, viewer=None):
+        self.axis = axis
+        self.viewer = viewer
+        self.slice_index = None
+        self.border_line_width = 2.0
+        self.border_line_opacity = 1.0
+        # border lines are drawn this far in front of the slice, towards the camera
+        self.border_offset = 10.0
+
+        # optional slice_cache.SliceCache shared with the other views
+        self.cache = None
+
+        self._layers: List = []
+        self._reslicers: Dict[object, reslicer.Reslicer] = {}
+        self._labelmap_reslicers: Dict[object, reslicer.Reslicer] = {}
+
+        self.geometry_slice = vtk.vtkImageData()  # slice geometry (no scalars) for the borders
+        self.rgba_slice = vtk.vtkImageData()
+        self._create_actors()
+
+    def _create_actors(self):
+        self.slice_actor = vtk.vtkImageActor()
+        self.slice_actor.GetMapper().SetInputData(self.rgba_slice)
+        self.slice_actor.SetVisibility(False)
+
+        # all label boundaries of a plane in one pass; each line records the
+        # labels on its two sides (vtkDiscreteFlyingEdges2D loses the value of all but
+        # the last contour in its output scalars)
+        self.borders = label_border.LabelBorders()
+
+        self.border_poly_data = vtk.vtkPolyData()
+        self.border_mapper = vtk.vtkPolyDataMapper()
+        self.border_mapper.SetInputData(self.border_poly_data)
+        self.border_mapper.SetScalarModeToUseCellData()
+        self.border_mapper.SetColorModeToDirectScalars()
+        self.border_mapper.ScalarVisibilityOn()
+
+        self.border_actor = vtk.vtkActor()
+        self.border_actor.SetMapper(self.border_mapper)
+        self.border_actor.GetProperty().SetLineWidth(self.border_line_width)
+        self.border_actor.GetProperty().SetOpacity(self.border_line_opacity)
+        self.border_actor.SetVisibility(False)
+
+    def get_actors(self):
+        return [self.slice_actor, self.border_actor]
+
+    # ----- layers -----
+
+    def add_layer(self, layer):
+        if layer not in self._layers:
+            self._layers.append(layer)
+
+    def remove_layer(self, layer):
+        if layer in self._layers:
+            self._layers.remove(layer)
+        self._reslicers.pop(layer, None)
+
+    def has_layer(self, layer) -> bool:
+        return layer in self._layers
+
+    def get_layers(self) -> List:
+        return list(self._layers)
+
+    def release_layer_image(self, layer):
+        """Drop the reference to ``layer``'s voxels (e.g. when it is compacted)."""
+        r = self._reslicers.get(layer)
+        if r is not None:
+            r.clear()
+
+    def clear(self):
+        self._layers.clear()
+        self._reslicers.clear()
+        self._labelmap_reslicers.clear()
+        self.slice_index = None
+        self._set_visible(False)
+
+    # ----- update -----
+
+    def _set_visible(self, visible):
+        for actor in self.get_actors():
+            actor.SetVisibility(visible)
+
+    def _reslicer_for(self, cache, key, image):
+        r = cache.get(key)
+        if r is None:
+            r = cache[key] = reslicer.Reslicer(self.axis, image, background_value=0, viewer=self.viewer)
+        elif r.vtk_image is not image:
+            r.set_vtk_image(image)
+        return r
+
+    @staticmethod
+    def _source(r, index):
+        """Callable giving slice ``index`` as a flat array, and whether it may run off the UI thread."""
+        cut = r.slice_array_job(index)
+        if cut is not None:
+            return cut, True
+
+        def resliced():
+            s = r.get_slice_image(index)
+            return numpy_support.vtk_to_numpy(s.GetPointData().GetScalars())
+        return resliced, False
+
+    def _visible_layers_on_slice(self, index):
+        for slot, layer in enumerate(self._layers, start=1):
+            if not layer.get_visible() or layer.is_compact() or layer.get_image() is None:
+                continue
+            occupancy = layer.get_slice_occupancy()
+            if occupancy is not None and occupancy.is_slice_empty(self.axis, index):
+                continue
+            yield slot, layer
+
+    def _color_table(self):
+        """RGBA (0-255) per slot; row 0 is transparent background."""
+        table = np.zeros((len(self._layers) + 1, 4), dtype=np.uint8)
+        for slot, layer in enumerate(self._layers, start=1):
+            r, g, b = layer.get_vtk_color()
+            table[slot] = np.rint(np.array([r, g, b, layer.get_alpha()]) * 255.0)
+        return table
+
+    def _composition(self, index, table):
+        """
+        What slice ``index`` is composed from, read on the UI thread: a cache
+        key carrying the MTimes and colors involved, one (slot or slot LUT,
+        source) part per layer or shared labelmap with voxels on the slice,
+        the slots drawn and a reslicer giving the slice geometry.
+        """
+        comp = _Composition()
+        state = []
+        groups: Dict[object, list] = {}
+        for slot, layer in self._visible_layers_on_slice(index):
+            labelmap = layer.get_labelmap()
+            if labelmap is not None:
+                groups.setdefault(labelmap, []).append((slot, layer.get_label_value()))
+                continue
+            image = layer.get_image()
+            comp.add(slot, self._reslicer_for(self._reslicers, layer, image), index)
+            comp.slots.append(slot)
+            state.append((slot, id(image), image.GetMTime()))
+
+        for labelmap, members in groups.items():
+            image = labelmap.image
+            lut = np.zeros(labelmap.max_label() + 1, dtype=_SLOT_DTYPE)
+            for slot, value in members:
+                lut[value] = slot
+                comp.slots.append(slot)
+            comp.add(lut, self._reslicer_for(self._labelmap_reslicers, labelmap, image), index)
+            state.append((tuple(members), id(image), image.GetMTime()))
+
+        comp.slots.sort()
+        comp.table = table
+        comp.key = ("overlay", self.axis, index, tuple(state), table.tobytes())
+        return comp
+
+    @staticmethod
+    def _compose(parts, table):
+        """
+        (label planes, RGBA slice) as flat arrays. The colors of all layers
+        are blended, later layers (higher slots) over earlier ones; each
+        plane holds the slots of layers that do not overlap.
+        """
+        planes, layers = [], []  # layers: (slot, mask)
+        for slot_or_lut, source in parts:
+            values = source()
+            if planes and values.shape != planes[0].shape:
+                print("A layer does not match the overlay slice geometry; skipped")
+                continue
+            if isinstance(slot_or_lut, np.ndarray):
+                slots = np.take(slot_or_lut, values)
+                layers += [(int(slot), slots == slot) for slot in slot_or_lut[slot_or_lut != 0]]
+            else:
+                slots = np.where(values != 0, slot_or_lut, 0).astype(_SLOT_DTYPE)
+                layers.append((slot_or_lut, values != 0))
+            labeled = slots != 0
+            for plane in planes:
+                if not plane[labeled].any():
+                    plane[labeled] = slots[labeled]
+                    break
+            else:
+                planes.append(slots)
+
+        premultiplied = np.zeros((planes[0].shape[0], 3), dtype=np.float32)
+        alpha = np.zeros(planes[0].shape[0], dtype=np.float32)
+        for slot, mask in sorted(layers, key=lambda item: item[0]):
+            if not mask.any():
+                continue
+            a = table[slot, 3] / 255.0
+            premultiplied[mask] = table[slot, :3] * a + premultiplied[mask] * (1.0 - a)
+            alpha[mask] = a + alpha[mask] * (1.0 - a)
+        rgba = np.zeros((alpha.shape[0], 4), dtype=np.uint8)
+        shown = alpha > 0
+        rgba[shown, :3] = np.rint(premultiplied[shown] / alpha[shown, None])
+        rgba[:, 3] = np.rint(alpha * 255.0)
+        return planes, rgba
+
+    def _prepare_slice(self, geometry):
+        """Give the geometry and RGBA slices the (extent, spacing, origin, direction) ``geometry``."""
+        extent, spacing, origin, direction = geometry
+        rgba = self.rgba_slice
+        reallocate = rgba.GetExtent() != tuple(extent) or rgba.GetPointData().GetScalars() is None
+        for image in (self.geometry_slice, rgba):
+            image.SetExtent(extent)
+            image.SetSpacing(spacing)
+            image.SetOrigin(origin)
+            image.SetDirectionMatrix(direction)
+        if reallocate:
+            rgba.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 4)
+        return numpy_support.vtk_to_numpy(rgba.GetPointData().GetScalars())
+
+    def update(self, index):
+        """Recompose the overlay for slice ``index`` from all visible layers."""
+        self.slice_index = index
+        if index is None:
+            self._set_visible(False)
+            return
+
+        comp = self._composition(index, self._color_table())
+        if not comp.parts:
+            self._set_visible(False)
+            return
+
+        value = self.cache.get(comp.key) if self.cache is not None else None
+        if value is None:
+            value = self._compose(comp.parts, comp.table)
+            if self.cache is not None:
+                self.cache.put(comp.key, value, _nbytes(value))
+        planes, rgba = value
+
+        rgba_out = self._prepare_slice(comp.reslicer.slice_geometry(index))
+        if rgba_out.shape != rgba.shape:
+            self._set_visible(False)
+            return
+        np.copyto(rgba_out, rgba)
+        self.rgba_slice.GetPointData().GetScalars().Modified()
+        self.rgba_slice.Modified()
+
+        self._update_borders(planes, comp)
+        self._set_visible(True)
+
+    def prefetch_jobs(self, indices):
+        """SlicePrefetcher jobs composing the given slices off the UI thread (uncached ones only)."""
+        if self.cache is None:
+            return []
+        table = self._color_table()
+        jobs = []
+        for index in indices:
+            comp = self._composition(index, table)
+            if not comp.parts or not comp.threadsafe or self.cache.contains(comp.key):
+                continue
+
+            def job(parts=comp.parts):
+                value = self._compose(parts, table)
+                return value, _nbytes(value)
+            jobs.append((comp.key, job))
+        return jobs
+
+    def _update_borders(self, planes, comp):
+        # boundaries of the slots on each label plane, in world coordinates;
+        # cached with the composed slice they were extracted from
+        lines = [
+            self.borders.extract(self.geometry_slice, plane, comp.slots, comp.table,
+                                 cache=self.cache, key=(comp.key, i))
+            for i, plane in enumerate(planes)
+        ]
+        if len(lines) == 1:
+            self.border_poly_data.ShallowCopy(lines[0])
+        else:
+            append = vtk.vtkAppendPolyData()
+            for poly_data in lines:
+                append.AddInputData(poly_data)
+            append.Update()
+            self.border_poly_data.ShallowCopy(append.GetOutput())
+
+        # move the lines towards the camera near plane so they are drawn over the fill
+        transforms = getattr(self.viewer, "transforms", None)
+        if transforms is not None:
+            self.border_actor.SetPosition(*(-self.border_offset * transforms.view_direction()))
+
+
+def _nbytes(value):
+    planes, rgba = value
+    return sum(plane.nbytes for plane in planes) + rgba.nbytes
+
+
+class _Composition:
+    def __init__(self):
+        self.key = None
+        self.parts = []  # (slot or slot LUT, source)
+        self.slots = []
+        self.table = None
+        self.reslicer = None  # gives the slice geometry
+        self.threadsafe = True
+
+    def add(self, slot_or_lut, r, index):
+        source, threadsafe = CompositeOverlay._source(r, index)
+        self.parts.append((slot_or_lut, source))
+        self.threadsafe = self.threadsafe and threadsafe
+        if self.reslicer is None:
+            self.reslicer = r
@@ -21,8 +21,40 @@ DEFAULT_SETTINGS = {
     "feedback_api_url": "",
     # Optional shared secret; must match server FEEDBACK_API_KEY when set.
     "feedback_api_key": "",
+    # Segmentation undo history: compressed bricks kept in RAM before spilling to temp_dir.
+    "undo_memory_budget_mb": 256,
+    "undo_max_steps": 100,
+    # Keep hidden segmentation layers in sparse brick storage instead of dense volumes.
+    "sparse_hidden_layers": False,
+    # Create new segmentation layers as labels of one shared (mutually exclusive) labelmap.
+    "shared_labelmap": False,
+    # In the shared labelmap, painting keeps other labels instead of overwriting them.
+    "labelmap_protect_labels": False,
+    # Queued brush dabs are applied and rendered once per this interval (about one display frame).
+    "paint_frame_interval_ms": 16,
+    # Resliced slices kept for scrolling, and how many slices ahead to prefetch.
+    "slice_cache_mb": 256,
+    "slice_prefetch_count": 8,
+    # Share of label border points removed by polyline decimation (0 = exact pixel borders).
+    "border_decimation_percent": 0,
+    # Triangles of all 3D surfaces together while the camera moves (0 = always full resolution).
+    "surface_triangle_budget": 300000,
+    # Smooth 3D surfaces (windowed sinc) after they are contoured.
+    "surface_smoothing": False,
+    # Ray-cast the base image in the 3D view (CPU), from a copy of at most this many voxels per axis while the
+    # camera moves, cropped to the labeled voxels.
+    "volume_rendering": False,
+    "volume_render_interactive_voxels": 128,
+    "volume_render_crop_to_labels": True,
 }
 
+
+def _as_int(value, default: int, minimum: int = 0) -> int:
+    try:
+        return max(int(value), minimum)
+    except (TypeError, ValueError):
+        return default
+
 # Mutable singleton returned by get_config(); Preferences updates it in place.
 _config = None
 
@@ -54,6 +86,26 @@ def _normalize(data: dict) -> dict:
     cfg["temp_dir"] = str(cfg.get("temp_dir") or DEFAULT_SETTINGS["temp_dir"]).strip()
     cfg["feedback_api_url"] = str(cfg.get("feedback_api_url") or "").strip().rstrip("/")
     cfg["feedback_api_key"] = str(cfg.get("feedback_api_key") or "").strip()
+    cfg["undo_memory_budget_mb"] = _as_int(cfg.get("undo_memory_budget_mb"), DEFAULT_SETTINGS["undo_memory_budget_mb"])
+    cfg["undo_max_steps"] = _as_int(cfg.get("undo_max_steps"), DEFAULT_SETTINGS["undo_max_steps"], minimum=1)
+    cfg["sparse_hidden_layers"] = bool(cfg.get("sparse_hidden_layers"))
+    cfg["shared_labelmap"] = bool(cfg.get("shared_labelmap"))
+    cfg["labelmap_protect_labels"] = bool(cfg.get("labelmap_protect_labels"))
+    cfg["paint_frame_interval_ms"] = _as_int(
+        cfg.get("paint_frame_interval_ms"), DEFAULT_SETTINGS["paint_frame_interval_ms"], minimum=1
+    )
+    cfg["slice_cache_mb"] = _as_int(cfg.get("slice_cache_mb"), DEFAULT_SETTINGS["slice_cache_mb"])
+    cfg["slice_prefetch_count"] = _as_int(cfg.get("slice_prefetch_count"), DEFAULT_SETTINGS["slice_prefetch_count"])
+    cfg["border_decimation_percent"] = min(
+        _as_int(cfg.get("border_decimation_percent"), DEFAULT_SETTINGS["border_decimation_percent"]), 95
+    )
+    cfg["surface_triangle_budget"] = _as_int(cfg.get("surface_triangle_budget"), DEFAULT_SETTINGS["surface_triangle_budget"])
+    cfg["surface_smoothing"] = bool(cfg.get("surface_smoothing"))
+    cfg["volume_rendering"] = bool(cfg.get("volume_rendering"))
+    cfg["volume_render_interactive_voxels"] = _as_int(
+        cfg.get("volume_render_interactive_voxels"), DEFAULT_SETTINGS["volume_render_interactive_voxels"], minimum=16
+    )
+    cfg["volume_render_crop_to_labels"] = bool(cfg.get("volume_render_crop_to_labels"))
     return cfg
 
 
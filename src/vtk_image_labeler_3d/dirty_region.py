@@ -0,0 +1,74 @@
+"""
+Index-space dirty regions for segmentation edits.
+
+A dirty region is a VTK-style inclusive extent ``(x0, x1, y0, y1, z0, z1)``
+in image index coordinates. ``None`` means "the whole volume may have
+changed" and is what every consumer must assume when no region is given.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+Extent = Tuple[int, int, int, int, int, int]
+
+
+def union(a: Optional[Extent], b: Optional[Extent], whole_if_none: bool = False) -> Optional[Extent]:
+    """
+    Bounding extent of two dirty regions.
+
+    With ``whole_if_none`` a ``None`` operand means the whole volume and the
+    result is ``None``; otherwise ``None`` is treated as empty.
+    """
+    if a is None or b is None:
+        if whole_if_none:
+            return None
+        return b if a is None else a
+    return (
+        min(a[0], b[0]), max(a[1], b[1]),
+        min(a[2], b[2]), max(a[3], b[3]),
+        min(a[4], b[4]), max(a[5], b[5]),
+    )
+
+
+def is_empty(extent: Optional[Extent]) -> bool:
+    if extent is None:
+        return False
+    return extent[1] < extent[0] or extent[3] < extent[2] or extent[5] < extent[4]
+
+
+def clip(extent: Optional[Extent], whole_extent: Extent) -> Optional[Extent]:
+    """Clip ``extent`` to ``whole_extent``; ``None`` stays ``None``."""
+    if extent is None:
+        return None
+    return (
+        max(extent[0], whole_extent[0]), min(extent[1], whole_extent[1]),
+        max(extent[2], whole_extent[2]), min(extent[3], whole_extent[3]),
+        max(extent[4], whole_extent[4]), min(extent[5], whole_extent[5]),
+    )
+
+
+def intersects_slice(extent: Optional[Extent], axis: int, slice_index) -> bool:
+    """True if the slice ``slice_index`` along VTK ``axis`` (x=0, y=1, z=2) may be affected."""
+    if extent is None or slice_index is None:
+        return True
+    if is_empty(extent):
+        return False
+    axis = int(axis)
+    return extent[2 * axis] <= int(slice_index) <= extent[2 * axis + 1]
+
+
+def to_zyx_slices(extent: Extent, whole_extent: Extent) -> tuple[slice, slice, slice]:
+    """NumPy (z, y, x) slices selecting ``extent`` in an array covering ``whole_extent``."""
+    e = clip(extent, whole_extent)
+    return (
+        slice(e[4] - whole_extent[4], e[5] - whole_extent[4] + 1),
+        slice(e[2] - whole_extent[2], e[3] - whole_extent[2] + 1),
+        slice(e[0] - whole_extent[0], e[1] - whole_extent[0] + 1),
+    )
+
+
+def to_zyx_box(extent: Extent, whole_extent: Extent) -> Tuple[int, int, int, int, int, int]:
+    """Inclusive (z0, z1, y0, y1, x0, x1) array-index box of ``extent`` in an array covering ``whole_extent``."""
+    sl = to_zyx_slices(extent, whole_extent)
+    return (sl[0].start, sl[0].stop - 1, sl[1].start, sl[1].stop - 1, sl[2].start, sl[2].stop - 1)
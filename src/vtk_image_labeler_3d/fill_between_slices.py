@@ -60,23 +60,25 @@ def _vtk_to_zyx_uint16(vtk_image) -> np.ndarray:
     return arr.reshape(dims[2], dims[1], dims[0]).astype(np.uint16, copy=False)
 
 
-def _labeled_slice_mask(vol: np.ndarray, axis: int) -> np.ndarray:
+def _labeled_slice_mask(vol: np.ndarray, axis: int, slice_counts=None) -> np.ndarray:
+    if slice_counts is not None:
+        return np.asarray(slice_counts[axis]) > 0
     other = tuple(i for i in range(3) if i != axis)
     return np.any(vol != 0, axis=other)
 
 
-def _count_labeled_slices(vol: np.ndarray, axis: int) -> int:
+def _count_labeled_slices(vol: np.ndarray, axis: int, slice_counts=None) -> int:
     """Number of slices along axis that contain any nonzero label."""
     if axis < 0:
-        return max(_count_labeled_slices(vol, a) for a in (0, 1, 2))
-    return int(np.count_nonzero(_labeled_slice_mask(vol, axis)))
+        return max(_count_labeled_slices(vol, a, slice_counts) for a in (0, 1, 2))
+    return int(np.count_nonzero(_labeled_slice_mask(vol, axis, slice_counts)))
 
 
-def _has_gaps_along_axis(vol: np.ndarray, axis: int) -> bool:
+def _has_gaps_along_axis(vol: np.ndarray, axis: int, slice_counts=None) -> bool:
     """True if labeled slices along axis have empty slices between first and last."""
     if axis < 0:
-        return any(_has_gaps_along_axis(vol, a) for a in (0, 1, 2))
-    labeled = _labeled_slice_mask(vol, axis)
+        return any(_has_gaps_along_axis(vol, a, slice_counts) for a in (0, 1, 2))
+    labeled = _labeled_slice_mask(vol, axis, slice_counts)
     idxs = np.flatnonzero(labeled)
     if idxs.size < 2:
         return False
@@ -84,18 +86,23 @@ def _has_gaps_along_axis(vol: np.ndarray, axis: int) -> bool:
     return span > int(idxs.size)
 
 
-def _suggest_axes_with_gaps(vol: np.ndarray) -> list[int]:
-    return [a for a in (0, 1, 2) if _has_gaps_along_axis(vol, a)]
+def _suggest_axes_with_gaps(vol: np.ndarray, slice_counts=None) -> list[int]:
+    return [a for a in (0, 1, 2) if _has_gaps_along_axis(vol, a, slice_counts)]
 
 
 def fill_between_slices_array(
     label_zyx: np.ndarray,
     axis: int = AXIS_AUTO,
     label: int = 0,
+    slice_counts=None,
 ) -> tuple[np.ndarray, dict]:
     """
     Interpolate sparse labeled slices using Morphological Contour Interpolation.
 
+    ``slice_counts`` optionally gives the nonzero voxel count per slice for
+    numpy axes (z, y, x), e.g. from a layer's slice occupancy index; the
+    empty/gap checks then skip their scans of the volume.
+
     Returns
     -------
     filled : ndarray uint16
@@ -120,16 +127,17 @@ def fill_between_slices_array(
     vol = np.ascontiguousarray(np.asarray(label_zyx))
     if vol.ndim != 3:
         raise ValueError(f"Expected 3D label volume, got shape {vol.shape}")
-    if not np.any(vol):
+    before_fg = int(np.count_nonzero(vol)) if slice_counts is None else int(np.sum(slice_counts[0]))
+    if before_fg == 0:
         raise ValueError("Target layer is empty. Paint labels on sparse slices first.")
 
     axis = int(axis)
     if axis not in (-1, 0, 1, 2):
         raise ValueError(f"Invalid axis {axis}. Use -1, 0, 1, or 2.")
 
-    suggested = _suggest_axes_with_gaps(vol)
+    suggested = _suggest_axes_with_gaps(vol, slice_counts)
 
-    if axis >= 0 and _count_labeled_slices(vol, axis) < 2:
+    if axis >= 0 and _count_labeled_slices(vol, axis, slice_counts) < 2:
         hint = ""
         if suggested:
             names = ", ".join(AXIS_NAMES[a] for a in suggested)
@@ -139,14 +147,14 @@ def fill_between_slices_array(
             f"({AXIS_NAMES.get(axis, axis)}) before fill-between-slices can run."
             + hint
         )
-    if axis < 0 and max(_count_labeled_slices(vol, a) for a in (0, 1, 2)) < 2:
+    if axis < 0 and _count_labeled_slices(vol, -1, slice_counts) < 2:
         raise ValueError(
             "Need labels on at least two slices (on some axis) "
             "before fill-between-slices can run."
         )
 
     # If a specific axis has no empty slices between labels, MCI will do nothing.
-    if axis >= 0 and not _has_gaps_along_axis(vol, axis):
+    if axis >= 0 and not _has_gaps_along_axis(vol, axis, slice_counts):
         hint = ""
         if suggested:
             names = ", ".join(AXIS_NAMES[a] for a in suggested)
@@ -154,7 +162,7 @@ def fill_between_slices_array(
                 f" Try {names}. "
                 "Tip: choose the same view you painted in (Sagittal view -> Sagittal (X), etc.)."
             )
-        elif _count_labeled_slices(vol, axis) >= 2:
+        elif _count_labeled_slices(vol, axis, slice_counts) >= 2:
             hint = (
                 " Labeled slices along this axis are contiguous (no empty slices "
                 "between them), so there is nothing to fill."
@@ -164,8 +172,6 @@ def fill_between_slices_array(
             + hint
         )
 
-    before_fg = int(np.count_nonzero(vol))
-
     itk_img = itk.GetImageFromArray(vol.astype(np.uint16, copy=False))
     ImageType = type(itk_img)
     try:
@@ -222,10 +228,11 @@ def fill_between_slices_vtk(
     vtk_label_image,
     axis: int = AXIS_AUTO,
     label: int = 0,
+    slice_counts=None,
 ):
     """Run MCI on a VTK label image; return (filled zyx uint16, info)."""
     zyx = _vtk_to_zyx_uint16(vtk_label_image)
-    return fill_between_slices_array(zyx, axis=axis, label=label)
+    return fill_between_slices_array(zyx, axis=axis, label=label, slice_counts=slice_counts)
 
 
 def write_zyx_into_vtk_image(vtk_image, zyx: np.ndarray) -> None:
@@ -0,0 +1,144 @@
+"""
+Borders of the labels on a 2D label slice.
+
+``LabelBorders`` extracts all label boundaries of a slice in one discrete
+pass (vtkSurfaceNets2D, marching squares style with the label of each side
+kept per line) run only over the bounding box of the labeled pixels, so a
+small structure on a large slice costs little. The lines can optionally be
+decimated, and results are cached under a key describing the slice content
+(the MTimes of the layers it was composed from), so going back to a slice
+does not recontour it.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+
+def labeled_box(labels: np.ndarray, extent) -> tuple | None:
+    """
+    Extent of the nonzero pixels of the flat slice ``labels`` (with the
+    slice ``extent``), grown by one pixel so borders on its edge close, or
+    None if there are none.
+    """
+    dims = [extent[2 * d + 1] - extent[2 * d] + 1 for d in range(3)]
+    volume = labels.reshape(dims[::-1])
+    box = []
+    for d, other in ((0, (0, 1)), (1, (0, 2)), (2, (1, 2))):  # x, y, z
+        hit = np.flatnonzero(volume.any(axis=other))
+        if hit.size == 0:
+            return None
+        box += [max(int(hit[0]) - 1, 0) + extent[2 * d], min(int(hit[-1]) + 1, dims[d] - 1) + extent[2 * d]]
+    return tuple(box)
+
+
+class LabelBorders:
+    def __init__(self):
+        # fraction of the border points removed by decimation (0 = off); lines
+        # never move by more than half a pixel
+        self.decimation = 0.0
+
+        self.filter = vtk.vtkSurfaceNets2D()
+        self.filter.SmoothingOff()
+        self.filter.SetBackgroundLabel(0)
+        self._crop = vtk.vtkImageData()
+        self._crop_array = None  # keeps the memory of the cropped slice alive
+        self.filter.SetInputData(self._crop)
+
+    def extract(self, label_slice, labels, slots, table, cache=None, key=None):
+        """
+        Boundaries of ``slots`` in the flat ``labels`` of a slice with the
+        geometry of ``label_slice``, in world coordinates, one "Colors" cell
+        scalar per line taken from the RGBA ``table`` row of the label on
+        top. With a
+        slice_cache.SliceCache and a ``key``, the result is cached.
+        """
+        if cache is not None and key is not None:
+            key = ("borders", key, self.decimation)
+            poly_data = cache.get(key)
+            if poly_data is not None:
+                return poly_data
+
+        poly_data = self._extract(label_slice, labels, slots, table)
+
+        if cache is not None and key is not None:
+            cache.put(key, poly_data, poly_data.GetActualMemorySize() * 1024)
+        return poly_data
+
+    def _extract(self, label_slice, labels, slots, table):
+        poly_data = vtk.vtkPolyData()
+        box = labeled_box(labels, label_slice.GetExtent())
+        if box is None:
+            return poly_data
+
+        # contour the bounding box only
+        extent = label_slice.GetExtent()
+        dims = [extent[2 * d + 1] - extent[2 * d] + 1 for d in range(3)]
+        region = labels.reshape(dims[::-1])[
+            box[4] - extent[4]:box[5] - extent[4] + 1,
+            box[2] - extent[2]:box[3] - extent[2] + 1,
+            box[0] - extent[0]:box[1] - extent[0] + 1,
+        ]
+        self._crop_array = np.ascontiguousarray(region).reshape(-1)
+        crop = self._crop
+        crop.SetExtent(box)
+        crop.SetSpacing(label_slice.GetSpacing())
+        crop.SetOrigin(label_slice.GetOrigin())
+        crop.SetDirectionMatrix(label_slice.GetDirectionMatrix())
+        crop.GetPointData().SetScalars(numpy_support.numpy_to_vtk(self._crop_array, deep=False))
+        crop.Modified()
+
+        self.filter.SetNumberOfLabels(len(slots))
+        for i, slot in enumerate(slots):
+            self.filter.SetLabel(i, slot)
+        # the filter does not notice the new scalars of the reused crop image
+        self.filter.Modified()
+        self.filter.Update()
+        poly_data.ShallowCopy(self.filter.GetOutput())
+
+        sides = poly_data.GetCellData().GetArray("BoundaryLabels")
+        if sides is None or sides.GetNumberOfTuples() == 0:
+            return poly_data
+        # a line between two labels takes the color of the one on top
+        top = numpy_support.vtk_to_numpy(sides).max(axis=1)
+        if self.decimation > 0.0:
+            return self._decimate(poly_data, top, table, min(label_slice.GetSpacing()[:2]))
+        colors = numpy_support.numpy_to_vtk(np.ascontiguousarray(table[top, :3]), deep=True)
+        colors.SetName("Colors")
+        poly_data.GetCellData().SetScalars(colors)
+        return poly_data
+
+    def _decimate(self, poly_data, top, table, pixel):
+        """Join the lines of each color into polylines and decimate them."""
+        segments = numpy_support.vtk_to_numpy(poly_data.GetLines().GetConnectivityArray()).reshape(-1, 2)
+        append = vtk.vtkAppendPolyData()
+        for slot in np.unique(top):
+            lines = vtk.vtkCellArray()
+            offsets = np.arange(0, 2 * np.count_nonzero(top == slot) + 1, 2)
+            lines.SetData(numpy_support.numpy_to_vtkIdTypeArray(offsets, deep=True),
+                          numpy_support.numpy_to_vtkIdTypeArray(np.ascontiguousarray(segments[top == slot]).reshape(-1), deep=True))
+            group = vtk.vtkPolyData()
+            group.SetPoints(poly_data.GetPoints())
+            group.SetLines(lines)
+
+            stripper = vtk.vtkStripper()
+            stripper.SetInputData(group)
+            stripper.JoinContiguousSegmentsOn()
+            decimate = vtk.vtkDecimatePolylineFilter()
+            decimate.SetInputConnection(stripper.GetOutputPort())
+            decimate.SetTargetReduction(self.decimation)
+            decimate.SetMaximumError(0.5 * pixel)
+            decimate.Update()
+
+            out = vtk.vtkPolyData()
+            out.ShallowCopy(decimate.GetOutput())
+            colors = numpy_support.numpy_to_vtk(np.tile(table[slot, :3], (out.GetNumberOfCells(), 1)), deep=True)
+            colors.SetName("Colors")
+            out.GetCellData().SetScalars(colors)
+            append.AddInputData(out)
+        append.Update()
+        result = vtk.vtkPolyData()
+        result.ShallowCopy(append.GetOutput())
+        return result
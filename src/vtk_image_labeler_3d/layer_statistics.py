@@ -0,0 +1,89 @@
+"""
+Voxel count, physical volume, bounding box and centroid of a label layer.
+
+All four follow from the per-slice nonzero counts that ``SliceOccupancy``
+already maintains from edit deltas: the count is their sum, the bounding
+box is the first/last labeled slice on each axis and each centroid
+coordinate is the count-weighted mean slice index. Deriving them is
+therefore O(number of slices) and never reads voxels.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+Extent = Tuple[int, int, int, int, int, int]
+
+
+class LayerStatistics:
+    def __init__(self, voxel_count: int, voxel_volume_mm3: float, extent: Optional[Extent],
+                 centroid_index=None, centroid_world=None):
+        self.voxel_count = int(voxel_count)
+        self.voxel_volume_mm3 = float(voxel_volume_mm3)
+        # labeled bounding box as an inclusive VTK extent, None when empty
+        self.extent = extent
+        self.centroid_index = centroid_index
+        self.centroid_world = centroid_world
+
+    @property
+    def volume_mm3(self) -> float:
+        return self.voxel_count * self.voxel_volume_mm3
+
+    @property
+    def volume_ml(self) -> float:
+        return self.volume_mm3 / 1000.0
+
+    def is_empty(self) -> bool:
+        return self.voxel_count == 0
+
+    def crop_extent(self, margin: int = 0, whole_extent: Optional[Extent] = None) -> Optional[Extent]:
+        """Bounding extent grown by ``margin`` voxels and clipped to ``whole_extent``; None when empty."""
+        if self.extent is None:
+            return None
+        m = int(margin)
+        e = [self.extent[i] - m if i % 2 == 0 else self.extent[i] + m for i in range(6)]
+        if whole_extent is not None:
+            e = [max(e[i], whole_extent[i]) if i % 2 == 0 else min(e[i], whole_extent[i]) for i in range(6)]
+        return tuple(int(v) for v in e)
+
+    def summary(self) -> str:
+        if self.is_empty():
+            return "Empty"
+        e = self.extent
+        c = self.centroid_world
+        return (
+            f"Voxels: {self.voxel_count:,}  Volume: {self.volume_ml:.2f} mL\n"
+            f"Extent: x {e[0]}-{e[1]}, y {e[2]}-{e[3]}, z {e[4]}-{e[5]}\n"
+            f"Centroid: ({c[0]:.1f}, {c[1]:.1f}, {c[2]:.1f}) mm"
+        )
+
+    def __str__(self):
+        return self.summary()
+
+
+def from_occupancy(occupancy, vtk_image) -> LayerStatistics:
+    """Statistics of a layer from its slice occupancy and its image geometry."""
+    spacing = np.abs(np.array(vtk_image.GetSpacing(), dtype=np.float64))
+    voxel_volume = float(np.prod(spacing))
+
+    total = occupancy.voxel_count()
+    if total == 0:
+        return LayerStatistics(0, voxel_volume, None)
+
+    whole = occupancy.whole_extent
+    extent = []
+    centroid = np.zeros(3, dtype=np.float64)
+    for axis in (0, 1, 2):
+        counts = occupancy.counts(axis)
+        first, last = occupancy.labeled_range(axis)
+        extent += [first, last]
+        index = np.arange(whole[2 * axis], whole[2 * axis + 1] + 1, dtype=np.float64)
+        centroid[axis] = float(np.dot(index, counts)) / total
+
+    import vtk_image_wrapper
+    w_H_I = vtk_image_wrapper.vtk_image_wrapper(vtk_image).get_w_H_I()
+    centroid_world = (w_H_I @ np.append(centroid, 1.0))[:3]
+
+    return LayerStatistics(total, voxel_volume, tuple(extent), centroid, centroid_world)
@@ -59,6 +59,12 @@ def _info(msg):
 
 def _err(msg):
     logger.error(msg)
+
+def quiet_vtk_logging():
+    """Show only VTK warnings and errors on stderr; call once at startup."""
+    # vtkSurfaceNets2D/3D (label borders, batch surfaces) log every execution at INFO level
+    import vtk
+    vtk.vtkLogger.SetStderrVerbosity(vtk.vtkLogger.VERBOSITY_WARNING)
    
 # Example usage:
 if __name__ == "__main__":
@@ -8,9 +8,9 @@ from PyQt5.QtWidgets import (
     QFileDialog, QVBoxLayout, QSlider, QPushButton, QLabel, QWidget, QMenuBar, QAction, QToolBar, QDockWidget, QListWidget, QHBoxLayout, QPushButton, QCheckBox, QLineEdit
 )
 from PyQt5.QtWidgets import QWidget, QHBoxLayout, QCheckBox, QLabel, QListWidgetItem, QColorDialog
-from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QPen, QIcon
+from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QPen, QIcon, QKeySequence
 
-from logger import logger, _info, _err
+from logger import logger, _info, _err, quiet_vtk_logging
 from ui_icons import apply_icon
 
 def _iconize_action(action):
@@ -19,6 +19,8 @@ def _iconize_action(action):
     return action
 
 import viewer3d
+import orientation
+import surface_jobs
 
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 import os
@@ -196,6 +198,11 @@ class MainWindow3D(QMainWindow):
         self.status_bar = self.statusBar()
         self.status_bar.showMessage("Ready")  # Initial message
 
+        # the 3D surface job queue has its own permanent field, so it does not replace other messages
+        self.surface_jobs_label = QLabel(self)
+        self.status_bar.addPermanentWidget(self.surface_jobs_label)
+        surface_jobs.get_surface_job_pool().stats_changed.connect(self.on_surface_jobs_changed)
+
         # Restore window / dock / toolbar layout from last session
         if not self._restore_ui_layout():
             self.segmentation_list_dock_widget.show()
@@ -230,8 +237,8 @@ class MainWindow3D(QMainWindow):
     def on_segmentation_layer_added(self, layer_name, sender):
         self.vtk_viewer.on_segmentation_layer_added(layer_name, sender)
 
-    def on_segmentation_image_modified(self, layer, sender):
-        self.vtk_viewer.on_segmentation_image_modified(layer, sender)
+    def on_segmentation_image_modified(self, layer, sender, dirty_extent=None):
+        self.vtk_viewer.on_segmentation_image_modified(layer, sender, dirty_extent)
 
     def on_segmentation_layer_removed(self, layer_name, sender):
         self.vtk_viewer.on_segmentation_layer_removed(layer_name, sender)
@@ -399,6 +406,9 @@ class MainWindow3D(QMainWindow):
     def print_status(self, msg):
         self.status_bar.showMessage(msg)
 
+    def on_surface_jobs_changed(self):
+        self.surface_jobs_label.setText(surface_jobs.get_surface_job_pool().status_text())
+
 
     def create_menu(self):
         # Create a menu bar
@@ -421,19 +431,58 @@ class MainWindow3D(QMainWindow):
         self.create_help_menu(help_menu)
 
     def create_edit_menu(self, edit_menu):
+        self.undo_action = _iconize_action(QAction("Undo", self))
+        self.undo_action.setShortcut(QKeySequence.Undo)
+        self.undo_action.triggered.connect(self.undo_clicked)
+        edit_menu.addAction(self.undo_action)
+
+        self.redo_action = _iconize_action(QAction("Redo", self))
+        self.redo_action.setShortcut(QKeySequence("Ctrl+Y"))
+        self.redo_action.triggered.connect(self.redo_clicked)
+        edit_menu.addAction(self.redo_action)
+
+        edit_menu.aboutToShow.connect(self.update_undo_redo_actions)
+        edit_menu.addSeparator()
+
         preferences_action = _iconize_action(QAction("Preferences...", self))
         preferences_action.triggered.connect(self.open_preferences)
         edit_menu.addAction(preferences_action)
 
+    def undo_clicked(self):
+        self.segmentation_list_manager.undo()
+
+    def redo_clicked(self):
+        self.segmentation_list_manager.redo()
+
+    def update_undo_redo_actions(self):
+        stack = self.segmentation_list_manager.undo_stack
+        undo_label = stack.undo_label()
+        redo_label = stack.redo_label()
+        self.undo_action.setText(f"Undo {undo_label}" if undo_label else "Undo")
+        self.redo_action.setText(f"Redo {redo_label}" if redo_label else "Redo")
+
     def open_preferences(self):
         from preferences_dialog import PreferencesDialog
-        dlg = PreferencesDialog(self)
+        dlg = PreferencesDialog(
+            self,
+            paint_latency=self.segmentation_list_manager.get_paint_latency_stats(),
+            slice_cache=str(self.vtk_viewer.slice_cache),
+        )
         if dlg.exec_() != dlg.Accepted:
             return
         # Refresh UI that reads settings at construction time
         mgr = getattr(self, "nnunet_client_manager", None)
         if mgr is not None and hasattr(mgr, "apply_settings_from_config"):
             mgr.apply_settings_from_config()
+        self.segmentation_list_manager.apply_undo_settings_from_config()
+        self.segmentation_list_manager.apply_paint_settings_from_config()
+        self.segmentation_list_manager.apply_labelmap_settings_from_config()
+        self.vtk_viewer.apply_slice_cache_settings_from_config()
+        self.vtk_viewer.apply_border_settings_from_config()
+        self.vtk_viewer.apply_surface_settings_from_config()
+        from config import get_config
+        if get_config().get("sparse_hidden_layers", False):
+            self.segmentation_list_manager.compact_hidden_layers()
 
     def create_help_menu(self, help_menu):
         check_updates_action = _iconize_action(QAction("Check for Updates...", self))
@@ -772,112 +821,36 @@ class MainWindow3D(QMainWindow):
 
 
     def rotate_plus_90_clicked(self):
-        
-        if self.vtk_image is None:
-            self.show_popup("Error", "Open an image first.")
-            return 
-
-        # Get image properties
-        # dims = self.vtk_image.GetDimensions()
-        # spacing = self.vtk_image.GetSpacing()
-        # original_origin = self.vtk_image.GetOrigin()
-        # direction = self.vtk_image.GetDirectionMatrix()
-        # print('dims: ', dims)
-        # print('spacing: ', spacing)
-        # print('original_origin: ', original_origin)
-        # print('direction: ', direction)
-
-        # to itk image
-        from itkvtk import vtk_to_sitk, sitk_to_vtk
-        sitk_image = vtk_to_sitk(self.vtk_image)
-
-        # rot 90
-        from itk_tools import rot90
-        sitk_image_rotated = rot90(sitk_image, plus=True)
-
-        # back to vtk image
-        self.vtk_image = sitk_to_vtk(sitk_image_rotated)
-
-       # Get image properties
-        # dims = self.vtk_image.GetDimensions()
-        # spacing = self.vtk_image.GetSpacing()
-        # original_origin = self.vtk_image.GetOrigin()
-        # direction = self.vtk_image.GetDirectionMatrix()
-        # print('dims: ', dims)
-        # print('spacing: ', spacing)
-        # print('original_origin: ', original_origin)
-        # print('direction: ', direction)
-
-        # set image
-        self.vtk_viewer.set_vtk_image(self.vtk_image, self.range_slider.get_width()/4, self.range_slider.get_center())
-        
-        self.vtk_viewer.render()
+        self.reorient_image(orientation.ROTATE_PLUS_90)
 
     def rotate_minus_90_clicked(self):
-        
-        if self.vtk_image is None:
-            self.show_popup("Error", "Open an image first.")
-            return 
-
-        # to itk image
-        from itkvtk import vtk_to_sitk, sitk_to_vtk
-        sitk_image = vtk_to_sitk(self.vtk_image)
-
-        # rot 90
-        from itk_tools import rot90
-        sitk_image_rotated = rot90(sitk_image, plus=False)
-
-        # back to vtk image
-        self.vtk_image = sitk_to_vtk(sitk_image_rotated)
-
-        # set image
-        self.vtk_viewer.set_vtk_image(self.vtk_image, self.range_slider.get_width()/4, self.range_slider.get_center())
-        
-        self.vtk_viewer.render()
+        self.reorient_image(orientation.ROTATE_MINUS_90)
 
     def flip_x_clicked(self):
-        
-        if self.vtk_image is None:
-            self.show_popup("Error", "Open an image first.")
-            return 
-
-        # to itk image
-        from itkvtk import vtk_to_sitk, sitk_to_vtk
-        sitk_image = vtk_to_sitk(self.vtk_image)
-
-        # rot 90
-        from itk_tools import flip_x
-        sitk_image_flipped = flip_x(sitk_image)
-
-        # back to vtk image
-        self.vtk_image = sitk_to_vtk(sitk_image_flipped)
-
-        # set image
-        self.vtk_viewer.set_vtk_image(self.vtk_image, self.range_slider.get_width()/4, self.range_slider.get_center())
-        
-        self.vtk_viewer.render()
-
+        self.reorient_image(orientation.FLIP_X)
 
     def flip_y_clicked(self):
-        
+        self.reorient_image(orientation.FLIP_Y)
+
+    def reorient_image(self, operation):
+        """
+        Rotate or flip the image and every segmentation layer in place (one
+        copy per volume, see orientation.py) and rebind the viewers to the
+        new geometry.
+        """
         if self.vtk_image is None:
             self.show_popup("Error", "Open an image first.")
-            return 
+            return
 
-        # to itk image
-        from itkvtk import vtk_to_sitk, sitk_to_vtk
-        sitk_image = vtk_to_sitk(self.vtk_image)
+        orientation.reorient_image(self.vtk_image, operation)
+        layers = self.segmentation_list_manager.reorient_layers(operation)
 
-        # rot 90
-        from itk_tools import flip_y
-        sitk_image_flipped = flip_y(sitk_image)
+        self.vtk_viewer.rebind_vtk_image()
 
-        # back to vtk image
-        self.vtk_image = sitk_to_vtk(sitk_image_flipped)
+        # overlays and surfaces pick up the reoriented layers
+        for layer in layers:
+            layer.image_changed.emit(layer, None)
 
-        # set image
-        self.vtk_viewer.set_vtk_image(self.vtk_image, self.range_slider.get_width()/4, self.range_slider.get_center())
-        
         self.vtk_viewer.render()
 
     def update_window_level(self):
@@ -1455,6 +1428,7 @@ if __name__ == "__main__":
     import sys
     
     _info("Application started")
+    quiet_vtk_logging()
 
     app = QApplication(sys.argv)
     
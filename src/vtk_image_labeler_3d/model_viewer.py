@@ -5,6 +5,12 @@ from vtk.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
 from PyQt5.QtWidgets import (QVBoxLayout, QWidget)
 
 from logger import logger, _info
+import render_scheduler
+import surface_batch
+import surface_jobs
+import surface_lod
+import volume_render
+from config import get_config
 
 import numpy as np
 
@@ -59,16 +65,30 @@ class ModelViewer(QWidget):
         self._image_boundary_model = None
 
 
-        # delayed rendering
-        from PyQt5.QtCore import QTimer
-        self.render_timer = QTimer()
-        self.render_timer.setSingleShot(True)
-        self.render_timer.timeout.connect(self._on_render_timer_timedout)
+        # renders go through the application-wide scheduler (one render per view per frame)
+        self.render_scheduler = render_scheduler.get_render_scheduler()
 
         # contour surface update timer
+        from PyQt5.QtCore import QTimer
         self.surface_update_timer = QTimer()
         self.surface_update_timer.setSingleShot(True)
         self.surface_update_timer.timeout.connect(self._on_surface_update_timer_timeout)
+        self.pending_layers = {}  # id(layer) -> (layer, accumulated dirty extent or None)
+
+        # surfaces are contoured in the application-wide job pool
+        self.surface_job_pool = surface_jobs.get_surface_job_pool()
+
+        # layers added together (opening a workspace) get their first meshes from one labelmap pass
+        self.batch_timer = QTimer()
+        self.batch_timer.setSingleShot(True)
+        self.batch_timer.timeout.connect(self._on_batch_timer_timeout)
+        self._batch_surfaces = []  # surfaces waiting for their first mesh
+        self._surface_batches = set()  # job pool owners of the running batch jobs
+
+        # reduced surface meshes for camera interaction are rebuilt once edits pause
+        self.lod_timer = QTimer()
+        self.lod_timer.setSingleShot(True)
+        self.lod_timer.timeout.connect(self._on_surfaces_settled)
 
         # Create a VTK Renderer
         self.renderer = vtk.vtkRenderer()
@@ -77,6 +97,11 @@ class ModelViewer(QWidget):
         self.renderer.GetActiveCamera().SetParallelProjection(False)
         self.renderer.SetInteractive(True)
 
+        # optional ray-cast rendering of the base image (see volume_render.py)
+        self.volume_rendering = volume_render.VolumeRendering(self.renderer, on_frame=self._on_volume_frame)
+        self._report_volume_frame = False
+        self.volume_pyramid = None
+
         # Create a QVTKRenderWindowInteractor
         self.vtk_widget = QVTKRenderWindowInteractor(self)
         self.render_window = self.vtk_widget.GetRenderWindow()  # Retrieve the render window
@@ -88,6 +113,9 @@ class ModelViewer(QWidget):
         from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
         self.interactor_style = vtkInteractorStyleTrackballCamera()
         self.interactor.SetInteractorStyle(self.interactor_style)
+        # surfaces and the volume rendering show reduced data while the camera moves
+        self.interactor_style.AddObserver("StartInteractionEvent", lambda obj, event: self.set_interacting(True))
+        self.interactor_style.AddObserver("EndInteractionEvent", lambda obj, event: self.set_interacting(False))
 
         # Layout for embedding the VTK widget
         layout = QVBoxLayout()
@@ -103,11 +131,18 @@ class ModelViewer(QWidget):
         self.segmentation_surfaces = SegmentationLayerSurfaceList()
         self.models = ModelList()
 
+        self.apply_volume_settings_from_config()
+
     def clear(self):
         if self._image_boundary_model:
             self.get_renderer().RemoveActor(self._image_boundary_model.get_actor())
+        self.vtk_image = None
+        self.volume_pyramid = None
+        self.volume_rendering.set_image(None)
 
+        self._cancel_surface_batches()
         for surface in self.segmentation_surfaces.get_surfaces():
+            surface.cancel()
             for actor in surface.get_actors():
                 self.get_renderer().RemoveActor(actor)
         self.segmentation_surfaces.clear()
@@ -143,10 +178,12 @@ class ModelViewer(QWidget):
         self.vtk_image = vtk_image
         
         self._image_boundary_model = self._add_image_boundary_surface_model()
+        self.volume_rendering.set_image(vtk_image, self.volume_pyramid)
+        self._update_volume_crop()
         
         self.renderer.ResetCamera()
         
-        self.render_window.Render()
+        self.render()
 
     def add_actor_as_model(self, name, actor):
         model  = SingleActorModel(name, actor)
@@ -167,28 +204,146 @@ class ModelViewer(QWidget):
         self.render()
 
     def render(self):
-        self.render_window.Render()
+        self.render_scheduler.mark_dirty(self)
 
     def render_delayed(self, delayed_render_ms=100):
-        self.render_timer.start(delayed_render_ms)  
+        self.render_scheduler.mark_dirty(self, delayed_render_ms)
 
-    def _on_render_timer_timedout(self):
-        self.render()
+    def render_now(self):
+        self.render_scheduler.render_now(self)
+
+    def enterEvent(self, event):
+        # the view under the cursor renders first
+        self.render_scheduler.set_focus_view(self)
+        super().enterEvent(event)
+
+    def _queue_surface_update(self, layer, dirty_extent):
+        import dirty_region
+        key = id(layer)
+        if key in self.pending_layers:
+            dirty_extent = dirty_region.union(self.pending_layers[key][1], dirty_extent, whole_if_none=True)
+        self.pending_layers[key] = (layer, dirty_extent)
 
     def _on_surface_update_timer_timeout(self):
-        layer_name = self.pending_layer.get_name()
-        print(f'SurfaceViewer: _do_surface_update(layername={layer_name})')
-        seg_surface = self.segmentation_surfaces.get_surface_by_layer_name(layer_name)
-        if seg_surface:
-            seg_surface.update_surface_async()
+        pending = self.pending_layers
+        self.pending_layers = {}
+        for layer, dirty_extent in pending.values():
+            layer_name = layer.get_name()
+            print(f'SurfaceViewer: _do_surface_update(layername={layer_name}, dirty_extent={dirty_extent})')
+            seg_surface = self.segmentation_surfaces.get_surface_by_layer_name(layer_name)
+            if seg_surface:
+                seg_surface.update_surface_async(dirty_extent)
+
+    def _on_batch_timer_timeout(self):
+        current = self.segmentation_surfaces.get_surfaces()
+        surfaces = [s for s in self._batch_surfaces if s in current]
+        self._batch_surfaces = []
+        combined = surface_batch.combine_layers([s.layer for s in surfaces]) if len(surfaces) > 1 else None
+        if combined is None:
+            for surface in surfaces:
+                surface.update_surface_async()
+            return
+
+        by_layer = {id(s.layer): s for s in surfaces}
+        for layer in combined.leftover:
+            by_layer[id(layer)].update_surface_async()
+        # a layer edited before the batch job is done keeps its own (newer) surface
+        targets = {value: (by_layer[id(layer)], by_layer[id(layer)].batch_token()) for value, layer in combined.layers.items()}
+        owner = object()
+        self._surface_batches.add(owner)
+
+        def on_done(meshes):
+            self._surface_batches.discard(owner)
+            current = self.segmentation_surfaces.get_surfaces()
+            for value, (surface, token) in targets.items():
+                if surface in current:
+                    surface.set_batch_surface(meshes[value], combined.frame, token)
+            self.render()
+
+        labels = sorted(targets)
+        self.surface_job_pool.submit(
+            owner,
+            lambda is_cancelled: surface_batch.label_surfaces(combined.volume, combined.frame, labels, is_cancelled),
+            on_done,
+        )
+
+    def _cancel_surface_batches(self):
+        self.batch_timer.stop()
+        self._batch_surfaces = []
+        for owner in self._surface_batches:
+            self.surface_job_pool.cancel(owner)
+        self._surface_batches.clear()
+
+    def _on_surface_mesh_changed(self, surface):
+        self.lod_timer.start(500)
+
+    def update_surface_lods(self):
+        """Share the triangle budget among the visible surfaces and (re)build their LOD meshes."""
+        conf = get_config()
+        budget = int(conf.get("surface_triangle_budget", 300000))
+        smoothing = bool(conf.get("surface_smoothing", False))
+        surfaces = [s for s in self.segmentation_surfaces.get_surfaces() if s.layer.get_visible()]
+        targets = surface_lod.triangle_targets({s: s.triangle_count() for s in surfaces}, budget)
+        for surface in surfaces:
+            surface.request_lod(targets[surface], smoothing)
+
+    def apply_surface_settings_from_config(self):
+        self.update_surface_lods()
+
+    def set_interacting(self, interacting):
+        for surface in self.segmentation_surfaces.get_surfaces():
+            surface.set_interacting(interacting)
+        self.volume_rendering.set_interacting(interacting)
+        if not interacting:
+            # frame times go to the status bar once, after the still frame that ends the interaction
+            self._report_volume_frame = True
+            self.render()
+
+    def _on_surfaces_settled(self):
+        self.update_surface_lods()
+        self._update_volume_crop()
+
+    # ----- volume rendering -----
+
+    def set_volume_pyramid(self, pyramid):
+        """Coarse levels of the base image (volume_pyramid.VolumePyramid) for rendering while the camera moves."""
+        self.volume_pyramid = pyramid
+        if self.vtk_image is not None:
+            self.volume_rendering.set_image(self.vtk_image, pyramid)
+            self.render()
+
+    def apply_volume_settings_from_config(self):
+        conf = get_config()
+        self.volume_rendering.interactive_voxels = int(conf.get("volume_render_interactive_voxels", 128))
+        self.volume_rendering.set_enabled(bool(conf.get("volume_rendering", False)))
+        self._update_volume_crop()
+        self._report_volume_frame = True
+        self.render()
+
+    def _update_volume_crop(self):
+        bounds = None
+        if get_config().get("volume_render_crop_to_labels", True) and self.volume_rendering.enabled:
+            layers = [s.layer for s in self.segmentation_surfaces.get_surfaces() if s.layer.get_visible()]
+            bounds = volume_render.label_bounds(layers)
+        self.volume_rendering.set_crop_bounds(bounds)
+
+    def _on_volume_frame(self):
+        if self._report_volume_frame and not self.volume_rendering.interacting:
+            self._report_volume_frame = False
+            self.status_message.emit(self.volume_rendering.status_text(), self)
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
         if hasattr(self, 'render_window') and self.render_window is not None:
             self.render_window.SetSize(self.width(), self.height())
-            self.render_window.Render()
+            self.render()
 
     def cleanup_vtk(self, event):
+        self.render_scheduler.cancel(self)
+        self._cancel_surface_batches()
+        for surface in self.segmentation_surfaces.get_surfaces():
+            surface.cancel()
+
         if hasattr(self, 'interactor') and self.interactor is not None:
             self.interactor.Disable()
             self.interactor.TerminateApp()
@@ -208,8 +363,11 @@ class ModelViewer(QWidget):
 
         import segmentation_layer_surface
         layer = self.segmentaiton_layers[layer_name]
-        seg_surface = segmentation_layer_surface.SegmentationLayerSurface(layer=layer, renderer=self.get_renderer(), render_window=self.get_render_window())
+        seg_surface = segmentation_layer_surface.SegmentationLayerSurface(layer=layer, renderer=self.get_renderer(), render_window=self.get_render_window(), build=False, on_mesh_changed=self._on_surface_mesh_changed, render=self.render)
         self.segmentation_surfaces.add_surface(seg_surface)
+        self._batch_surfaces.append(seg_surface)
+        self.batch_timer.start(0)
+        self._update_volume_crop()
 
         layer.visibility_changed.connect(self.on_layer_visibility_changed)
         layer.name_changed.connect(self.on_layer_name_changed)
@@ -217,10 +375,10 @@ class ModelViewer(QWidget):
         layer.alpha_changed.connect(self.on_segmentation_layer_alpha_changed)
         layer.image_changed.connect(self.on_layer_image_changed)
 
-    def on_layer_image_changed(self, sender):
+    def on_layer_image_changed(self, sender, dirty_extent=None):
         # Full image replace/clear: update 3D surface promptly (paint still uses
         # the debounced on_segmentation_image_modified path).
-        self.pending_layer = sender
+        self._queue_surface_update(sender, dirty_extent)
         self.surface_update_timer.start(0)
 
     def on_layer_visibility_changed(self, sender): 
@@ -229,7 +387,10 @@ class ModelViewer(QWidget):
         seg_surface = self.segmentation_surfaces.get_surface_by_layer_name(name)
         if seg_surface:
             seg_surface.update_actors()
+            self._update_volume_crop()
             self.render()
+            # the budget is shared among the visible surfaces
+            self.lod_timer.start(500)
 
     def on_layer_name_changed(self, old_layer_name, sender):
         new_layer_name = sender.get_name()
@@ -256,9 +417,10 @@ class ModelViewer(QWidget):
             seg_surface.update_actors()
             self.render_delayed(100)
 
-    def on_segmentation_image_modified(self, layer, sender):
-        self.pending_layer = layer
-        self.surface_update_timer.start(1000)  # wait 1000ms before updating
+    def on_segmentation_image_modified(self, layer, sender, dirty_extent=None):
+        self._queue_surface_update(layer, dirty_extent)
+        # only the bricks the strokes touched are recontoured, so a short pause is enough
+        self.surface_update_timer.start(300)
 
     def on_segmentation_layer_removed(self, layer, sender):
         print(f'SurfaceViewer: on_segmentation_layer_removed(layername={layer.get_name()}')
@@ -266,11 +428,15 @@ class ModelViewer(QWidget):
         seg_surface = self.segmentation_surfaces.pop(layer.get_name())
         if seg_surface is None:
             return 
+
+        seg_surface.cancel()
         
         for actor in seg_surface.get_actors():
             if actor:
                 self.get_renderer().RemoveActor(actor)
 
-        self.render()     
+        self._update_volume_crop()
+        self.render()
+        self.lod_timer.start(500)     
 
 
@@ -1323,6 +1323,9 @@ class nnUNetDatasetManager(BaseObject):
           integer as the pixel value in the combined label image.
         - Layers whose names are not in dataset.json are omitted from the
           server upload (Save Workspace still stores them locally).
+        - If all matching layers are labels of one shared labelmap, that
+          labelmap is uploaded as is (or relabeled in one pass) instead of
+          combining per-layer masks.
         """
         vtk_image = self.segmentation_list_manager.get_base_vtk_image()
         if vtk_image is None:
@@ -1333,7 +1336,7 @@ class nnUNetDatasetManager(BaseObject):
         if warn_unmatched:
             self._warn_unmatched_layers_not_saved_to_server(unmatched)
 
-        vtk_label_image_list = []
+        matched_layers = []
         label_values = []
         for name, pixel_value in label_name_to_value.items():
             layer = self._find_layer_by_label_name(name)
@@ -1342,13 +1345,20 @@ class nnUNetDatasetManager(BaseObject):
                     f"Warning: dataset.json label '{name}'={pixel_value} has no matching layer; treated as empty."
                 )
                 continue
-            vtk_label_image_list.append(layer.get_image())
+            matched_layers.append(layer)
             label_values.append(pixel_value)
 
         from itkvtk import vtk_to_sitk
         from itk_tools import combine_sitk_labels, save_sitk_image
 
-        if vtk_label_image_list:
+        labelmaps = {id(layer.get_labelmap()): layer.get_labelmap() for layer in matched_layers}
+        if len(labelmaps) == 1 and None not in labelmaps.values():
+            # the layers already share one labelmap: map label values to dataset ids
+            labelmap = next(iter(labelmaps.values()))
+            mapping = {layer.get_label_value(): value for layer, value in zip(matched_layers, label_values)}
+            sitk_labels = vtk_to_sitk(labelmap.export_labels(mapping))
+        elif matched_layers:
+            vtk_label_image_list = [layer.read_image() for layer in matched_layers]
             sitk_label_list = [vtk_to_sitk(vtk_label) for vtk_label in vtk_label_image_list]
             sitk_labels = combine_sitk_labels(sitk_label_list, label_values)
         else:
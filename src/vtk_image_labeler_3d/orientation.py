@@ -0,0 +1,68 @@
+"""
+Rotations and flips of a volume in its axial (x, y) plane.
+
+An operation is a NumPy view of the (z, y, x[, c]) voxel array, so applying
+it costs one materializing copy into the new scalar array. ``reorient_image``
+rewrites a vtkImageData in place (dimensions, spacing, scalars): readers,
+reslicers and mappers bound to the image object stay valid and only need to
+pick up its new geometry. Origin and direction are kept, as the SimpleITK
+based itk_tools.rot90/flip did.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from vtk.util import numpy_support
+
+ROTATE_PLUS_90 = "rot_plus_90"  # x axis to y
+ROTATE_MINUS_90 = "rot_minus_90"  # y axis to x
+FLIP_X = "flip_x"
+FLIP_Y = "flip_y"
+
+OPERATIONS = (ROTATE_PLUS_90, ROTATE_MINUS_90, FLIP_X, FLIP_Y)
+
+
+def oriented_view(volume: np.ndarray, operation: str) -> np.ndarray:
+    """View of a (z, y, x[, c]) array with ``operation`` applied (no copy)."""
+    if operation == ROTATE_PLUS_90:
+        return np.rot90(volume, k=-1, axes=(1, 2))
+    if operation == ROTATE_MINUS_90:
+        return np.rot90(volume, k=1, axes=(1, 2))
+    if operation == FLIP_X:
+        return np.flip(volume, 2)
+    if operation == FLIP_Y:
+        return np.flip(volume, 1)
+    raise ValueError(f"Unknown orientation operation: {operation}")
+
+
+def swaps_xy(operation: str) -> bool:
+    return operation in (ROTATE_PLUS_90, ROTATE_MINUS_90)
+
+
+def reorient_geometry(image, operation: str) -> None:
+    """Set the dimensions and spacing ``operation`` gives ``image``; the extent start is kept."""
+    x0, x1, y0, y1, z0, z1 = image.GetExtent()
+    sx, sy, sz = image.GetSpacing()
+    if swaps_xy(operation):
+        image.SetExtent(x0, x0 + (y1 - y0), y0, y0 + (x1 - x0), z0, z1)
+        image.SetSpacing(sy, sx, sz)
+
+
+def reorient_image(image, operation: str) -> None:
+    """Apply ``operation`` to the voxels and geometry of a vtkImageData, in place."""
+    scalars = image.GetPointData().GetScalars()
+    components = scalars.GetNumberOfComponents()
+    dims = image.GetDimensions()
+    volume = numpy_support.vtk_to_numpy(scalars).reshape(dims[::-1] + (components,))
+    view = oriented_view(volume, operation)
+
+    out = numpy_support.create_vtk_array(scalars.GetDataType())
+    out.SetNumberOfComponents(components)
+    out.SetNumberOfTuples(scalars.GetNumberOfTuples())
+    if scalars.GetName():
+        out.SetName(scalars.GetName())
+    np.copyto(numpy_support.vtk_to_numpy(out).reshape(view.shape), view)
+
+    reorient_geometry(image, operation)
+    image.GetPointData().SetScalars(out)
+    image.Modified()
@@ -0,0 +1,94 @@
+"""Frame-paced application of queued paint dabs, with input-to-photon latency stats."""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+
+import numpy as np
+from PyQt5.QtCore import QObject, QTimer
+
+# ~60 Hz display frame
+FRAME_INTERVAL_MS = 16
+
+
+class LatencyStats:
+    """Rolling window of latency samples in milliseconds."""
+
+    def __init__(self, window: int = 512):
+        self._samples = deque(maxlen=window)
+        self.total_count = 0
+
+    def add(self, ms: float) -> None:
+        self._samples.append(float(ms))
+        self.total_count += 1
+
+    def reset(self) -> None:
+        self._samples.clear()
+        self.total_count = 0
+
+    def summary(self) -> dict:
+        if not self._samples:
+            return {"count": 0, "mean_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        arr = np.fromiter(self._samples, dtype=np.float64)
+        return {
+            "count": int(arr.size),
+            "mean_ms": float(arr.mean()),
+            "p95_ms": float(np.percentile(arr, 95)),
+            "max_ms": float(arr.max()),
+        }
+
+    def __str__(self):
+        s = self.summary()
+        return f"n={s['count']} mean={s['mean_ms']:.1f}ms p95={s['p95_ms']:.1f}ms max={s['max_ms']:.1f}ms"
+
+
+class PaintLoop(QObject):
+    """
+    Queue of paint dabs applied once per display frame.
+
+    Mouse events only ``queue()`` a dab; the first dab of a frame arms a
+    single-shot timer, and when it fires every pending dab is handed to
+    ``apply_batch(dabs)`` in one call. ``apply_batch`` returns a callable
+    that renders the affected views (or None); latency is measured from each
+    dab's queue time to the end of that render.
+    """
+
+    def __init__(self, apply_batch, interval_ms: int = FRAME_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self._apply_batch = apply_batch
+        self._pending = []
+        self.interval_ms = int(interval_ms)
+        self.latency = LatencyStats()
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+
+    def has_pending(self) -> bool:
+        return len(self._pending) > 0
+
+    def queue(self, dab) -> None:
+        self._pending.append((time.perf_counter(), dab))
+        if not self._timer.isActive():
+            self._timer.start(self.interval_ms)
+
+    def flush(self) -> None:
+        """Apply all pending dabs now (also called on button release)."""
+        self._timer.stop()
+        if not self._pending:
+            return
+        pending = self._pending
+        self._pending = []
+
+        render = self._apply_batch([dab for _, dab in pending])
+        if render is not None:
+            render()
+
+        now = time.perf_counter()
+        for t_queued, _ in pending:
+            self.latency.add((now - t_queued) * 1000.0)
+
+    def clear(self) -> None:
+        self._timer.stop()
+        self._pending = []
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
+    QCheckBox,
     QDialog,
     QDialogButtonBox,
     QFormLayout,
@@ -12,6 +13,7 @@ from PyQt5.QtWidgets import (
     QLineEdit,
     QMessageBox,
     QPushButton,
+    QSpinBox,
     QVBoxLayout,
     QFileDialog,
 )
@@ -19,8 +21,16 @@ from PyQt5.QtWidgets import (
 from config import get_config, save_settings, settings_path
 
 
+def _latency_text(summary) -> str:
+    """One line for a paint_loop.LatencyStats.summary()."""
+    if not summary or not summary["count"]:
+        return "Measured latency: no strokes yet"
+    return (f"Measured latency: mean {summary['mean_ms']:.1f} ms, p95 {summary['p95_ms']:.1f} ms, "
+            f"max {summary['max_ms']:.1f} ms ({summary['count']} dabs)")
+
+
 class PreferencesDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, paint_latency=None, slice_cache=None):
         super().__init__(parent)
         self.setWindowTitle("Preferences")
         self.setMinimumWidth(560)
@@ -40,6 +50,57 @@ class PreferencesDialog(QDialog):
         self.feedback_api_url_edit = QLineEdit(str(conf.get("feedback_api_url", "")))
         self.feedback_api_key_edit = QLineEdit(str(conf.get("feedback_api_key", "")))
         self.feedback_api_key_edit.setEchoMode(QLineEdit.Password)
+        self.undo_budget_spin = QSpinBox()
+        self.undo_budget_spin.setRange(0, 65536)
+        self.undo_budget_spin.setSuffix(" MB")
+        self.undo_budget_spin.setValue(int(conf.get("undo_memory_budget_mb", 256)))
+        self.undo_steps_spin = QSpinBox()
+        self.undo_steps_spin.setRange(1, 10000)
+        self.undo_steps_spin.setValue(int(conf.get("undo_max_steps", 100)))
+        self.sparse_hidden_layers_check = QCheckBox("Store hidden segmentation layers sparsely")
+        self.sparse_hidden_layers_check.setChecked(bool(conf.get("sparse_hidden_layers", False)))
+        self.shared_labelmap_check = QCheckBox("Create new layers in one shared labelmap (mutually exclusive)")
+        self.shared_labelmap_check.setChecked(bool(conf.get("shared_labelmap", False)))
+        self.labelmap_protect_check = QCheckBox("Painting keeps other labels (instead of overwriting them)")
+        self.labelmap_protect_check.setChecked(bool(conf.get("labelmap_protect_labels", False)))
+        self.paint_interval_spin = QSpinBox()
+        self.paint_interval_spin.setRange(1, 200)
+        self.paint_interval_spin.setSuffix(" ms")
+        self.paint_interval_spin.setValue(int(conf.get("paint_frame_interval_ms", 16)))
+        # input-to-photon latency of painting so far, to tune the interval against
+        self.paint_latency_label = QLabel(_latency_text(paint_latency))
+        self.paint_latency_label.setStyleSheet("color: #666; font-size: 11px;")
+        self.slice_cache_spin = QSpinBox()
+        self.slice_cache_spin.setRange(0, 65536)
+        self.slice_cache_spin.setSuffix(" MB")
+        self.slice_cache_spin.setValue(int(conf.get("slice_cache_mb", 256)))
+        # hit rate and memory use of the slice cache so far (str(SliceCache))
+        self.slice_cache_label = QLabel(f"Cache use: {slice_cache}" if slice_cache else "Cache use: no slices yet")
+        self.slice_cache_label.setStyleSheet("color: #666; font-size: 11px;")
+        self.slice_prefetch_spin = QSpinBox()
+        self.slice_prefetch_spin.setRange(0, 256)
+        self.slice_prefetch_spin.setSuffix(" slices")
+        self.slice_prefetch_spin.setValue(int(conf.get("slice_prefetch_count", 8)))
+        self.border_decimation_spin = QSpinBox()
+        self.border_decimation_spin.setRange(0, 95)
+        self.border_decimation_spin.setSuffix(" %")
+        self.border_decimation_spin.setValue(int(conf.get("border_decimation_percent", 0)))
+        self.surface_budget_spin = QSpinBox()
+        self.surface_budget_spin.setRange(0, 100000000)
+        self.surface_budget_spin.setSingleStep(50000)
+        self.surface_budget_spin.setSuffix(" triangles")
+        self.surface_budget_spin.setSpecialValueText("Full resolution")
+        self.surface_budget_spin.setValue(int(conf.get("surface_triangle_budget", 300000)))
+        self.surface_smoothing_check = QCheckBox("Smooth 3D surfaces")
+        self.surface_smoothing_check.setChecked(bool(conf.get("surface_smoothing", False)))
+        self.volume_rendering_check = QCheckBox("Volume render the image in the 3D view (CPU)")
+        self.volume_rendering_check.setChecked(bool(conf.get("volume_rendering", False)))
+        self.volume_interactive_spin = QSpinBox()
+        self.volume_interactive_spin.setRange(16, 4096)
+        self.volume_interactive_spin.setSuffix(" voxels per axis")
+        self.volume_interactive_spin.setValue(int(conf.get("volume_render_interactive_voxels", 128)))
+        self.volume_crop_check = QCheckBox("Crop the volume rendering to the labeled region")
+        self.volume_crop_check.setChecked(bool(conf.get("volume_render_crop_to_labels", True)))
 
         form.addRow("Log directory:", self._path_row(self.log_dir_edit))
         form.addRow("Temp directory:", self._path_row(self.temp_dir_edit))
@@ -49,6 +110,22 @@ class PreferencesDialog(QDialog):
         form.addRow("Registration URL:", self.registration_url_edit)
         form.addRow("Feedback API URL:", self.feedback_api_url_edit)
         form.addRow("Feedback API key:", self.feedback_api_key_edit)
+        form.addRow("Undo memory budget:", self.undo_budget_spin)
+        form.addRow("Undo steps:", self.undo_steps_spin)
+        form.addRow("Memory:", self.sparse_hidden_layers_check)
+        form.addRow("Labelmap:", self.shared_labelmap_check)
+        form.addRow("", self.labelmap_protect_check)
+        form.addRow("Paint frame interval:", self.paint_interval_spin)
+        form.addRow("", self.paint_latency_label)
+        form.addRow("Slice cache:", self.slice_cache_spin)
+        form.addRow("", self.slice_cache_label)
+        form.addRow("Slice prefetch:", self.slice_prefetch_spin)
+        form.addRow("Border simplification:", self.border_decimation_spin)
+        form.addRow("3D triangles while rotating:", self.surface_budget_spin)
+        form.addRow("", self.surface_smoothing_check)
+        form.addRow("Volume rendering:", self.volume_rendering_check)
+        form.addRow("Volume while rotating:", self.volume_interactive_spin)
+        form.addRow("", self.volume_crop_check)
 
         path_label = QLabel(f"Settings file: {settings_path()}")
         path_label.setWordWrap(True)
@@ -56,7 +133,7 @@ class PreferencesDialog(QDialog):
 
         note = QLabel(
             "Log/temp directory changes take effect after restart. "
-            "Server, Keycloak, and Feedback API settings apply immediately. "
+            "Server, Keycloak, Feedback API, and undo settings apply immediately. "
             "Feedback API URL is the CapRover origin only (no path)."
         )
         note.setWordWrap(True)
@@ -98,6 +175,20 @@ class PreferencesDialog(QDialog):
             "keycloak_registration_url": self.registration_url_edit.text().strip(),
             "feedback_api_url": self.feedback_api_url_edit.text().strip().rstrip("/"),
             "feedback_api_key": self.feedback_api_key_edit.text().strip(),
+            "undo_memory_budget_mb": self.undo_budget_spin.value(),
+            "undo_max_steps": self.undo_steps_spin.value(),
+            "sparse_hidden_layers": self.sparse_hidden_layers_check.isChecked(),
+            "shared_labelmap": self.shared_labelmap_check.isChecked(),
+            "labelmap_protect_labels": self.labelmap_protect_check.isChecked(),
+            "paint_frame_interval_ms": self.paint_interval_spin.value(),
+            "slice_cache_mb": self.slice_cache_spin.value(),
+            "slice_prefetch_count": self.slice_prefetch_spin.value(),
+            "border_decimation_percent": self.border_decimation_spin.value(),
+            "surface_triangle_budget": self.surface_budget_spin.value(),
+            "surface_smoothing": self.surface_smoothing_check.isChecked(),
+            "volume_rendering": self.volume_rendering_check.isChecked(),
+            "volume_render_interactive_voxels": self.volume_interactive_spin.value(),
+            "volume_render_crop_to_labels": self.volume_crop_check.isChecked(),
         }
 
     def accept(self):
@@ -0,0 +1,124 @@
+"""
+One render loop for all views of the application.
+
+Views do not render themselves; they mark themselves dirty, optionally not
+before a delay (``render_delayed``). Once per display frame the scheduler
+renders every due view at most once: the view under the cursor first, then
+active views, then the rest in due order, and it stops when the frame time
+budget is used up (views left over render on the next frame). Render times
+are recorded per view as paint_loop.LatencyStats.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Dict, Optional
+
+from PyQt5.QtCore import QObject, QTimer
+
+from paint_loop import FRAME_INTERVAL_MS, LatencyStats
+
+# time spent rendering per frame before further views wait for the next one
+FRAME_BUDGET_MS = 12.0
+
+
+class RenderScheduler(QObject):
+    def __init__(self, interval_ms: int = FRAME_INTERVAL_MS, budget_ms: float = FRAME_BUDGET_MS, parent=None):
+        super().__init__(parent)
+        self.interval_ms = int(interval_ms)
+        self.budget_ms = float(budget_ms)
+        self.focus_view = None  # view under the cursor
+        self.timings: Dict[str, LatencyStats] = {}
+
+        self._due: Dict[object, float] = {}  # view -> perf_counter time it may render at
+        self._last_frame = 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.run_frame)
+
+    # ----- requests -----
+
+    def mark_dirty(self, view, delay_ms: float = 0) -> None:
+        """Render ``view`` on the first frame at least ``delay_ms`` from now (earlier requests win)."""
+        due = time.perf_counter() + delay_ms / 1000.0
+        current = self._due.get(view)
+        if current is None or due < current:
+            self._due[view] = due
+        self._arm()
+
+    def cancel(self, view) -> None:
+        self._due.pop(view, None)
+        if self.focus_view is view:
+            self.focus_view = None
+
+    def is_dirty(self, view) -> bool:
+        return view in self._due
+
+    def set_focus_view(self, view) -> None:
+        self.focus_view = view
+
+    # ----- rendering -----
+
+    def render_now(self, view) -> None:
+        """Render ``view`` immediately (e.g. at the end of a paint batch); clears its dirty mark."""
+        self._due.pop(view, None)
+        window = getattr(view, "render_window", None)
+        if window is None:
+            return
+        start = time.perf_counter()
+        window.Render()
+        name = getattr(view, "name", None) or type(view).__name__
+        self.timings.setdefault(name, LatencyStats()).add((time.perf_counter() - start) * 1000.0)
+
+    def _order(self, views):
+        def priority(view):
+            if view is self.focus_view:
+                return (0, 0.0)
+            return (1 if getattr(view, "active", False) else 2, self._due[view])
+        return sorted(views, key=priority)
+
+    def run_frame(self) -> None:
+        """Render the due views, most important first, within the frame budget."""
+        self._timer.stop()
+        start = time.perf_counter()
+        self._last_frame = start
+        due = [view for view, t in self._due.items() if t <= start]
+        for i, view in enumerate(self._order(due)):
+            if i > 0 and (time.perf_counter() - start) * 1000.0 >= self.budget_ms:
+                break
+            self.render_now(view)
+        self._arm()
+
+    def flush(self) -> None:
+        """Render every dirty view now, ignoring delays and the budget."""
+        self._timer.stop()
+        for view in self._order(list(self._due)):
+            self.render_now(view)
+
+    def _arm(self) -> None:
+        if not self._due:
+            self._timer.stop()
+            return
+        now = time.perf_counter()
+        # next frame: no sooner than one interval after the last one
+        at = max(min(self._due.values()), self._last_frame + self.interval_ms / 1000.0)
+        ms = max(int((at - now) * 1000.0 + 0.5), 0)
+        if not self._timer.isActive() or self._timer.remainingTime() > ms:
+            self._timer.start(ms)
+
+    # ----- stats -----
+
+    def timing_summary(self) -> Dict[str, dict]:
+        """Per-view render times (see LatencyStats.summary())."""
+        return {name: stats.summary() for name, stats in self.timings.items()}
+
+
+_scheduler: Optional[RenderScheduler] = None
+
+
+def get_render_scheduler() -> RenderScheduler:
+    """The application-wide scheduler (created on first use, after the QApplication)."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RenderScheduler()
+    return _scheduler
@@ -162,13 +162,25 @@ class Reslicer():
 
         self.slice_index = 0
 
+        # axis-aligned slices are cut out of the volume array directly
+        self.fast_path_enabled = True
+        self._plan_key = None
+        self._plan = None
+        self._fast_slice = vtk.vtkImageData()
+        self._fast_slice_array = None
+
     def clear(self):
         self.vtk_image = None
         self.slice_index = 0
+        self._plan_key = None
+        self._plan = None
+        self._fast_slice_array = None
         
     def set_vtk_image(self, vtk_image):
         self.vtk_image = vtk_image
         self.vtk_image_reslice.SetInputData(vtk_image)
+        self._plan_key = None
+        self._plan = None
     
     def calculate_axes(self, index):
         
@@ -286,7 +298,196 @@ class Reslicer():
         
         return self.get_slice_image(index), index
 
+    def _slice_plan(self):
+        """
+        Geometry shared by all slices of the current image: the output extent,
+        spacing and direction vtkImageReslice would produce, and how output
+        pixels map to input voxels. None when the slice plane is not an
+        integer-aligned signed permutation of the image grid (oblique).
+        Rebuilt when the image or its geometry changes.
+        """
+        image = self.vtk_image
+        direction = image.GetDirectionMatrix()
+        key = (id(image), self.axis, image.GetExtent(), image.GetSpacing(), image.GetOrigin(),
+               tuple(direction.GetElement(i, j) for i in range(3) for j in range(3)))
+        if key == self._plan_key:
+            return self._plan
+
+        self._plan_key = key
+        self._plan = None
+
+        lo, hi = self.get_slice_index_min_max()
+        w_H_sliceo = self.calculate_axes_np(lo)
+        step = (self.calculate_axes_np(lo + 1) - w_H_sliceo)[:3, 3]
+
+        # output information only, no execution
+        reslice = self.vtk_image_reslice
+        reslice.SetResliceAxes(itkvtk.numpy_to_vtk_matrix4x4(w_H_sliceo))
+        reslice.UpdateInformation()
+        info = reslice.GetOutputInformation(0)
+        out_extent = tuple(info.Get(vtk.vtkStreamingDemandDrivenPipeline.WHOLE_EXTENT()))
+        out_spacing = np.array(info.Get(vtk.vtkDataObject.SPACING()), dtype=np.float64)
+        out_origin = np.array(info.Get(vtk.vtkDataObject.ORIGIN()), dtype=np.float64)
+        out_direction = np.array(info.Get(vtk.vtkDataObject.DIRECTION()), dtype=np.float64).reshape(3, 3)
+        if out_extent[4] != out_extent[5]:
+            return None
+
+        # output voxel i is at p = origin' + D' (spacing' * i) and samples the
+        # input voxel D^-1 (R p + t - origin) / spacing
+        in_extent = image.GetExtent()
+        in_spacing = np.array(image.GetSpacing(), dtype=np.float64)
+        in_origin = np.array(image.GetOrigin(), dtype=np.float64)
+        to_index = np.linalg.inv(np.array(key[5], dtype=np.float64).reshape(3, 3)) / in_spacing[:, None]
+        rotation = w_H_sliceo[:3, :3]
+        first = out_origin + out_direction @ (out_spacing * np.array(out_extent[0::2], dtype=np.float64))
+        start = to_index @ (rotation @ first + w_H_sliceo[:3, 3] - in_origin)
+        columns = to_index @ rotation @ (out_direction * out_spacing)
+        shift = to_index @ step
+
+        def as_int(v):
+            r = np.rint(v)
+            return r.astype(int) if np.allclose(v, r, atol=1e-6) else None
+
+        start, columns, shift = as_int(start), as_int(columns), as_int(shift)
+        if start is None or columns is None or shift is None:
+            return None
+
+        # the in-plane output axes must step one voxel along distinct input axes
+        plane_axes = []
+        for c in (0, 1):
+            nonzero = np.flatnonzero(columns[:, c])
+            if len(nonzero) != 1 or abs(columns[nonzero[0], c]) != 1:
+                return None
+            plane_axes.append(int(nonzero[0]))
+        normal = ({0, 1, 2} - set(plane_axes)).pop() if plane_axes[0] != plane_axes[1] else None
+        if normal is None or np.count_nonzero(shift) != 1 or shift[normal] == 0:
+            return None
+
+        size = (out_extent[1] - out_extent[0] + 1, out_extent[3] - out_extent[2] + 1)
+        for c in (0, 1):
+            a = plane_axes[c]
+            first_index = start[a]
+            last_index = first_index + columns[a, c] * (size[c] - 1)
+            if min(first_index, last_index) < in_extent[2 * a] or max(first_index, last_index) > in_extent[2 * a + 1]:
+                return None
+
+        self._plan = {
+            "lo": lo,
+            "extent": out_extent,
+            "spacing": tuple(out_spacing),
+            "direction": [float(v) for v in rotation.ravel()],
+            "origin": w_H_sliceo[:3, 3].copy(),
+            "origin_step": step,
+            "start": start,
+            "shift": shift,
+            "plane_axes": plane_axes,
+            "steps": (int(columns[plane_axes[0], 0]), int(columns[plane_axes[1], 1])),
+            "size": size,
+            "normal": normal,
+            # axial slices of an unflipped image are contiguous rows of the volume
+            "zero_copy": normal == 2 and plane_axes == [0, 1] and columns[0, 0] == 1 and columns[1, 1] == 1,
+        }
+        return self._plan
+
+    def slice_array_job(self, index):
+        """
+        Callable returning slice ``index`` as a flat array cut out of the
+        volume array, or None when vtkImageReslice is needed. The callable
+        only does NumPy work on arrays captured here, so it may run on
+        another thread; wrap its result with wrap_slice_array().
+        """
+        if not self.fast_path_enabled or self.vtk_image is None:
+            return None
+        scalars = self.vtk_image.GetPointData().GetScalars()
+        if scalars is None:
+            return None
+        if int(index) != index:
+            return None
+        plan = self._slice_plan()
+        if plan is None:
+            return None
+
+        extent = self.vtk_image.GetExtent()
+        offset = int(index) - plan["lo"]
+        normal = plan["normal"]
+        normal_index = plan["start"][normal] + plan["shift"][normal] * offset
+        if not (extent[2 * normal] <= normal_index <= extent[2 * normal + 1]):
+            return None  # outside the volume: the reslice fills it with the background
+
+        from vtk.util import numpy_support
+        dims = self.vtk_image.GetDimensions()
+        components = scalars.GetNumberOfComponents()
+        volume = numpy_support.vtk_to_numpy(scalars).reshape(dims[::-1] + (components,))
+
+        # numpy index along each VTK axis (the array is z, y, x)
+        index_along = [slice(None)] * 3
+        index_along[normal] = normal_index - extent[2 * normal]
+        for a, step, n in zip(plan["plane_axes"], plan["steps"], plan["size"]):
+            first = plan["start"][a] - extent[2 * a]
+            last = first + step * (n - 1)
+            index_along[a] = slice(first, last + 1) if step > 0 else slice(first, (last - 1) if last > 0 else None, -1)
+        # rows follow the output y axis, columns the output x axis
+        remaining = [a for a in (2, 1, 0) if a != normal]
+        transpose = remaining.index(plan["plane_axes"][1]) != 0
+
+        def cut():
+            view = volume[index_along[2], index_along[1], index_along[0]]
+            if transpose:
+                view = view.transpose(1, 0, 2)
+            # axial slices are already contiguous and are shared without a copy
+            flat = np.ascontiguousarray(view).reshape(-1, components)
+            return flat.reshape(-1) if components == 1 else flat
+
+        return cut
+
+    def slice_is_zero_copy(self):
+        """True when slices of the current image are views of the volume (no copy to cache)."""
+        plan = self._slice_plan() if self.fast_path_enabled and self.vtk_image is not None else None
+        return plan is not None and plan["zero_copy"]
+
+    def slice_geometry(self, index):
+        """(extent, spacing, origin, direction) of slice ``index``."""
+        plan = self._slice_plan() if self.vtk_image is not None else None
+        if plan is None:
+            s = self.get_slice_image(index)
+            d = s.GetDirectionMatrix()
+            return (s.GetExtent(), s.GetSpacing(), s.GetOrigin(),
+                    tuple(d.GetElement(i, j) for i in range(3) for j in range(3)))
+        origin = plan["origin"] + plan["origin_step"] * (index - plan["lo"])
+        return (plan["extent"], plan["spacing"], tuple(origin), tuple(plan["direction"]))
+
+    def wrap_slice_array(self, index, flat):
+        """The reused output image holding ``flat`` (from slice_array_job()) as slice ``index``."""
+        from vtk.util import numpy_support
+        scalars = self.vtk_image.GetPointData().GetScalars()
+        extent, spacing, origin, direction = self.slice_geometry(index)
+
+        out = self._fast_slice
+        array = numpy_support.numpy_to_vtk(flat, deep=False, array_type=scalars.GetDataType())
+        array.SetName(scalars.GetName())
+        self._fast_slice_array = flat  # the vtk array does not own the memory
+        out.SetExtent(extent)
+        out.SetSpacing(spacing)
+        out.GetPointData().SetScalars(array)
+        out.SetOrigin(origin)
+        out.SetDirectionMatrix(direction)
+        out.Modified()
+
+        self.slice_index = index
+        return out
+
+    def _fast_slice_image(self, index):
+        """The slice cut out of the volume array, or None to fall back to vtkImageReslice."""
+        cut = self.slice_array_job(index)
+        if cut is None:
+            return None
+        return self.wrap_slice_array(index, cut())
+
     def get_slice_image(self, index):
+        slice = self._fast_slice_image(index)
+        if slice is not None:
+            return slice
+
         w_H_sliceo = self.set_slice_index(index)
 
         slice = self.vtk_image_reslice.GetOutput()
@@ -302,280 +503,93 @@ class Reslicer():
 
         return slice
 
- 
-class ReslicerWithImageActor(Reslicer):
-    def __init__(self, axis, vtk_image=None, background_value=-1000, fill_color=(1,0,0), fill_alpha=0.5, border_line_color=(1, 0, 0), viewer=None):
-        super().__init__(axis, vtk_image, background_value, viewer=viewer)
-      
-        self.fill_color = fill_color
-        self.fill_alpha = fill_alpha
-        self.border_line_color = border_line_color
-        self.border_line_width = 2.0
-        self.border_line_opacity = 1.0
-
-        self._create_slice_actor(fill_color, fill_alpha)
-        self._create_contour_border(border_line_color, self.border_line_width, self.border_line_opacity)
-
-    def _create_slice_actor(self, fill_color, fill_alpha):
-        # Color lookup table
-        self.lookup_table = vtk.vtkLookupTable()
-        self.lookup_table.SetNumberOfTableValues(2)
-        self.lookup_table.SetTableRange(0, 1)
-        self.lookup_table.SetTableValue(0, 0, 0, 0, 0.0)  
-        self.lookup_table.SetTableValue(1, *fill_color, fill_alpha)
-        self.lookup_table.Build()
-
-        self.slice_mapper = vtk.vtkImageMapToColors()
-        self.slice_mapper.SetLookupTable(self.lookup_table)
-
-        self.slice_actor = vtk.vtkImageActor()
-        self.slice_actor.GetMapper().SetInputConnection(self.slice_mapper.GetOutputPort())
-        self.slice_actor.GetProperty().SetOpacity(1.0)
-
-    def _create_contour_border(self, border_line_color, border_line_width, border_line_opacity):
-        # Extract border from segmentation
-        self.contour_filter = vtk.vtkContourFilter()
-        self.contour_filter.SetValue(0, 0.5)
-
-        self.border_mapper = vtk.vtkPolyDataMapper()
-        self.border_mapper.SetInputConnection(self.contour_filter.GetOutputPort())
-        self.border_mapper.ScalarVisibilityOff()  
-
-        self.border_actor = vtk.vtkActor()
-        self.border_actor.SetMapper(self.border_mapper)
-        self.border_actor.GetProperty().SetColor(*border_line_color)
-        self.border_actor.GetProperty().SetLineWidth(border_line_width)
-        self.border_actor.GetProperty().SetOpacity(border_line_opacity)
-        #self.border_actor.GetProperty().LightingOff()
-
-    def set_color(self, vtk_color):
-        
-        self.border_line_color = vtk_color
-        self.fill_color = vtk_color
-        
-        self.border_actor.GetProperty().SetColor(*vtk_color)
-        self.lookup_table.SetTableValue(1, *vtk_color, self.fill_alpha)
-        self.lookup_table.Build()
-
-    def set_alpha(self, alpha):
-        self.fill_alpha = alpha
-        self.lookup_table.SetTableValue(1, *self.fill_color, self.fill_alpha)
-        self.lookup_table.Build()
-
-    def get_actors(self):
-        return [self.slice_actor, self.border_actor]
-        #return [self.border_actor]
-    
-    def _poly_data_point_list_to_4xN_numpy_matrix(self, points):
-
-        n_points = points.GetNumberOfPoints()
-
-        # Allocate a 3xN numpy array
-        points_array = np.ones((3, n_points))
-
-        for i in range(n_points):
-            pt = points.GetPoint(i)  # Returns a tuple of (x, y, z)
-            points_array[:, i] = pt
-
-        #print(points_array.shape)  # (3, N)
-
-        #N = points_array.shape[1]
-
-        # Create a new 4xN array
-        points_homogeneous = np.vstack((points_array, np.ones((1, n_points))))
-
-        #print(points_homogeneous.shape)  # (4, N)
-
-        return points_homogeneous
-
-
-    def _4xN_numpy_matrix_to_poly_data_point_list(self, PT):
-        N = PT.shape[1]
-        new_points = vtk.vtkPoints()
-        for i in range(N):
-            x, y, z = PT[0:3, i]  # Extract x, y, z
-            new_points.InsertNextPoint(x, y, z)
-        return new_points
-
 
-    def _transform_contour_filter_output_to_w(self, poly_data, slice):
-
-        import vtk_image_wrapper
-        slice_wrapper = vtk_image_wrapper.vtk_image_wrapper(slice)
-        w_H_sliceo = slice_wrapper.get_w_H_o()
-       
-        # contour filter output point list matrix
-        PT = self._poly_data_point_list_to_4xN_numpy_matrix(poly_data.GetPoints())
-
-        # subtract origin
-        slice_org_w = np.append(slice_wrapper.get_origin(), 0.0).reshape(4,1)
-        PT_sliceo = PT - slice_org_w
-
-        # transform to w 
-        PT_w = w_H_sliceo @ PT_sliceo
-
-        # shift points towards to the camera near plane
-        camera = self.viewer.get_renderer().GetActiveCamera()
-        import vtk_camera_wrapper
-        cam = vtk_camera_wrapper.vtk_camera_wrapper(camera)
-        uz = np.append(cam.get_z_axis(), 0.0).reshape(4,1)
-
-        # shift by 10.0
-        uz10 = uz * 10.0 
-        PT2_w = PT_w - uz10
-        
-        # convert to vtkPoints
-        new_points = self._4xN_numpy_matrix_to_poly_data_point_list(PT2_w)
-
-        # Copy cells
-        new_polydata = vtk.vtkPolyData()
-        new_polydata.SetPoints(new_points)
-        new_polydata.SetPolys(poly_data.GetPolys())
-        new_polydata.SetLines(poly_data.GetLines())  # Optional
-        
-        return new_polydata
-        
-    def _print_poly_data_points(self, poly_data, skip):
-        num_points = poly_data.GetNumberOfPoints()
-        for i in range(int(num_points/skip)):
-            point = poly_data.GetPoint(i*skip)
-            print(f"Point {i*skip}: {point}")
-
-    def set_slice_index_and_update_slice_actor(self, index):
-        slice = super().get_slice_image(index)
-
-        # Update image slice
-        self.slice_mapper.SetInputData(slice)
-        self.slice_actor.Update()
-
-        # Update border contour
-        self.contour_filter.SetInputData(slice)
-        self.contour_filter.Update()
-
-        contour_output = self.contour_filter.GetOutput()
-        if contour_output.GetNumberOfPoints() == 0 or contour_output.GetNumberOfCells() == 0:
-            print("Contour output is empty — no valid polygons.")
-
-        #print('---- before transform ---')
-        #self._print_poly_data_points(contour_output, 30)
-
-        # transform contour output to w
-        poly_data_w = self._transform_contour_filter_output_to_w(contour_output, slice)
-
-        #print('---- after transform ---')
-        #self._print_poly_data_points(poly_data_w, 30)
-
-        # set new data to mapper
-        self.border_mapper.SetInputData(poly_data_w)
-        self.border_mapper.Update()
+def hatch_line_segments(mask, period):
+    """
+    Diagonal hatch lines clipped to a 2D (rows, columns) boolean ``mask``:
+    every ``period``-th pixel diagonal (column - row = const) is cut into its
+    runs inside the mask. Returns an (n, 2, 2) array of segment end points
+    (column, row) in index coordinates, on the outer pixel corners of each run.
+    """
+    rows, cols = np.indices(mask.shape)
+    selected = mask & ((cols - rows) % max(int(period), 1) == 0)
+    padded = np.pad(selected, 1)
+    before = padded[:-2, :-2]  # the previous pixel on the same diagonal
+    after = padded[2:, 2:]
+    # ordered by (diagonal, row), the k-th start and the k-th end bound the same run
+    starts = np.argwhere(selected & ~before)
+    ends = np.argwhere(selected & ~after)
+    starts = starts[np.lexsort((starts[:, 0], starts[:, 1] - starts[:, 0]))]
+    ends = ends[np.lexsort((ends[:, 0], ends[:, 1] - ends[:, 0]))]
+    segments = np.empty((len(starts), 2, 2))
+    segments[:, 0] = starts[:, ::-1] - 0.5
+    segments[:, 1] = ends[:, ::-1] + 0.5
+    return segments
 
-        self.border_actor.SetMapper(self.border_mapper)
 
 class ReslicerWithContourPolyActor(Reslicer):
     def __init__(self, axis, vtk_image=None, background_value=-1000, vtk_color=(1,0,0), alpha=0.8, viewer=None):
         super().__init__(axis, vtk_image, background_value, viewer=viewer)
+        # distance between hatch lines, in mm
+        self.hatch_spacing = 5.0
         self._create_slice_actor(vtk_color, alpha)
 
     def _create_slice_actor(self, vtk_color, alpha):
-        self.contour_filter = vtk.vtkContourFilter()
-        self.hatch_lines = vtk.vtkAppendPolyData()
-        self.clipper = vtk.vtkClipPolyData()
-        self.loop_points = vtk.vtkPoints()
-        self.loop = vtk.vtkImplicitSelectionLoop()
+        self.hatch_poly_data = vtk.vtkPolyData()
         self.mapper = vtk.vtkPolyDataMapper()
+        self.mapper.SetInputData(self.hatch_poly_data)
         self.hatch_actor = vtk.vtkActor()
+        self.hatch_actor.SetMapper(self.mapper)
+        self.hatch_actor.GetProperty().SetColor(*vtk_color)
+        self.hatch_actor.GetProperty().SetOpacity(alpha)
+        self.hatch_actor.GetProperty().SetLineWidth(1.5)
     
     def get_actors(self):
         return [self.hatch_actor]
 
     def _clear_data(self):
-        # Clear previous hatch lines
-        self.hatch_lines.RemoveAllInputs()
-
-        # Clear loop points (used for clipping)
-        self.loop_points.Reset()
-
+        self.hatch_poly_data.Initialize()
+        self.hatch_poly_data.Modified()
 
     def set_slice_index_and_update_slice_actor(self, index):
+        """
+        Hatch the labeled pixels of slice ``index``: one line polydata built
+        from NumPy arrays, clipped to the label slice itself.
+        """
+        from vtk.util import numpy_support
+
         slice = super().get_slice_image(index)
-    
         self._clear_data()
 
-        # ------------------------------
-        # Step 2: Convert mask to polygon
-        # ------------------------------
-        contour_filter = self.contour_filter
-        contour_filter.SetInputData(slice)
-        contour_filter.SetValue(0, 0.5)
-        contour_filter.Update()
-
-        output = contour_filter.GetOutput()
-        if output.GetNumberOfPoints() == 0 or output.GetNumberOfCells() == 0:
-            print("Contour output is empty — no valid polygons.")
-            return  # or skip further processing
-
-        # ------------------------------
-        # Step 3: Generate hatch lines (diagonal)
-        # ------------------------------
-        bounds = contour_filter.GetOutput().GetBounds()
-
-        # Create hatch lines across bounding box
-        hatch_lines = self.hatch_lines
-        spacing = 5.0
-        x0, x1, y0, y1 = bounds[0], bounds[1], bounds[2], bounds[3]
-        for i in np.arange(y0 - 100, y1 + 100, spacing):
-            points = vtk.vtkPoints()
-            lines = vtk.vtkCellArray()
-
-            p0 = (x0 - 50, i, 0)
-            p1 = (x1 + 50, i + (x1 - x0), 0)
-
-            points.InsertNextPoint(p0)
-            points.InsertNextPoint(p1)
-
-            line = vtk.vtkLine()
-            line.GetPointIds().SetId(0, 0)
-            line.GetPointIds().SetId(1, 1)
-            lines.InsertNextCell(line)
-
-            line_poly = vtk.vtkPolyData()
-            line_poly.SetPoints(points)
-            line_poly.SetLines(lines)
-
-            hatch_lines.AddInputData(line_poly)
-
-        hatch_lines.Update()
-
-        # ------------------------------
-        # Step 4: Clip hatch lines to polygon
-        # ------------------------------
-        clipper = self.clipper
-        clipper.SetInputConnection(hatch_lines.GetOutputPort())
-        clipper.InsideOutOn()
-
-        # For clipping, convert contour to loop
-        loop_points = self.loop_points
-        for i in range(contour_filter.GetOutput().GetNumberOfPoints()):
-            loop_points.InsertNextPoint(contour_filter.GetOutput().GetPoint(i))
-
-        self.loop.SetLoop(loop_points)
-        clipper.SetClipFunction(self.loop)
-        clipper.Update()
-
-
-        # ------------------------------
-        # Step 5: Create actors
-        # ------------------------------
-        # Hatch actor
-        mapper = self.mapper
-        mapper.SetInputConnection(clipper.GetOutputPort())
-
-        hatch_actor = self.hatch_actor
-        hatch_actor.SetMapper(mapper)
-        hatch_actor.GetProperty().SetColor(1, 0.5, 0)  # orange
-        hatch_actor.GetProperty().SetLineWidth(1.5)
-
-       
+        extent = slice.GetExtent()
+        spacing = np.array(slice.GetSpacing())
+        mask = numpy_support.vtk_to_numpy(slice.GetPointData().GetScalars())
+        mask = mask.reshape(extent[3] - extent[2] + 1, extent[1] - extent[0] + 1) > 0
+        if not mask.any():
+            return
+
+        # hatch lines run along pixel diagonals, about hatch_spacing apart
+        period = max(int(round(self.hatch_spacing / spacing[:2].mean())), 1)
+        segments = hatch_line_segments(mask, period).reshape(-1, 2)
+
+        # index -> world coordinates of the slice
+        ijk = np.zeros((len(segments), 3))
+        ijk[:, 0] = segments[:, 0] + extent[0]
+        ijk[:, 1] = segments[:, 1] + extent[2]
+        ijk[:, 2] = extent[4]
+        d = slice.GetDirectionMatrix()
+        direction = np.array([[d.GetElement(i, j) for j in range(3)] for i in range(3)])
+        points_w = np.array(slice.GetOrigin()) + (ijk * spacing) @ direction.T
+
+        points = vtk.vtkPoints()
+        points.SetData(numpy_support.numpy_to_vtk(np.ascontiguousarray(points_w), deep=True))
+        lines = vtk.vtkCellArray()
+        lines.SetData(numpy_support.numpy_to_vtkIdTypeArray(np.arange(0, len(points_w) + 1, 2, dtype=np.int64), deep=True),
+                      numpy_support.numpy_to_vtkIdTypeArray(np.arange(len(points_w), dtype=np.int64), deep=True))
+        self.hatch_poly_data.SetPoints(points)
+        self.hatch_poly_data.SetLines(lines)
+        self.hatch_poly_data.Modified()
+
 
 def main():
     input_filename = "C:/Users/jkim20/Documents/projects/vtk_image_labeler_3d/sample_data/Dataset101_Eye[ul]L/imagesTr/eye[ul]l_0_0000.mha"
@@ -1,48 +1,49 @@
-
-from PyQt5.QtCore import QObject, QThread, pyqtSignal
 import vtk
 
+import dirty_region
+import surface_bricks
+import surface_jobs
+import surface_lod
 
-class ContourWorker(QObject):
-    finished = pyqtSignal(vtk.vtkPolyData)
-
-    def __init__(self, segmentation_volume):
-        super().__init__()
-        self.segmentation_volume = segmentation_volume
-
-    def run(self):
-        contour = vtk.vtkContourFilter()
-        contour.SetInputData(self.segmentation_volume)
-        contour.SetValue(0, 0.5)
-        contour.Update()
-        polydata = vtk.vtkPolyData()
-        polydata.DeepCopy(contour.GetOutput())  # Important!
-        self.finished.emit(polydata)
-
-import vtk
 
 class SegmentationLayerSurface():
-    def __init__(self, layer, renderer=None, render_window=None):
+    def __init__(self, layer, renderer=None, render_window=None, build=True, on_mesh_changed=None, render=None):
 
         self.layer = layer
         self.renderer = renderer
         self.render_window = render_window
+        self.render = render  # render() asks the view for a frame (render_scheduler.py); None: render_window.Render()
+        self.on_mesh_changed = on_mesh_changed  # on_mesh_changed(surface) after the full mesh changed
 
         self._create_surface_actor()
 
-        self.update_surface_async()
+        # build=False: the caller supplies the first mesh (see set_batch_surface)
+        if build:
+            self.update_surface_async()
 
     def _create_surface_actor(self):
-        # Extract border from segmentation
-        #self.contour_filter = vtk.vtkContourFilter()
-        #self.contour_filter.SetInputData(self.seg_item.segmentation)
-        #self.contour_filter.SetValue(0, 0.5)
-        #self.contour_filter.Update()
-        
+        # the layer surface, contoured and cached per brick (see surface_bricks.py)
+        self.bricks = surface_bricks.BrickSurfaces()
+        self.job_pool = surface_jobs.get_surface_job_pool()
+        self._request = 0  # id of the latest submitted job
+        self._in_flight = False  # a submitted job has not delivered yet
+        self._in_flight_extent = None  # its dirty extent (None: whole volume)
+        self._mesh = self.bricks.poly_data  # the full-resolution mesh
+
+        # reduced mesh shown while the camera moves, and the smoothed mesh (see surface_lod.py)
+        self.lod_owner = object()  # job pool owner of the LOD job
+        self._mesh_version = 0
+        self._lod_key = None  # (mesh version, target, smoothing) of the LOD built or in flight
+        self._has_lod = False
+        self._interacting = False
+
         self.surface_mapper = vtk.vtkPolyDataMapper()
-        #self.surface_mapper.SetInputConnection(self.contour_filter.GetOutputPort())
+        self.surface_mapper.SetInputData(self._mesh)
         self.surface_mapper.ScalarVisibilityOff()  
 
+        self.lod_mapper = vtk.vtkPolyDataMapper()
+        self.lod_mapper.ScalarVisibilityOff()
+
         self.surface_actor = vtk.vtkActor()
         self.surface_actor.SetMapper(self.surface_mapper)
         self.surface_actor.GetProperty().SetColor(*self.layer.get_vtk_color())
@@ -64,25 +65,137 @@ class SegmentationLayerSurface():
         self.surface_actor.GetProperty().SetOpacity(self.layer.get_alpha())
         
 
-    def update_surface_async(self):
-        self.thread = QThread()
-        self.worker = ContourWorker(self.layer.get_image())
-        self.worker.moveToThread(self.thread)
-
-        self.thread.started.connect(self.worker.run)
-        self.worker.finished.connect(self.on_surface_ready)
-        self.worker.finished.connect(self.thread.quit)
-        self.worker.finished.connect(self.worker.deleteLater)
-        self.thread.finished.connect(self.thread.deleteLater)
-
-        self.thread.start()
-
-    def on_surface_ready(self, polydata):
-        self.surface_mapper.SetInputData(polydata)
-        self.surface_mapper.Update()
-        if self.render_window:
+    def update_surface_async(self, dirty_extent=None):
+        """Recontour the bricks ``dirty_extent`` touches (None: all) in the surface job pool."""
+        # a job still queued or running is superseded (and cancelled): plan its bricks again
+        if self._in_flight:
+            dirty_extent = dirty_region.union(self._in_flight_extent, dirty_extent, whole_if_none=True)
+
+        layer = self.layer
+        # the voxels of the dirty bricks are copied here, so painting can go on while they are contoured
+        jobs = self.bricks.plan(layer.get_geometry(), layer.read_region, layer.get_slice_occupancy(), dirty_extent)
+        if not jobs:
+            self.cancel()
+            self.on_surface_ready([])
+            return
+
+        self._request += 1
+        request = self._request
+        self._in_flight = True
+        self._in_flight_extent = dirty_extent
+        self.job_pool.submit(
+            self,
+            lambda is_cancelled: surface_bricks.contour_bricks(jobs, is_cancelled),
+            lambda results: self.on_surface_ready(results, request),
+        )
+
+    def batch_token(self):
+        """Pass to set_batch_surface(); the batch meshes are dropped if the layer was recontoured since."""
+        return self._request
+
+    def set_batch_surface(self, meshes, geometry, token):
+        """Show the brick meshes built for several layers at once (surface_batch.py) for a volume of ``geometry``."""
+        if token != self._request:
+            return
+        # they are the meshes the bricks would build: later edits recontour only the bricks they touch
+        self.bricks.adopt(geometry, meshes)
+        self._set_mesh(self.bricks.poly_data)
+
+    def cancel(self):
+        self.job_pool.cancel(self)
+        self.job_pool.cancel(self.lod_owner)
+        self._in_flight = False
+        self._in_flight_extent = None
+        self._lod_key = None
+
+    def on_surface_ready(self, results, request=None):
+        if request == self._request:
+            self._in_flight = False
+            self._in_flight_extent = None
+        self.bricks.apply(results)
+        self._set_mesh(self.bricks.poly_data)
+        self._render()
+
+    def _render(self):
+        # many surfaces finishing together share one scheduled frame
+        if self.render is not None:
+            self.render()
+        elif self.render_window:
             self.render_window.Render()
 
+    # ----- level of detail -----
+
+    def _set_mesh(self, poly_data):
+        # the LOD and smoothed meshes of the old mesh are dropped until rebuilt
+        self._mesh = poly_data
+        self._mesh_version += 1
+        self.job_pool.cancel(self.lod_owner)
+        self._lod_key = None
+        self._has_lod = False
+        self.surface_mapper.SetInputData(poly_data)
+        self.surface_mapper.Modified()
+        self._update_mapper()
+        if self.on_mesh_changed is not None:
+            self.on_mesh_changed(self)
+
+    def triangle_count(self):
+        return self._mesh.GetNumberOfPolys()
+
+    def request_lod(self, target_triangles, smoothing=False):
+        """
+        Build the LOD mesh with about ``target_triangles`` triangles (None:
+        no decimation) and the smoothed mesh in the job pool. An LOD of the
+        current mesh within 25% of the target is kept.
+        """
+        if self._lod_key is not None:
+            version, target, smoothed = self._lod_key
+            if version == self._mesh_version and smoothed == smoothing and (
+                target == target_triangles
+                or (target is not None and target_triangles is not None
+                    and abs(target - target_triangles) <= 0.25 * target_triangles)
+            ):
+                return
+        self.job_pool.cancel(self.lod_owner)
+        if self._has_lod or self.surface_mapper.GetInput() is not self._mesh:
+            self._has_lod = False
+            self.surface_mapper.SetInputData(self._mesh)
+            self._update_mapper()
+        key = (self._mesh_version, target_triangles, smoothing)
+        self._lod_key = key
+        if target_triangles is None and not smoothing:
+            return
+
+        # the worker reads a shallow copy: bricks.apply() replaces the arrays of the shown mesh
+        mesh = vtk.vtkPolyData()
+        mesh.ShallowCopy(self._mesh)
+        self.job_pool.submit(
+            self.lod_owner,
+            lambda is_cancelled: surface_lod.build_lod(mesh, target_triangles, smoothing, is_cancelled),
+            lambda result: self.on_lod_ready(result, key),
+        )
+
+    def on_lod_ready(self, result, key):
+        if key != self._lod_key:
+            return
+        smoothed, lod = result
+        if smoothed is not None:
+            self.surface_mapper.SetInputData(smoothed)
+        if lod is not None:
+            self.lod_mapper.SetInputData(lod)
+        self._has_lod = lod is not None
+        self._update_mapper()
+        self._render()
+
+    def set_interacting(self, interacting):
+        """Show the LOD mesh (if built) while the camera moves, the full mesh otherwise."""
+        self._interacting = bool(interacting)
+        self._update_mapper()
+
+    def _update_mapper(self):
+        mapper = self.lod_mapper if self._interacting and self._has_lod else self.surface_mapper
+        if self.surface_actor.GetMapper() is not mapper:
+            self.surface_actor.SetMapper(mapper)
+
         
 from typing import List
 class SegmentationLayerSurfaceList():
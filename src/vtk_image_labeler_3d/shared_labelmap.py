@@ -0,0 +1,280 @@
+"""
+One label volume shared by mutually exclusive segmentation layers.
+
+In labelmap mode a layer is a view onto a ``SharedLabelmap``: it owns one
+label value and its voxels are the ones holding that value. Brush and
+pencil writes use a paint rule that either overwrites other labels or
+protects them, the viewers reslice the labelmap once per view for all of
+its layers, and the volume is already in the integer label format nnU-Net
+expects, so exporting needs at most one lookup-table pass.
+
+Per-label slice occupancy (``SliceOccupancy``) is built for every label in
+one pass over the volume and kept current from edit deltas, like the
+per-layer index of separate layers.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import vtk
+
+import brush_stencil
+import orientation
+import slice_occupancy
+
+Box = Tuple[int, int, int, int, int, int]  # inclusive (z0, z1, y0, y1, x0, x1)
+
+_VTK_TYPES = {
+    np.dtype(np.uint8): vtk.VTK_UNSIGNED_CHAR,
+    np.dtype(np.uint16): vtk.VTK_UNSIGNED_SHORT,
+}
+
+
+def _new_image_like(reference, dtype):
+    image = vtk.vtkImageData()
+    image.CopyStructure(reference)
+    image.AllocateScalars(_VTK_TYPES[np.dtype(dtype)], 1)
+    image.GetPointData().GetScalars().Fill(0)
+    return image
+
+
+class SharedLabelmap:
+    def __init__(self, image):
+        volume = brush_stencil.vtk_image_as_zyx_view(image)
+        if volume.dtype not in _VTK_TYPES:
+            raise ValueError(f"Labelmap must be uint8 or uint16, got {volume.dtype}")
+        self.image = image
+        # False: painting a label overwrites other labels; True: other labels are kept
+        self.protect_other_labels = False
+        self._owners: Dict[int, object] = {}
+        self._next_label = 1
+
+        self._occupancy: Dict[int, slice_occupancy.SliceOccupancy] = {}
+        self._occupancy_image = None
+        self._occupancy_mtime = None
+
+    @classmethod
+    def create_like(cls, reference_image, dtype=np.uint8) -> "SharedLabelmap":
+        """Empty labelmap with the geometry of ``reference_image``."""
+        return cls(_new_image_like(reference_image, dtype))
+
+    def volume(self) -> np.ndarray:
+        return brush_stencil.vtk_image_as_zyx_view(self.image)
+
+    # ----- labels -----
+
+    def max_label(self) -> int:
+        return int(np.iinfo(self.volume().dtype).max)
+
+    def allocate_label(self, owner) -> int:
+        """
+        Reserve an unused label value for ``owner``. Released values are only
+        reused once the range is exhausted; a full uint8 labelmap is promoted
+        to uint16 (``image`` is then a new vtkImageData).
+        """
+        while True:
+            top = self.max_label()
+            candidates = list(range(self._next_label, top + 1)) + list(range(1, self._next_label))
+            for value in candidates:
+                if value not in self._owners:
+                    self._owners[value] = owner
+                    self._next_label = value + 1
+                    return value
+            if top >= np.iinfo(np.uint16).max:
+                raise ValueError("No free label value left in the labelmap")
+            self._promote(np.uint16)
+
+    def release_label(self, value) -> Optional[Box]:
+        """Free ``value`` and erase its voxels; returns the erased box or None."""
+        value = int(value)
+        self._owners.pop(value, None)
+        occupancy = self.occupancy(value)
+        if occupancy is None or occupancy.voxel_count() == 0:
+            return None
+        whole = self.image.GetExtent()
+        box = []
+        for axis in (2, 1, 0):
+            first, last = occupancy.labeled_range(axis)
+            box += [first - whole[2 * axis], last - whole[2 * axis]]
+        token = self.begin_edit(tuple(box))
+        region = self.volume()[tuple(slice(box[2 * d], box[2 * d + 1] + 1) for d in range(3))]
+        region[region == value] = 0
+        self._modified()
+        self.end_edit(token)
+        return tuple(box)
+
+    def owner(self, value):
+        return self._owners.get(int(value))
+
+    def labels(self) -> List[int]:
+        return sorted(self._owners)
+
+    def _promote(self, dtype) -> None:
+        image = _new_image_like(self.image, dtype)
+        brush_stencil.vtk_image_as_zyx_view(image)[...] = self.volume()
+        scalars = self.image.GetPointData().GetScalars()
+        if scalars.GetName():
+            image.GetPointData().GetScalars().SetName(scalars.GetName())
+        self.image = image
+        self._occupancy_image = None
+
+    def reorient(self, operation) -> None:
+        """Rotate or flip the label volume in place (see orientation.py)."""
+        orientation.reorient_image(self.image, operation)
+        self._occupancy_image = None
+
+    def _modified(self) -> None:
+        self.image.GetPointData().GetScalars().Modified()
+        self.image.Modified()
+
+    # ----- writes -----
+
+    def paint_rule(self, value, erase=False):
+        """
+        (write value, where) for a brush or pencil write of label ``value``.
+        ``where`` is None (write every stencil voxel) or a callable giving the
+        voxels of a region that may be written.
+        """
+        value = int(value)
+        if erase:
+            # erasing only clears this label's own voxels
+            return 0, lambda region: region == value
+        if self.protect_other_labels:
+            return value, lambda region: (region == 0) | (region == value)
+        return value, None
+
+    def write_mask(self, value, mask_zyx: np.ndarray) -> List[int]:
+        """
+        Make the voxels of label ``value`` equal ``mask_zyx`` (nonzero = inside),
+        following the paint rule for other labels. Returns the other labels
+        whose voxels changed.
+        """
+        volume = self.volume()
+        if mask_zyx.shape != volume.shape:
+            raise ValueError(f"Mask shape {mask_zyx.shape} does not match labelmap {volume.shape}")
+        value = int(value)
+        inside = mask_zyx != 0
+        token = self.begin_edit((0, volume.shape[0] - 1, 0, volume.shape[1] - 1, 0, volume.shape[2] - 1))
+        volume[(volume == value) & ~inside] = 0
+        if self.protect_other_labels:
+            inside &= volume == 0
+        volume[inside] = value
+        self._modified()
+        changed = self.end_edit(token)
+        return [label for label in changed if label != value]
+
+    # ----- reads -----
+
+    def mask(self, value) -> np.ndarray:
+        return self.volume() == int(value)
+
+    def mask_image(self, value):
+        """New binary (0/1) uint8 vtkImageData of label ``value``."""
+        image = _new_image_like(self.image, np.uint8)
+        np.equal(self.volume(), int(value), out=brush_stencil.vtk_image_as_zyx_view(image).view(bool))
+        image.Modified()
+        return image
+
+    def export_labels(self, mapping: Dict[int, int]):
+        """
+        Labelmap with label values replaced per ``mapping`` (labels not in it
+        become 0). Returns ``image`` itself when that changes nothing, else a
+        new image written with one lookup-table pass.
+        """
+        present = [label for label in self._present_labels() if label != 0]
+        if all(mapping.get(label, 0) == label for label in present):
+            return self.image
+        top = max([self.max_label()] + list(mapping.values()))
+        out_dtype = np.uint8 if top <= np.iinfo(np.uint8).max else np.uint16
+        lut = np.zeros(self.max_label() + 1, dtype=out_dtype)
+        for src, dst in mapping.items():
+            lut[int(src)] = int(dst)
+        image = _new_image_like(self.image, out_dtype)
+        np.take(lut, self.volume(), out=brush_stencil.vtk_image_as_zyx_view(image))
+        image.Modified()
+        return image
+
+    def _present_labels(self) -> List[int]:
+        self._ensure_occupancy()
+        return [label for label, occ in self._occupancy.items() if occ.voxel_count() > 0]
+
+    # ----- occupancy -----
+
+    def _occupancy_is_current(self) -> bool:
+        return self._occupancy_image is self.image and self.image.GetMTime() == self._occupancy_mtime
+
+    def _ensure_occupancy(self) -> None:
+        if self._occupancy_is_current():
+            return
+        volume = self.volume()
+        whole = self.image.GetExtent()
+        values = np.unique(volume)
+        values = values[values != 0]
+        # dense index per label value, 0 for background
+        index = np.zeros(self.max_label() + 1, dtype=np.intp)
+        index[values] = np.arange(1, len(values) + 1)
+        n = len(values) + 1
+
+        per_x = np.zeros((volume.shape[2], n), dtype=np.int64)
+        per_y = np.zeros((volume.shape[1], n), dtype=np.int64)
+        per_z = np.zeros((volume.shape[0], n), dtype=np.int64)
+        rows = np.arange(volume.shape[1]).reshape(-1, 1) * n
+        cols = np.arange(volume.shape[2]).reshape(1, -1) * n
+        for z in range(volume.shape[0]):
+            dense = index[volume[z]]
+            per_z[z] = np.bincount(dense.ravel(), minlength=n)
+            per_y += np.bincount((dense + rows).ravel(), minlength=volume.shape[1] * n).reshape(-1, n)
+            per_x += np.bincount((dense + cols).ravel(), minlength=volume.shape[2] * n).reshape(-1, n)
+
+        self._occupancy = {
+            int(value): slice_occupancy.SliceOccupancy.from_counts(
+                whole, [per_x[:, i + 1], per_y[:, i + 1], per_z[:, i + 1]]
+            )
+            for i, value in enumerate(values)
+        }
+        self._occupancy_image = self.image
+        self._occupancy_mtime = self.image.GetMTime()
+
+    def occupancy(self, value) -> Optional[slice_occupancy.SliceOccupancy]:
+        """Slice occupancy of label ``value`` (empty if it has no voxels)."""
+        self._ensure_occupancy()
+        value = int(value)
+        if value not in self._occupancy:
+            self._occupancy[value] = slice_occupancy.SliceOccupancy(self.image.GetExtent())
+        return self._occupancy[value]
+
+    def begin_edit(self, box):
+        """
+        Call before writing the array-index ``box`` in place. Returns a token
+        for end_edit(), or None if the box is empty or the index is not
+        current (it is then rebuilt on the next query).
+        """
+        if not self._occupancy_is_current():
+            return None
+        volume = self.volume()
+        lo = [max(int(box[2 * d]), 0) for d in range(3)]
+        hi = [min(int(box[2 * d + 1]), volume.shape[d] - 1) for d in range(3)]
+        if any(h < l for l, h in zip(lo, hi)):
+            return None
+        clipped = (lo[0], hi[0], lo[1], hi[1], lo[2], hi[2])
+        region = tuple(slice(l, h + 1) for l, h in zip(lo, hi))
+        return (clipped, region, volume[region].copy())
+
+    def end_edit(self, token) -> List[int]:
+        """
+        Apply the delta of an edit started with begin_edit(); call after
+        image.Modified(). Returns the labels whose voxels changed.
+        """
+        if token is None:
+            return []
+        box, region, before = token
+        after = self.volume()[region]
+        changed = before != after
+        labels = np.union1d(before[changed], after[changed])
+        labels = [int(v) for v in labels if v != 0]
+        self._occupancy_mtime = self.image.GetMTime()
+        for value in labels:
+            self.occupancy(value).apply_delta(box, before == value, after == value)
+        return labels
@@ -0,0 +1,170 @@
+"""
+LRU cache of resliced slices and a background prefetcher for scrolling.
+
+Slices are cached as NumPy arrays under keys that carry the MTimes of the
+images they were cut from, so an edit makes old entries unreachable instead
+of having to find and drop them; they age out of the LRU. ``SlicePrefetcher``
+computes entries on a worker thread ahead of the scroll direction. Its jobs
+only do NumPy work on arrays captured on the UI thread (never VTK pipeline
+updates), and a newer request from the same view replaces the jobs it still
+has queued.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Hashable, List, Optional, Tuple
+
+# (key, job); the job returns (value, nbytes) or None
+PrefetchJob = Tuple[Hashable, Callable[[], Optional[tuple]]]
+
+
+class SliceCache:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(int(max_bytes), 0)
+        self._entries: OrderedDict = OrderedDict()  # key -> (value, nbytes)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prefetched = 0
+
+    def get(self, key):
+        """Cached value for ``key`` (marked most recently used) or None; counts a hit or miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def contains(self, key) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value, nbytes: int, prefetched: bool = False) -> None:
+        nbytes = int(nbytes)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (value, nbytes)
+            self._bytes += nbytes
+            if prefetched:
+                self.prefetched += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self._bytes -= nbytes
+            self.evictions += 1
+
+    def set_max_bytes(self, max_bytes: int) -> None:
+        with self._lock:
+            self.max_bytes = max(int(max_bytes), 0)
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "prefetched": self.prefetched,
+            }
+
+    def __str__(self):
+        s = self.stats()
+        return (
+            f"hit rate {s['hit_rate'] * 100:.0f}% ({s['hits']}/{s['hits'] + s['misses']}), "
+            f"{s['entries']} slices, {s['bytes'] / 1e6:.1f}/{s['max_bytes'] / 1e6:.0f} MB, "
+            f"{s['prefetched']} prefetched"
+        )
+
+
+class SlicePrefetcher:
+    def __init__(self, cache: SliceCache):
+        self.cache = cache
+        self._queues = {}  # owner -> deque of jobs
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._running = False
+        self._thread = threading.Thread(target=self._run, name="slice-prefetch", daemon=True)
+        self._thread.start()
+
+    def request(self, owner, jobs: List[PrefetchJob]) -> None:
+        """Replace ``owner``'s queued jobs with ``jobs`` (run in order)."""
+        with self._cond:
+            self._queues[owner] = deque(jobs)
+            self._cond.notify()
+
+    def cancel(self, owner) -> None:
+        with self._cond:
+            self._queues.pop(owner, None)
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(q) for q in self._queues.values())
+
+    def wait_idle(self, timeout: float = 5.0) -> bool:
+        """Block until no job is queued or running (for tests)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._busy(), timeout)
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._queues.clear()
+            self._cond.notify_all()
+
+    def _busy(self) -> bool:
+        return any(self._queues.values()) or self._running
+
+    def _next_job(self):
+        # round robin over the views with queued jobs
+        for owner in list(self._queues):
+            queue = self._queues.pop(owner)
+            if queue:
+                job = queue.popleft()
+                if queue:
+                    self._queues[owner] = queue
+                return job
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+                self._cond.wait_for(lambda: self._stopped or any(self._queues.values()))
+                if self._stopped:
+                    return
+                key, job = self._next_job()
+                self._running = True
+            if self.cache.contains(key):
+                continue
+            try:
+                result = job()
+            except Exception as exc:
+                print(f"Slice prefetch failed: {exc}")
+                continue
+            if result is not None:
+                value, nbytes = result
+                self.cache.put(key, value, nbytes, prefetched=True)
@@ -0,0 +1,141 @@
+"""
+Per-axis slice occupancy of a label volume.
+
+``SliceOccupancy`` keeps, for each VTK axis (x=0, y=1, z=2), the number of
+nonzero voxels on every slice perpendicular to that axis. It is built with
+one pass over the volume and then kept current from edit deltas (the
+before/after contents of the region an edit wrote), so empty-slice checks,
+next/previous labeled slice lookups and gap detection never touch voxels.
+
+Slice indices are VTK extent indices, like ``Reslicer.slice_index``.
+"""
+
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+Extent = Tuple[int, int, int, int, int, int]
+Box = Tuple[int, int, int, int, int, int]  # inclusive (z0, z1, y0, y1, x0, x1) array indices
+
+
+def _axis(axis) -> int:
+    axis = int(axis)
+    if axis not in (0, 1, 2):
+        raise ValueError(f"Invalid axis: {axis}")
+    return axis
+
+
+def _slice_counts(mask_zyx: np.ndarray) -> list[np.ndarray]:
+    """Nonzero counts per slice, indexed by VTK axis (x, y, z)."""
+    per_z = mask_zyx.sum(axis=(1, 2), dtype=np.int64)
+    per_y = mask_zyx.sum(axis=(0, 2), dtype=np.int64)
+    per_x = mask_zyx.sum(axis=(0, 1), dtype=np.int64)
+    return [per_x, per_y, per_z]
+
+
+class SliceOccupancy:
+    def __init__(self, whole_extent: Extent):
+        self.whole_extent = tuple(int(v) for v in whole_extent)
+        self._counts = [
+            np.zeros(self.whole_extent[2 * a + 1] - self.whole_extent[2 * a] + 1, dtype=np.int64)
+            for a in range(3)
+        ]
+
+    @classmethod
+    def from_volume(cls, volume_zyx: np.ndarray, whole_extent: Extent) -> "SliceOccupancy":
+        occupancy = cls(whole_extent)
+        occupancy.rebuild(volume_zyx)
+        return occupancy
+
+    @classmethod
+    def from_counts(cls, whole_extent: Extent, counts) -> "SliceOccupancy":
+        """Index from precomputed per-slice counts, indexed by VTK axis (x, y, z)."""
+        occupancy = cls(whole_extent)
+        for a in range(3):
+            c = np.asarray(counts[a], dtype=np.int64)
+            if c.shape != occupancy._counts[a].shape:
+                raise ValueError(f"Counts for axis {a} do not match extent {occupancy.whole_extent}")
+            occupancy._counts[a] = c.copy()
+        return occupancy
+
+    # ----- maintenance -----
+
+    def rebuild(self, volume_zyx: np.ndarray) -> None:
+        """Recount every slice from the full (z, y, x) volume."""
+        expected = tuple(len(self._counts[a]) for a in (2, 1, 0))
+        if tuple(volume_zyx.shape) != expected:
+            raise ValueError(f"Volume shape {volume_zyx.shape} does not match extent {self.whole_extent}")
+        self._counts = _slice_counts(volume_zyx != 0)
+
+    def apply_delta(self, box: Box, before: np.ndarray, after: np.ndarray) -> None:
+        """
+        Update the counts for an edit of the array-index ``box``, given the
+        region's contents before and after the write.
+        """
+        if before.shape != after.shape:
+            raise ValueError(f"Delta shape mismatch: {before.shape} vs {after.shape}")
+        delta = (after != 0).astype(np.int8) - (before != 0).astype(np.int8)
+        if not delta.any():
+            return
+        for a, d in enumerate(_slice_counts(delta)):
+            lo = box[2 * (2 - a)]
+            self._counts[a][lo:lo + len(d)] += d
+
+    # ----- queries -----
+
+    def counts(self, axis) -> np.ndarray:
+        """Read-only nonzero count per slice along ``axis`` (index 0 is the first extent slice)."""
+        view = self._counts[_axis(axis)].view()
+        view.flags.writeable = False
+        return view
+
+    def voxel_count(self) -> int:
+        return int(self._counts[2].sum())
+
+    def is_slice_empty(self, axis, index) -> bool:
+        axis = _axis(axis)
+        i = int(index) - self.whole_extent[2 * axis]
+        counts = self._counts[axis]
+        return not (0 <= i < len(counts)) or counts[i] == 0
+
+    def labeled_slices(self, axis) -> np.ndarray:
+        """Extent indices of the slices along ``axis`` that contain any label."""
+        axis = _axis(axis)
+        return np.flatnonzero(self._counts[axis]) + self.whole_extent[2 * axis]
+
+    def labeled_range(self, axis) -> Optional[Tuple[int, int]]:
+        """(first, last) labeled slice along ``axis``, or None if the volume is empty."""
+        idxs = self.labeled_slices(axis)
+        if idxs.size == 0:
+            return None
+        return int(idxs[0]), int(idxs[-1])
+
+    def next_labeled_slice(self, axis, index, step: int = 1) -> Optional[int]:
+        """
+        Nearest labeled slice strictly after ``index`` (``step`` > 0) or
+        before it (``step`` < 0), or None if there is none.
+        """
+        axis = _axis(axis)
+        lo = self.whole_extent[2 * axis]
+        counts = self._counts[axis]
+        i = int(index) - lo
+        if step > 0:
+            hits = np.flatnonzero(counts[max(i + 1, 0):])
+            return None if hits.size == 0 else int(hits[0]) + max(i + 1, 0) + lo
+        hits = np.flatnonzero(counts[:max(min(i, len(counts)), 0)])
+        return None if hits.size == 0 else int(hits[-1]) + lo
+
+    def gap_slices(self, axis) -> np.ndarray:
+        """Extent indices of empty slices between the first and last labeled slice."""
+        axis = _axis(axis)
+        rng = self.labeled_range(axis)
+        if rng is None:
+            return np.empty(0, dtype=np.int64)
+        lo = self.whole_extent[2 * axis]
+        inner = self._counts[axis][rng[0] - lo:rng[1] - lo + 1]
+        return np.flatnonzero(inner == 0) + rng[0]
+
+    def has_gaps(self, axis) -> bool:
+        return self.gap_slices(axis).size > 0
@@ -0,0 +1,132 @@
+"""
+Surfaces of many layers from one pass over a combined label volume.
+
+Opening a workspace used to start one full contour pass per layer.
+``combine_layers`` packs the layers into one uint16 label volume instead:
+labels of a shared labelmap keep their values, and each separate layer gets
+a new value, written only inside its labeled box. ``label_surfaces`` runs
+the brick path's marching cubes once over that volume and splits the
+output into one polydata per label and brick, the meshes the brick path
+would build, so a layer can adopt them and contour only the bricks later
+edits touch. Layers that overlap a layer already packed, or whose
+geometry differs, cannot share the volume and are left to the per-layer
+brick path (surface_bricks.py).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from surface_bricks import (
+    BRICK_SIZE, boundary_triangles, brick_counts, geometry_key, label_mesh, triangle_cells,
+)
+
+MAX_LABEL = 65535
+
+
+@dataclass
+class CombinedLabels:
+    volume: np.ndarray  # (z, y, x) uint16 labels, a copy owned by this object
+    frame: tuple  # surface_bricks.geometry_key() of the volume
+    layers: Dict[int, object] = field(default_factory=dict)  # label value -> layer
+    leftover: List[object] = field(default_factory=list)  # layers to contour one by one
+
+
+def _labeled_box(layer, extent):
+    """Inclusive (z0, z1, y0, y1, x0, x1) array box of the layer's labeled voxels, or None if empty."""
+    occupancy = layer.get_slice_occupancy()
+    if occupancy is None or tuple(occupancy.whole_extent) != tuple(extent):
+        return (0, extent[5] - extent[4], 0, extent[3] - extent[2], 0, extent[1] - extent[0])
+    box = []
+    for axis in (2, 1, 0):
+        r = occupancy.labeled_range(axis)
+        if r is None:
+            return None
+        box += [r[0] - extent[2 * axis], r[1] - extent[2 * axis]]
+    return tuple(box)
+
+
+def combine_layers(layers) -> Optional[CombinedLabels]:
+    """Pack ``layers`` into one label volume (UI thread); None if no layer has a geometry."""
+    frame = None
+    labelmap, labelmap_layers, separate, leftover = None, [], [], []
+    for layer in layers:
+        geometry = layer.get_geometry()
+        if geometry is None:
+            leftover.append(layer)
+            continue
+        key = geometry_key(geometry)
+        if frame is None:
+            frame = key
+        if key != frame:
+            leftover.append(layer)
+        elif layer.get_labelmap() is None:
+            separate.append(layer)
+        elif labelmap is None or layer.get_labelmap() is labelmap:
+            labelmap = layer.get_labelmap()
+            labelmap_layers.append(layer)
+        else:
+            leftover.append(layer)
+    if frame is None:
+        return None
+
+    extent = frame[0]
+    shape = (extent[5] - extent[4] + 1, extent[3] - extent[2] + 1, extent[1] - extent[0] + 1)
+    combined = CombinedLabels(np.zeros(shape, dtype=np.uint16), frame, leftover=leftover)
+    next_label = 1
+    if labelmap is not None:
+        combined.volume[...] = labelmap.volume()
+        for layer in labelmap_layers:
+            combined.layers[layer.get_label_value()] = layer
+        next_label = max(labelmap.labels() + [int(combined.volume.max())]) + 1
+
+    for layer in separate:
+        if next_label > MAX_LABEL:
+            combined.leftover.append(layer)
+            continue
+        box = _labeled_box(layer, extent)
+        if box is not None:
+            mask = layer.read_region(box) != 0
+            region = combined.volume[box[0]:box[1] + 1, box[2]:box[3] + 1, box[4]:box[5] + 1]
+            if region[mask].any():
+                combined.leftover.append(layer)  # overlaps a layer packed before
+                continue
+            region[mask] = next_label
+        combined.layers[next_label] = layer
+        next_label += 1
+    return combined
+
+
+def label_surfaces(volume: np.ndarray, frame: tuple, labels, is_cancelled: Callable[[], bool] = lambda: False,
+                   brick_size: int = BRICK_SIZE):
+    """
+    {label: {brick key: vtkPolyData}} of the boundaries of each of
+    ``labels`` (any thread), in world coordinates and split into the
+    bricks of surface_bricks.py; None if cancelled between stages.
+    """
+    surfaces = {int(value): {} for value in labels}
+    result = boundary_triangles(volume, list(surfaces))
+    if is_cancelled():
+        return None
+    if result is None:
+        return surfaces
+
+    points, triangles, triangle_labels = result
+    counts = np.array(brick_counts(volume.shape, brick_size))
+    keys = np.minimum(triangle_cells(points, triangles)[:, ::-1] // brick_size, counts - 1)  # (bz, by, bx)
+    order = np.lexsort((keys[:, 2], keys[:, 1], keys[:, 0], triangle_labels))
+    groups = np.column_stack([triangle_labels[order], keys[order]])
+    starts = np.flatnonzero(np.r_[True, (groups[1:] != groups[:-1]).any(axis=1)])
+    ends = np.r_[starts[1:], len(order)]
+
+    brick_frame = (frame[0][::2],) + tuple(frame[1:])
+    for start, end in zip(starts, ends):
+        if is_cancelled():
+            return None
+        value = int(groups[start, 0])
+        key = tuple(int(k) for k in groups[start, 1:])
+        surfaces[value][key] = label_mesh(volume, value, points, triangles[order[start:end]], (0, 0, 0), brick_frame)
+    return surfaces
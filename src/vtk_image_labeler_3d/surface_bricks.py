@@ -0,0 +1,293 @@
+"""
+Brick-wise surface extraction of a segmentation layer.
+
+The volume is split into bricks of ``BRICK_SIZE`` cells per axis: brick k
+along an axis holds the cells between points k*b and (k+1)*b, so the
+surfaces of neighbouring bricks meet on their shared point plane.
+``BrickSurfaces`` keeps one mesh per brick and, after an edit, contours
+only the bricks the dirty extent touches; the cached meshes are appended
+into the displayed polydata. A brick is contoured (discrete marching
+cubes) with a one-voxel halo so its gradient normals match its
+neighbours' along the border; a triangle belongs to the brick holding the
+cell of its centroid, the triangles of the halo cells are dropped. The
+whole-volume pass of surface_batch.py splits its triangles the same way,
+so its meshes can be adopted as brick meshes.
+
+``plan`` copies the voxels of the bricks to redo (UI thread) and
+``contour_bricks`` turns the copies into meshes (any thread).
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+import dirty_region
+
+BRICK_SIZE = 64
+
+Key = Tuple[int, int, int]  # (bz, by, bx)
+Box = Tuple[int, int, int, int, int, int]  # inclusive (z0, z1, y0, y1, x0, x1) array indices
+
+
+def brick_counts(shape, brick_size: int = BRICK_SIZE) -> Tuple[int, int, int]:
+    """Number of bricks along z, y and x of a (z, y, x) point array."""
+    return tuple(max(-(-(n - 1) // brick_size), 1) for n in shape)
+
+
+def brick_point_box(key: Key, shape, brick_size: int = BRICK_SIZE) -> Box:
+    """Inclusive box of the points whose cells make up brick ``key``."""
+    box = []
+    for k, n in zip(key, shape):
+        box += [k * brick_size, min((k + 1) * brick_size, n - 1)]
+    return tuple(box)
+
+
+def bricks_in_box(shape, box: Box, brick_size: int = BRICK_SIZE) -> List[Key]:
+    """Bricks having a point in ``box`` (a point on a brick border belongs to both bricks)."""
+    ranges = []
+    for d, count in enumerate(brick_counts(shape, brick_size)):
+        lo, hi = box[2 * d], box[2 * d + 1]
+        ranges.append(range(max(-(-lo // brick_size) - 1, 0), min(hi // brick_size, count - 1) + 1))
+    return [(z, y, x) for z in ranges[0] for y in ranges[1] for x in ranges[2]]
+
+
+@dataclass
+class BrickJob:
+    key: Key
+    generation: int
+    voxels: np.ndarray  # copy of the brick points plus halo
+    voxel_box: Box  # where ``voxels`` sits in the volume
+    point_box: Box  # the brick's own points
+    frame: tuple  # (extent start (x, y, z), spacing, origin, direction 9-tuple) of the volume
+
+
+def geometry_key(image) -> tuple:
+    """(extent, spacing, origin, direction 9-tuple) of a vtkImageData."""
+    d = image.GetDirectionMatrix()
+    direction = tuple(d.GetElement(i, j) for i in range(3) for j in range(3))
+    return (tuple(image.GetExtent()), tuple(image.GetSpacing()), tuple(image.GetOrigin()), direction)
+
+
+def _is_empty(occupancy, box: Box) -> bool:
+    # no labeled slice crosses the box along some axis
+    for d, axis in enumerate((2, 1, 0)):
+        counts = occupancy.counts(axis)
+        if not counts[box[2 * d]:box[2 * d + 1] + 1].any():
+            return True
+    return False
+
+
+def boundary_triangles(volume: np.ndarray, values):
+    """
+    Marching-cubes boundaries of each of ``values`` in the (z, y, x) label
+    ``volume``: (points in (x, y, z) array indices, (n, 3) triangles, label
+    of each triangle), or None if there are none. A voxel is inside a label
+    only if it holds that value, so the triangles of a label do not depend
+    on what the other voxels hold.
+    """
+    if min(volume.shape) < 2:
+        return None
+    nz, ny, nx = volume.shape
+    image = vtk.vtkImageData()
+    image.SetExtent(0, nx - 1, 0, ny - 1, 0, nz - 1)
+    scalars = numpy_support.numpy_to_vtk(np.ascontiguousarray(volume).reshape(-1), deep=True)
+    image.GetPointData().SetScalars(scalars)
+
+    contour = vtk.vtkDiscreteMarchingCubes()
+    contour.SetInputData(image)
+    for i, value in enumerate(values):
+        contour.SetValue(i, value)
+    contour.ComputeNormalsOff()
+    contour.ComputeGradientsOff()
+    contour.ComputeScalarsOn()
+    contour.Update()
+    surface = contour.GetOutput()
+    if surface.GetNumberOfPolys() == 0:
+        return None
+    points = numpy_support.vtk_to_numpy(surface.GetPoints().GetData()).astype(np.float64)
+    triangles = numpy_support.vtk_to_numpy(surface.GetPolys().GetConnectivityArray()).reshape(-1, 3)
+    labels = numpy_support.vtk_to_numpy(surface.GetCellData().GetScalars())
+    return points, triangles, labels
+
+
+def triangle_cells(points: np.ndarray, triangles: np.ndarray) -> np.ndarray:
+    """(x, y, z) index of the cell holding each triangle's centroid."""
+    return np.floor(points[triangles].mean(axis=1)).astype(np.int64)
+
+
+def _gradient_normals(volume: np.ndarray, value, points: np.ndarray) -> np.ndarray:
+    # marching-cubes points lie halfway between two voxels: average their
+    # central-difference gradients of the label mask (one-sided at the array border)
+    upper = np.array(volume.shape[::-1]) - 1
+    gradient = np.zeros_like(points)
+    for end in (np.floor(points).astype(np.int64), np.ceil(points).astype(np.int64)):
+        for axis in range(3):
+            before, after = end.copy(), end.copy()
+            before[:, axis] = np.maximum(end[:, axis] - 1, 0)
+            after[:, axis] = np.minimum(end[:, axis] + 1, upper[axis])
+            inside_after = volume[after[:, 2], after[:, 1], after[:, 0]] == value
+            inside_before = volume[before[:, 2], before[:, 1], before[:, 0]] == value
+            gradient[:, axis] += (inside_after.astype(np.float64) - inside_before) / np.maximum(after[:, axis] - before[:, axis], 1)
+    return -gradient  # out of the label
+
+
+def label_mesh(volume: np.ndarray, value, points: np.ndarray, triangles: np.ndarray, offset, frame) -> vtk.vtkPolyData:
+    """
+    vtkPolyData of ``triangles`` (from boundary_triangles() of ``volume``)
+    of label ``value`` in world coordinates, with gradient normals.
+    ``offset`` is the (x, y, z) array index of ``volume`` in the volume of
+    ``frame`` (see BrickJob).
+    """
+    start, spacing, origin, direction = frame
+    used, local = np.unique(triangles, return_inverse=True)
+    normals = _gradient_normals(volume, value, points[used])
+    rotation = np.array(direction, dtype=np.float64).reshape(3, 3)
+    world = (points[used] + np.add(offset, start)) @ (rotation * np.array(spacing)).T + np.array(origin)
+    normals = (normals / np.array(spacing)) @ rotation.T
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+    mesh = vtk.vtkPolyData()
+    vtk_points = vtk.vtkPoints()
+    vtk_points.SetData(numpy_support.numpy_to_vtk(world.astype(np.float32), deep=True))
+    mesh.SetPoints(vtk_points)
+    cells = vtk.vtkCellArray()
+    cells.SetData(
+        numpy_support.numpy_to_vtkIdTypeArray(np.arange(0, 3 * len(triangles) + 1, 3, dtype=np.int64), deep=True),
+        numpy_support.numpy_to_vtkIdTypeArray(local.astype(np.int64).reshape(-1), deep=True),
+    )
+    mesh.SetPolys(cells)
+    vtk_normals = numpy_support.numpy_to_vtk(normals.astype(np.float32), deep=True)
+    vtk_normals.SetName("Normals")
+    mesh.GetPointData().SetNormals(vtk_normals)
+    return mesh
+
+
+def contour_brick(job: BrickJob) -> Optional[vtk.vtkPolyData]:
+    """The marching-cubes surface of the labeled voxels in the brick cells, in world coordinates, or None if empty."""
+    voxels = (job.voxels != 0).astype(np.uint8)
+    if not voxels.any() or voxels.all():
+        return None
+    result = boundary_triangles(voxels, [1])
+    if result is None:
+        return None
+    points, triangles, _ = result
+
+    # keep the triangles of the brick's own cells, the halo only feeds the normals
+    z0, _, y0, _, x0, _ = job.voxel_box
+    pz0, pz1, py0, py1, px0, px1 = job.point_box
+    cells = triangle_cells(points, triangles) + np.array([x0, y0, z0])
+    lo = np.array([px0, py0, pz0])
+    hi = np.array([px1, py1, pz1])
+    kept = triangles[((cells >= lo) & (cells < hi)).all(axis=1)]
+    if len(kept) == 0:
+        return None
+    return label_mesh(voxels, 1, points, kept, (x0, y0, z0), job.frame)
+
+
+def contour_bricks(jobs: List[BrickJob], is_cancelled: Callable[[], bool] = lambda: False):
+    """[(key, generation, mesh or None)] of ``jobs``, or None if cancelled between bricks."""
+    results = []
+    for job in jobs:
+        if is_cancelled():
+            return None
+        results.append((job.key, job.generation, contour_brick(job)))
+    return results
+
+
+class BrickSurfaces:
+    def __init__(self, brick_size: int = BRICK_SIZE):
+        self.brick_size = int(brick_size)
+        self.meshes: Dict[Key, vtk.vtkPolyData] = {}  # non-empty bricks only
+        self.poly_data = vtk.vtkPolyData()  # all brick meshes, the displayed surface
+        self._geometry = None
+        self._generation: Dict[Key, int] = {}  # latest planned generation per brick
+        self._counter = 0
+
+    def clear(self) -> None:
+        self.meshes.clear()
+        self._generation.clear()
+        self._geometry = None
+        self.poly_data.Initialize()
+
+    def plan(self, image, read_region: Callable[[Box], np.ndarray], occupancy=None, dirty_extent=None) -> List[BrickJob]:
+        """
+        Jobs for the bricks ``dirty_extent`` (None: all) touches. ``image``
+        gives the layer geometry and ``read_region(box)`` copies layer voxels.
+        Bricks that ``occupancy`` shows empty are dropped without a job;
+        call ``apply`` even when no job is returned.
+        """
+        if image is None:
+            self.clear()
+            return []
+        geometry = geometry_key(image)
+        if geometry != self._geometry:
+            # new or reoriented volume: nothing cached is valid
+            self.meshes.clear()
+            self._geometry = geometry
+            dirty_extent = None
+
+        extent = geometry[0]
+        shape = (extent[5] - extent[4] + 1, extent[3] - extent[2] + 1, extent[1] - extent[0] + 1)
+        if dirty_extent is None:
+            box = (0, shape[0] - 1, 0, shape[1] - 1, 0, shape[2] - 1)
+        else:
+            clipped = dirty_region.clip(dirty_extent, extent)
+            if dirty_region.is_empty(clipped):
+                return []
+            box = dirty_region.to_zyx_box(clipped, extent)
+
+        frame = (extent[::2],) + geometry[1:]
+        if occupancy is not None and occupancy.whole_extent != extent:
+            occupancy = None
+        jobs = []
+        for key in bricks_in_box(shape, box, self.brick_size):
+            self._counter += 1
+            self._generation[key] = self._counter
+            point_box = brick_point_box(key, shape, self.brick_size)
+            if occupancy is not None and _is_empty(occupancy, point_box):
+                self.meshes.pop(key, None)
+                continue
+            voxel_box = tuple(
+                max(v - 1, 0) if i % 2 == 0 else min(v + 1, shape[i // 2] - 1)
+                for i, v in enumerate(point_box)
+            )
+            jobs.append(BrickJob(key, self._counter, read_region(voxel_box), voxel_box, point_box, frame))
+        return jobs
+
+    def apply(self, results) -> None:
+        """Store (key, generation, mesh or None) results of current jobs and rebuild ``poly_data``."""
+        for key, generation, mesh in results:
+            if self._generation.get(key) != generation:
+                continue  # superseded by a later plan
+            if mesh is None:
+                self.meshes.pop(key, None)
+            else:
+                self.meshes[key] = mesh
+        self._rebuild()
+
+    def adopt(self, geometry: tuple, meshes: Dict[Key, vtk.vtkPolyData]) -> None:
+        """
+        Take brick meshes built elsewhere (surface_batch.py) for a volume of
+        ``geometry`` (geometry_key()); later plans then only redo the
+        bricks an edit touches. Results of earlier plans are ignored.
+        """
+        self.meshes = dict(meshes)
+        self._geometry = geometry
+        self._generation.clear()
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        if not self.meshes:
+            self.poly_data.Initialize()
+            return
+        append = vtk.vtkAppendPolyData()
+        for key in sorted(self.meshes):
+            append.AddInputData(self.meshes[key])
+        append.Update()
+        self.poly_data.ShallowCopy(append.GetOutput())
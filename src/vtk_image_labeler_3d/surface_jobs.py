@@ -0,0 +1,171 @@
+"""
+Bounded worker pool for surface extraction.
+
+At most ``workers`` jobs run at once (default: one thread per core but
+one). Each owner, e.g. a layer surface, has at most one pending job: a new
+request replaces the one still waiting and tells the owner's running job
+to stop at its next cancellation check (between bricks). A running job is
+never joined by a second one of the same owner. Results come back on the
+UI thread through the job's ``on_done``; cancelled jobs deliver nothing.
+Queue depth and job times are kept for the status bar.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from paint_loop import LatencyStats
+
+
+class SurfaceJob:
+    def __init__(self, owner, run: Callable[[Callable[[], bool]], object], on_done: Callable[[object], None]):
+        self.owner = owner
+        self.run = run  # run(is_cancelled) -> result, called on a worker thread
+        self.on_done = on_done  # on_done(result), called on the UI thread
+        self._cancelled = threading.Event()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+class SurfaceJobPool(QObject):
+    stats_changed = pyqtSignal()  # queue depth or job times changed (also emitted by workers)
+    _finished = pyqtSignal(object, object, float)  # (job, result, ms), queued to the UI thread
+
+    def __init__(self, workers: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        if workers is None:
+            workers = max((os.cpu_count() or 2) - 1, 1)
+        self.workers = int(workers)
+        self.job_times = LatencyStats()
+
+        self._pending: "OrderedDict[object, SurfaceJob]" = OrderedDict()  # owner -> job, oldest first
+        self._running: Dict[object, SurfaceJob] = {}
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._finished.connect(self._deliver)
+        self._threads: List[threading.Thread] = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"surface-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # ----- requests (UI thread) -----
+
+    def submit(self, owner, run, on_done) -> SurfaceJob:
+        """Queue ``run`` for ``owner``, superseding its pending job and cancelling its running one."""
+        job = SurfaceJob(owner, run, on_done)
+        with self._cond:
+            running = self._running.get(owner)
+            if running is not None:
+                running.cancel()
+            # a superseded job keeps its place in the queue
+            self._pending[owner] = job
+            self._cond.notify()
+        self.stats_changed.emit()
+        return job
+
+    def cancel(self, owner) -> None:
+        with self._cond:
+            self._pending.pop(owner, None)
+            running = self._running.get(owner)
+            if running is not None:
+                running.cancel()
+        self.stats_changed.emit()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._pending.clear()
+            for job in self._running.values():
+                job.cancel()
+            self._cond.notify_all()
+
+    # ----- stats -----
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def running_count(self) -> int:
+        with self._cond:
+            return len(self._running)
+
+    def wait_idle(self, timeout: float = 10.0) -> bool:
+        """Block until no job is queued or running (for tests; results still need the event loop)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and not self._running, timeout)
+
+    def stats(self) -> dict:
+        """Queued and running jobs and job times (see LatencyStats.summary())."""
+        return {"queued": self.queue_depth(), "running": self.running_count(), "job_times": self.job_times.summary()}
+
+    def status_text(self) -> str:
+        s = self.stats()
+        text = f"3D surfaces: {s['queued']} queued, {s['running']} running"
+        if s["job_times"]["count"]:
+            text += f", job time mean {s['job_times']['mean_ms']:.0f} ms, max {s['job_times']['max_ms']:.0f} ms"
+        return text
+
+    # ----- workers -----
+
+    def _next_job(self) -> Optional[SurfaceJob]:
+        for owner, job in self._pending.items():
+            if owner not in self._running:
+                del self._pending[owner]
+                self._running[owner] = job
+                return job
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopped:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                if self._stopped:
+                    return
+
+            start = time.perf_counter()
+            result = None
+            try:
+                result = job.run(job.is_cancelled)
+            except Exception as exc:
+                print(f"Surface job failed: {exc}")
+            ms = (time.perf_counter() - start) * 1000.0
+
+            # queued for the UI thread before the job counts as done (see wait_idle)
+            self._finished.emit(job, result, ms)
+            with self._cond:
+                self._running.pop(job.owner, None)
+                self._cond.notify_all()
+            self.stats_changed.emit()
+
+    def _deliver(self, job, result, ms) -> None:
+        if not job.is_cancelled() and result is not None:
+            self.job_times.add(ms)
+            job.on_done(result)
+        self.stats_changed.emit()
+
+
+_pool: Optional[SurfaceJobPool] = None
+
+
+def get_surface_job_pool() -> SurfaceJobPool:
+    """The application-wide pool (created on first use, after the QApplication)."""
+    global _pool
+    if _pool is None:
+        _pool = SurfaceJobPool()
+    return _pool
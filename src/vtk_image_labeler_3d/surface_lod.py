@@ -0,0 +1,90 @@
+"""
+Reduced meshes of layer surfaces for camera interaction.
+
+While the 3D view is rotated or zoomed each surface shows a decimated copy
+of its mesh; the full-resolution mesh comes back when the interaction
+ends. The triangle budget (setting ``surface_triangle_budget``) is shared
+by all visible surfaces in proportion to their full triangle counts.
+``build_lod`` runs in the surface job pool and can also smooth the mesh
+(setting ``surface_smoothing``).
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Dict, Optional
+
+import vtk
+
+SMOOTHING_ITERATIONS = 15
+SMOOTHING_PASS_BAND = 0.1
+
+
+def triangle_targets(counts: Dict[object, int], budget: int) -> Dict[object, Optional[int]]:
+    """
+    Per-surface triangle targets sharing ``budget`` in proportion to
+    ``counts``; None for every surface if the budget is 0 (no decimation)
+    or the surfaces already fit.
+    """
+    total = sum(counts.values())
+    if budget <= 0 or total <= budget:
+        return {key: None for key in counts}
+    return {key: max(int(budget * n / total), 1) for key, n in counts.items()}
+
+
+def _normals(poly):
+    normals = vtk.vtkPolyDataNormals()
+    normals.SetInputData(poly)
+    normals.SplittingOff()
+    normals.ConsistencyOn()
+    normals.Update()
+    return normals.GetOutput()
+
+
+def build_lod(mesh, target_triangles: Optional[int], smoothing: bool,
+              is_cancelled: Callable[[], bool] = lambda: False):
+    """
+    (smoothed mesh or None, decimated mesh or None) of ``mesh`` (any
+    thread); None if cancelled between stages. The decimated mesh has
+    about ``target_triangles`` triangles and is only built if ``mesh`` has
+    more; it is made from the smoothed mesh when smoothing.
+    """
+    count = mesh.GetNumberOfPolys()
+    decimate = target_triangles is not None and count > target_triangles
+    if count == 0 or not (decimate or smoothing):
+        return None, None
+
+    # brick meshes are appended without merging their shared border points
+    clean = vtk.vtkCleanPolyData()
+    clean.SetInputData(mesh)
+    clean.Update()
+    source = clean.GetOutput()
+    if is_cancelled():
+        return None
+
+    smoothed = None
+    if smoothing:
+        smoother = vtk.vtkWindowedSincPolyDataFilter()
+        smoother.SetInputData(source)
+        smoother.SetNumberOfIterations(SMOOTHING_ITERATIONS)
+        smoother.SetPassBand(SMOOTHING_PASS_BAND)
+        smoother.BoundarySmoothingOff()
+        smoother.FeatureEdgeSmoothingOff()
+        smoother.NonManifoldSmoothingOn()
+        smoother.NormalizeCoordinatesOn()
+        smoother.Update()
+        smoothed = _normals(smoother.GetOutput())
+        source = smoothed
+        if is_cancelled():
+            return None
+
+    lod = None
+    if decimate:
+        decimation = vtk.vtkQuadricDecimation()
+        decimation.SetInputData(source)
+        decimation.SetTargetReduction(1.0 - target_triangles / count)
+        decimation.VolumePreservationOn()
+        decimation.Update()
+        lod = _normals(decimation.GetOutput())
+        if is_cancelled():
+            return None
+    return smoothed, lod
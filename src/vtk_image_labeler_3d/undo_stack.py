@@ -0,0 +1,345 @@
+"""
+Brick-based undo/redo for segmentation layer edits.
+
+Volumes are split into ``BRICK_SIZE``³ bricks. An undo step stores the
+zlib-compressed before/after contents of only the bricks an edit changed.
+Compressed bricks are kept in RAM up to a byte budget; beyond that the
+least recently used steps are spilled to an anonymous temp file. Space of
+dropped steps in that file is reclaimed: the file is truncated once no
+spilled step is left and rewritten when dead bytes pass ``SPILL_DEAD_BYTES``.
+
+The stack knows nothing about VTK or Qt: each transaction is given a
+``get_volume`` callable returning a writable (z, y, x) NumPy view of the
+target's current voxels.
+"""
+
+from __future__ import annotations
+
+import tempfile
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+BRICK_SIZE = 32
+
+_ZLIB_LEVEL = 1
+
+# dead bytes of dropped steps tolerated in the spill file before it is compacted
+SPILL_DEAD_BYTES = 64 * 1024 * 1024
+
+BrickKey = Tuple[int, int, int]
+Box = Tuple[int, int, int, int, int, int]  # inclusive (z0, z1, y0, y1, x0, x1)
+
+
+def _brick_slices(key: BrickKey, shape) -> tuple[slice, slice, slice]:
+    return tuple(
+        slice(k * BRICK_SIZE, min((k + 1) * BRICK_SIZE, n)) for k, n in zip(key, shape)
+    )
+
+
+def _bricks_in_box(box: Box, shape) -> List[BrickKey]:
+    """Keys of the bricks intersecting ``box`` after clipping it to ``shape``."""
+    ranges = []
+    for d in range(3):
+        lo = max(int(box[2 * d]), 0)
+        hi = min(int(box[2 * d + 1]), shape[d] - 1)
+        if hi < lo:
+            return []
+        ranges.append(range(lo // BRICK_SIZE, hi // BRICK_SIZE + 1))
+    return [(z, y, x) for z in ranges[0] for y in ranges[1] for x in ranges[2]]
+
+
+def _changed_bricks(before: np.ndarray, after: np.ndarray) -> List[BrickKey]:
+    """Keys of the bricks where ``before`` and ``after`` differ."""
+    changed = before != after
+    for d in range(3):
+        starts = np.arange(0, changed.shape[d], BRICK_SIZE)
+        changed = np.logical_or.reduceat(changed, starts, axis=d)
+    return [tuple(int(i) for i in key) for key in np.argwhere(changed)]
+
+
+class _Blob:
+    """Compressed brick payload held in RAM or in the spill file."""
+
+    __slots__ = ("data", "offset", "length")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = -1
+        self.length = len(data)
+
+
+class UndoEntry:
+    """One undoable edit: the changed bricks of a single target."""
+
+    def __init__(self, label, target, get_volume, shape, dtype, bricks: Dict[BrickKey, Tuple[_Blob, _Blob]]):
+        self.label = label
+        self.target = target
+        self.get_volume = get_volume
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.bricks = bricks
+        self.last_used = 0
+
+    def ram_bytes(self) -> int:
+        return sum(b.length for pair in self.bricks.values() for b in pair if b.data is not None)
+
+    def spilled_bytes(self) -> int:
+        return sum(b.length for pair in self.bricks.values() for b in pair if b.data is None)
+
+    def box(self) -> Optional[Box]:
+        """Bounding array-index box of the stored bricks."""
+        if not self.bricks:
+            return None
+        keys = np.array(list(self.bricks.keys()))
+        lo = keys.min(axis=0) * BRICK_SIZE
+        hi = np.minimum((keys.max(axis=0) + 1) * BRICK_SIZE, self.shape) - 1
+        return (int(lo[0]), int(hi[0]), int(lo[1]), int(hi[1]), int(lo[2]), int(hi[2]))
+
+
+class EditTransaction:
+    """
+    Collects the "before" state of an edit in progress.
+
+    Either call ``touch(box)`` before each write (brush strokes: only the
+    touched bricks are copied) or ``snapshot()`` once before a whole-volume
+    operation. ``UndoStack.commit`` then keeps only the bricks that changed.
+    """
+
+    def __init__(self, label, target, get_volume: Callable[[], np.ndarray]):
+        self.label = label
+        self.target = target
+        self.get_volume = get_volume
+        volume = get_volume()
+        self.shape = volume.shape
+        self.dtype = volume.dtype
+        self._before: Dict[BrickKey, np.ndarray] = {}
+        self._snapshot: Optional[np.ndarray] = None
+
+    def touch(self, box: Optional[Box]) -> None:
+        """Copy the bricks intersecting the (z0, z1, y0, y1, x0, x1) box, once each."""
+        if self._snapshot is not None:
+            return
+        if box is None:
+            self.snapshot()
+            return
+        volume = None
+        for key in _bricks_in_box(box, self.shape):
+            if key in self._before:
+                continue
+            if volume is None:
+                volume = self.get_volume()
+            self._before[key] = volume[_brick_slices(key, self.shape)].copy()
+
+    def snapshot(self) -> None:
+        """Copy the whole volume; released again when the transaction is committed."""
+        if self._snapshot is None:
+            self._snapshot = self.get_volume().copy()
+            self._before.clear()
+
+    def _changed_bricks(self, after: np.ndarray) -> Dict[BrickKey, Tuple[np.ndarray, np.ndarray]]:
+        out = {}
+        if self._snapshot is not None:
+            for key in _changed_bricks(self._snapshot, after):
+                sl = _brick_slices(key, self.shape)
+                out[key] = (self._snapshot[sl], after[sl])
+        else:
+            for key, before in self._before.items():
+                a = after[_brick_slices(key, self.shape)]
+                if not np.array_equal(before, a):
+                    out[key] = (before, a)
+        return out
+
+
+class UndoStack:
+    """Linear undo/redo history with a RAM budget and LRU spill to disk."""
+
+    def __init__(self, ram_budget_bytes: int = 256 * 1024 * 1024, max_steps: int = 100, spill_dir=None):
+        self.ram_budget_bytes = int(ram_budget_bytes)
+        self.max_steps = int(max_steps)
+        self.spill_dir = spill_dir
+        self._undo: List[UndoEntry] = []
+        self._redo: List[UndoEntry] = []
+        self._spill = None
+        self._clock = 0
+
+    # ----- state -----
+
+    def can_undo(self) -> bool:
+        return len(self._undo) > 0
+
+    def can_redo(self) -> bool:
+        return len(self._redo) > 0
+
+    def undo_label(self):
+        return self._undo[-1].label if self._undo else None
+
+    def redo_label(self):
+        return self._redo[-1].label if self._redo else None
+
+    def peek(self, redo: bool = False) -> Optional[UndoEntry]:
+        """The step the next undo (or redo) would apply, without applying it."""
+        entries = self._redo if redo else self._undo
+        return entries[-1] if entries else None
+
+    def ram_bytes(self) -> int:
+        return sum(e.ram_bytes() for e in self._undo + self._redo)
+
+    def spill_file_bytes(self) -> int:
+        """Size of the spill file, including the dead bytes of dropped steps."""
+        if self._spill is None:
+            return 0
+        return self._spill.seek(0, 2)
+
+    def clear(self) -> None:
+        self._undo.clear()
+        self._redo.clear()
+        self._reclaim_spill()
+
+    def remove_target(self, target) -> None:
+        """Drop every step that edits ``target`` (e.g. a deleted layer)."""
+        self._undo = [e for e in self._undo if e.target is not target]
+        self._redo = [e for e in self._redo if e.target is not target]
+        self._reclaim_spill()
+
+    def set_limits(self, ram_budget_bytes=None, max_steps=None) -> None:
+        if ram_budget_bytes is not None:
+            self.ram_budget_bytes = int(ram_budget_bytes)
+        if max_steps is not None:
+            self.max_steps = int(max_steps)
+        self._enforce_limits()
+
+    # ----- recording -----
+
+    def begin(self, label, target, get_volume: Callable[[], np.ndarray]) -> EditTransaction:
+        return EditTransaction(label, target, get_volume)
+
+    def commit(self, txn: EditTransaction) -> Optional[UndoEntry]:
+        """Record the changed bricks of ``txn``; returns None if nothing changed."""
+        after = txn.get_volume()
+        if after.shape != txn.shape:
+            # geometry changed (e.g. layer replaced by a resampled image): not undoable brick-wise
+            return None
+
+        changed = txn._changed_bricks(after)
+        txn._before.clear()
+        txn._snapshot = None
+        if not changed:
+            return None
+
+        bricks = {
+            key: (_Blob(self._compress(b)), _Blob(self._compress(a)))
+            for key, (b, a) in changed.items()
+        }
+        entry = UndoEntry(txn.label, txn.target, txn.get_volume, txn.shape, txn.dtype, bricks)
+        self._touch(entry)
+        self._undo.append(entry)
+        self._redo.clear()
+        self._enforce_limits()
+        return entry
+
+    # ----- undo / redo -----
+
+    def undo(self) -> Optional[UndoEntry]:
+        if not self._undo:
+            return None
+        entry = self._undo[-1]
+        # the step stays on the undo stack if it cannot be applied
+        self._apply(entry, 0)
+        self._redo.append(self._undo.pop())
+        self._touch(entry)
+        self._enforce_limits()
+        return entry
+
+    def redo(self) -> Optional[UndoEntry]:
+        if not self._redo:
+            return None
+        entry = self._redo[-1]
+        self._apply(entry, 1)
+        self._undo.append(self._redo.pop())
+        self._touch(entry)
+        self._enforce_limits()
+        return entry
+
+    def _apply(self, entry: UndoEntry, which: int) -> None:
+        volume = entry.get_volume()
+        if volume.shape != entry.shape:
+            raise ValueError(
+                f"Cannot apply '{entry.label}': volume shape {volume.shape} != recorded {entry.shape}"
+            )
+        for key, pair in entry.bricks.items():
+            sl = _brick_slices(key, entry.shape)
+            shape = tuple(s.stop - s.start for s in sl)
+            data = np.frombuffer(zlib.decompress(self._read(pair[which])), dtype=entry.dtype)
+            volume[sl] = data.reshape(shape)
+
+    # ----- storage -----
+
+    @staticmethod
+    def _compress(arr: np.ndarray) -> bytes:
+        return zlib.compress(np.ascontiguousarray(arr).tobytes(), _ZLIB_LEVEL)
+
+    def _touch(self, entry: UndoEntry) -> None:
+        self._clock += 1
+        entry.last_used = self._clock
+
+    def _read(self, blob: _Blob) -> bytes:
+        if blob.data is not None:
+            return blob.data
+        self._spill.seek(blob.offset)
+        return self._spill.read(blob.length)
+
+    def _spill_entry(self, entry: UndoEntry) -> None:
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix="undo_", dir=self.spill_dir)
+        self._spill.seek(0, 2)
+        for pair in entry.bricks.values():
+            for blob in pair:
+                if blob.data is None:
+                    continue
+                blob.offset = self._spill.tell()
+                self._spill.write(blob.data)
+                blob.data = None
+
+    def _reclaim_spill(self) -> None:
+        """Give back spill file space of dropped steps (see SPILL_DEAD_BYTES)."""
+        if self._spill is None:
+            return
+        live = sum(e.spilled_bytes() for e in self._undo + self._redo)
+        if live == 0:
+            self._spill.seek(0)
+            self._spill.truncate()
+            return
+        dead = self.spill_file_bytes() - live
+        if dead <= SPILL_DEAD_BYTES:
+            return
+        # rewrite the live blobs into a fresh file
+        old, self._spill = self._spill, tempfile.TemporaryFile(prefix="undo_", dir=self.spill_dir)
+        for entry in self._undo + self._redo:
+            for pair in entry.bricks.values():
+                for blob in pair:
+                    if blob.data is None:
+                        old.seek(blob.offset)
+                        blob.offset = self._spill.tell()
+                        self._spill.write(old.read(blob.length))
+        old.close()
+
+    def _enforce_limits(self) -> None:
+        if self.max_steps > 0:
+            while len(self._undo) > self.max_steps:
+                self._undo.pop(0)
+
+        ram = self.ram_bytes()
+        if ram > self.ram_budget_bytes:
+            # spill least recently used steps first, keeping the most recent in RAM
+            candidates = sorted(self._undo + self._redo, key=lambda e: e.last_used)
+            for entry in candidates[:-1]:
+                if ram <= self.ram_budget_bytes:
+                    break
+                in_ram = entry.ram_bytes()
+                if in_ram:
+                    self._spill_entry(entry)
+                    ram -= in_ram
+        # steps trimmed above or dropped redo branches may have left dead bytes
+        self._reclaim_spill()
@@ -0,0 +1,177 @@
+"""
+Per-view cache of world / slice-index / volume-index / camera transforms.
+
+Pointer handling (painting, status text, brush cursor) needs the same few
+matrices on every mouse move. ``ViewTransformCache`` keeps them as NumPy
+arrays and rebuilds a group only when its source changes: the camera group
+on the camera's ``ModifiedEvent`` (or a viewport resize), the slice and
+volume groups when the viewer calls ``set_slice_image`` / ``set_volume_image``
+on a slice or image change.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+import vtk_image_wrapper
+
+
+class ViewTransformCache:
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self._camera = None
+        self._camera_observer = None
+        self._camera_group = None
+        self._slice_image = None
+        self._slice_group = None
+        self._volume_image = None
+        self._volume_group = None
+
+    # ----- invalidation -----
+
+    def _on_camera_modified(self, obj, event):
+        self._camera_group = None
+
+    def invalidate_camera(self):
+        self._camera_group = None
+
+    def set_slice_image(self, vtk_image):
+        """Call whenever the displayed slice (or its geometry) changes."""
+        self._slice_image = vtk_image
+        self._slice_group = None
+        self._volume_group = None
+
+    def set_volume_image(self, vtk_image):
+        """Call whenever the 3D image the slice is cut from changes."""
+        self._volume_image = vtk_image
+        self._volume_group = None
+
+    def invalidate(self):
+        self._camera_group = None
+        self._slice_group = None
+        self._volume_group = None
+
+    # ----- groups -----
+
+    def _camera_transforms(self):
+        camera = self.renderer.GetActiveCamera()
+        if camera is not self._camera:
+            if self._camera is not None and self._camera_observer is not None:
+                self._camera.RemoveObserver(self._camera_observer)
+            self._camera = camera
+            self._camera_observer = camera.AddObserver("ModifiedEvent", self._on_camera_modified)
+            self._camera_group = None
+
+        window = self.renderer.GetRenderWindow()
+        size = tuple(window.GetSize()) if window is not None else (0, 0)
+        viewport = tuple(self.renderer.GetViewport())
+        group = self._camera_group
+        if group is not None and group["size"] == size and group["viewport"] == viewport:
+            return group
+
+        import vtk_camera_wrapper
+        cam = vtk_camera_wrapper.vtk_camera_wrapper(camera)
+        w_H_camo = cam.get_w_H_o()
+
+        aspect = self.renderer.GetTiledAspectRatio()
+        m = camera.GetCompositeProjectionTransformMatrix(aspect, -1, 1)
+        view_H_w = np.array([[m.GetElement(i, j) for j in range(4)] for i in range(4)])
+
+        group = {
+            "size": size,
+            "viewport": viewport,
+            "w_H_camo": w_H_camo,
+            "camo_H_w": np.linalg.inv(w_H_camo),
+            "z_near": float(camera.GetClippingRange()[0]),
+            "w_H_view": np.linalg.inv(view_H_w),
+            "focal_point": np.array(camera.GetFocalPoint()),
+            "direction_of_projection": np.array(camera.GetDirectionOfProjection()),
+        }
+        self._camera_group = group
+        return group
+
+    def _slice_transforms(self):
+        if self._slice_group is None and self._slice_image is not None:
+            wrapper = vtk_image_wrapper.vtk_image_wrapper(self._slice_image)
+            w_H_sliceI = wrapper.get_w_H_I()
+            w_H_sliceo = wrapper.get_w_H_o()
+            self._slice_group = {
+                "dims": wrapper.get_dimensions(),
+                "w_H_sliceI": w_H_sliceI,
+                "sliceI_H_w": np.linalg.inv(w_H_sliceI),
+                "plane_point_w": w_H_sliceo[:3, 3].copy(),
+                "plane_normal_w": w_H_sliceo[:3, 2].copy(),
+            }
+        return self._slice_group
+
+    def _volume_transforms(self):
+        if self._volume_group is None and self._volume_image is not None:
+            slice_group = self._slice_transforms()
+            if slice_group is None:
+                return None
+            wrapper = vtk_image_wrapper.vtk_image_wrapper(self._volume_image)
+            imageI_H_w = wrapper.get_I_H_w()
+            self._volume_group = {
+                "imageI_H_w": imageI_H_w,
+                "imageI_H_sliceI": imageI_H_w @ slice_group["w_H_sliceI"],
+            }
+        return self._volume_group
+
+    # ----- conversions -----
+
+    def display_to_world(self, x, y):
+        """
+        World point under display pixel (x, y), on the slice plane if a slice
+        is set, else on the camera focal plane. Unlike vtkWorldPointPicker this
+        does not read back the depth buffer.
+        """
+        cam = self._camera_transforms()
+        width, height = cam["size"]
+        vp = cam["viewport"]
+        vw = (vp[2] - vp[0]) * width
+        vh = (vp[3] - vp[1]) * height
+        if vw <= 0 or vh <= 0:
+            return cam["focal_point"].copy()
+
+        nx = 2.0 * (x - vp[0] * width) / vw - 1.0
+        ny = 2.0 * (y - vp[1] * height) / vh - 1.0
+        ends = cam["w_H_view"] @ np.array([[nx, nx], [ny, ny], [-1.0, 1.0], [1.0, 1.0]])
+        p0 = ends[:3, 0] / ends[3, 0]
+        p1 = ends[:3, 1] / ends[3, 1]
+
+        slice_group = self._slice_transforms()
+        if slice_group is not None:
+            point, normal = slice_group["plane_point_w"], slice_group["plane_normal_w"]
+        else:
+            point, normal = cam["focal_point"], cam["direction_of_projection"]
+
+        ray = p1 - p0
+        denom = float(np.dot(normal, ray))
+        if abs(denom) < 1e-12:
+            return p0
+        t = float(np.dot(normal, point - p0)) / denom
+        return p0 + t * ray
+
+    def world_to_slice_index(self, pt_w):
+        """Continuous (i, j, k) index of a world point in the displayed slice image."""
+        g = self._slice_transforms()
+        return (g["sliceI_H_w"] @ np.array([pt_w[0], pt_w[1], pt_w[2], 1.0]))[:3]
+
+    def slice_index_to_volume_index(self, slice_index):
+        """Continuous volume index of a (i, j) slice index."""
+        g = self._volume_transforms()
+        return (g["imageI_H_sliceI"] @ np.array([slice_index[0], slice_index[1], 0.0, 1.0]))[:3]
+
+    def slice_dimensions(self):
+        return self._slice_transforms()["dims"]
+
+    def view_direction(self):
+        """Unit direction of projection (the camera z axis) in world coordinates."""
+        return self._camera_transforms()["direction_of_projection"]
+
+    def project_to_near_plane(self, pt_w, offset=0.001):
+        """Move a world point along the view direction onto the camera near plane (+offset)."""
+        cam = self._camera_transforms()
+        pt_camo = cam["camo_H_w"] @ np.array([pt_w[0], pt_w[1], pt_w[2], 1.0])
+        pt_camo[2] = cam["z_near"] + offset
+        return (cam["w_H_camo"] @ pt_camo)[:3]
@@ -10,9 +10,12 @@ from PyQt5.QtWidgets import (
 from PyQt5.QtWidgets import QWidget, QHBoxLayout, QCheckBox, QLabel, QListWidgetItem, QColorDialog
 from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QPen, QIcon
 
-from PyQt5.QtCore import pyqtSignal, QObject, QTimer
+from PyQt5.QtCore import pyqtSignal, QObject
 
 from logger import logger
+import view_transforms
+import render_scheduler
+import window_level_lut
 
 
 class Panning(QObject):
@@ -344,10 +347,10 @@ class VTKViewer2D(QWidget):
     def __init__(self, name = None, parent=None):
         super().__init__(parent)
 
-        # delayed rendering
-        self.render_timer = QTimer()
-        self.render_timer.setSingleShot(True)
-        self.render_timer.timeout.connect(self.render)
+        # renders go through the application-wide scheduler (one render per view per frame)
+        self.render_scheduler = render_scheduler.get_render_scheduler()
+
+        self.window_level_table = window_level_lut.WindowLevelTable()
 
         self.name = name
 
@@ -358,6 +361,9 @@ class VTKViewer2D(QWidget):
         self.renderer.GetActiveCamera().SetParallelProjection(True)
         self.renderer.SetInteractive(True)
 
+        # cached world/index/camera matrices for pointer handling
+        self.transforms = view_transforms.ViewTransformCache(self.renderer)
+
         # Create a QVTKRenderWindowInteractor
         self.vtk_widget = QVTKRenderWindowInteractor(self)
         self.render_window = self.vtk_widget.GetRenderWindow()  # Retrieve the render window
@@ -402,10 +408,23 @@ class VTKViewer2D(QWidget):
         self.setLayout(layout)
 
     def render(self):
-        self.get_render_window().Render()
+        """Render on the next display frame; requests within the same frame coalesce."""
+        self.render_scheduler.mark_dirty(self)
    
     def render_delayed(self, delayed_render_ms=100):
-        self.render_timer.start(delayed_render_ms)  
+        self.render_scheduler.mark_dirty(self, delayed_render_ms)
+
+    def request_render(self):
+        self.render_scheduler.mark_dirty(self)
+
+    def render_now(self):
+        """Render immediately, outside the frame loop (covers a pending request)."""
+        self.render_scheduler.render_now(self)
+
+    def enterEvent(self, event):
+        # the view under the cursor renders first
+        self.render_scheduler.set_focus_view(self)
+        super().enterEvent(event)
 
     def get_interactor(self):
         return self.interactor
@@ -437,6 +456,8 @@ class VTKViewer2D(QWidget):
             self.render()
 
     def cleanup_vtk(self, event):
+        self.render_scheduler.cancel(self)
+
         if hasattr(self, 'interactor') and self.interactor is not None:
             self.interactor.Disable()
             self.interactor.TerminateApp()
@@ -456,6 +477,7 @@ class VTKViewer2D(QWidget):
             self.image_actor = None
 
         self.vtk_image = None
+        self.transforms.set_slice_image(None)
 
         self.text_bottom_left.set_text('')
         self.text_bottom_right.set_text('')
@@ -473,17 +495,17 @@ class VTKViewer2D(QWidget):
     def set_vtk_image(self, vtk_image, window, level):
 
         self.vtk_image = vtk_image
+        self.transforms.set_slice_image(vtk_image)
                 
-        # Connect reader to window/level filter
-        self.window_level_filter = vtk.vtkImageMapToWindowLevelColors()
-        #self.window_level_filter.SetOutputFormatToRGB()
+        # window/level through a uint8 lookup table (shared by the views of a VTKViewer3D)
+        self.window_level_filter = window_level_lut.WindowLevelMapper(self.window_level_table)
         self.window_level_filter.SetInputData(vtk_image)
         self.window_level_filter.SetWindow(window)
         self.window_level_filter.SetLevel(level)
         self.window_level_filter.Update()
 
         self.image_actor = vtk.vtkImageActor()
-        self.image_actor.GetMapper().SetInputConnection(self.window_level_filter.GetOutputPort())
+        self.image_actor.GetMapper().SetInputData(self.window_level_filter.GetOutput())
 
         self.get_renderer().AddActor(self.image_actor)
         
@@ -616,11 +638,7 @@ class VTKViewer2D(QWidget):
 
 
     def project_world_point_to_camera_near_plane(self, pt_w):
-        camera = self.get_renderer().GetActiveCamera()
-        import vtk_camera_wrapper
-        cam = vtk_camera_wrapper.vtk_camera_wrapper(camera)
-        pt_near_w  =  cam.project_point_to_camera_near_plane_w(pt_w)
-        return pt_near_w
+        return self.transforms.project_to_near_plane(pt_w)
 
     def add_ruler(self):
         """Add a ruler to the center of the current view and enable interaction."""
@@ -683,7 +701,7 @@ class VTKViewer2D(QWidget):
 
     def on_mouse_move(self, obj, event):
         self.print_status_with_mouse_coordiantes()
-        self.render()
+        self.request_render()
 
         self.mouse_event_obj = obj
         self.mouse_event = event 
@@ -776,17 +794,8 @@ class VTKViewer2D(QWidget):
         mouse_pos = self.interactor.GetEventPosition()
         event_data["mouse_point"] = mouse_pos
 
-        # Use a picker to get world coordinates
-        picker = vtk.vtkWorldPointPicker()
-        picker.Pick(mouse_pos[0], mouse_pos[1], 0, self.get_renderer())
-
-        # Get world position
-        world_pos = picker.GetPickPosition()
-
-        # Check if the world position is valid
-        if not picker.GetPickPosition():
-            print("Mouse is outside the render area.")
-            return event_data
+        # world position on the image plane (cached camera/slice transforms)
+        world_pos = tuple(self.transforms.display_to_world(mouse_pos[0], mouse_pos[1]))
 
         event_data["world_point"] = world_pos
 
@@ -799,15 +808,10 @@ class VTKViewer2D(QWidget):
             print("No image loaded.")
             return event_data
 
-        import vtk_image_wrapper
         import numpy as np
 
-        slice_wrapper = vtk_image_wrapper.vtk_image_wrapper(self.vtk_image)
-        dims = slice_wrapper.get_dimensions()
-        sliceI_H_w = slice_wrapper.get_I_H_w()
-
-        pt_w = np.array([*world_pos, 1.0]).reshape(4,1)
-        pt_sliceI = (sliceI_H_w @ pt_w).flatten()
+        dims = self.transforms.slice_dimensions()
+        pt_sliceI = self.transforms.world_to_slice_index(world_pos)
 
         image_index = np.rint(pt_sliceI[:2]).astype(int)
         event_data["image_index"] = image_index
@@ -816,7 +820,7 @@ class VTKViewer2D(QWidget):
         if 0 <= image_index[0] < dims[0] and 0 <= image_index[1] < dims[1]:
             # Get the pixel value
             scalars = vtk_image.GetPointData().GetScalars()
-            flat_index = image_index[1] * dims[1] + image_index[0]
+            flat_index = image_index[1] * dims[0] + image_index[0]
             pixel_value = scalars.GetTuple1(flat_index)
 
             event_data['pixel_value'] = pixel_value
@@ -1020,9 +1024,6 @@ class VTKViewer2D(QWidget):
         
         self.zooming.zoom(type, emit_event)
 
-    def render(self):
-        self.get_render_window().Render()
-
 
 from PyQt5.QtWidgets import QWidget, QVBoxLayout
 import os
@@ -1550,6 +1551,7 @@ class MainWindow(QMainWindow):
 
             self.vtk_viewer.window_level_filter.SetWindow(window)
             self.vtk_viewer.window_level_filter.SetLevel(level)
+            self.vtk_viewer.window_level_filter.Update()
             self.vtk_viewer.get_render_window().Render()
 
             self.print_status(f"Window: {window}, Level: {level}")
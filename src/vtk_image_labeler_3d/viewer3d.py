@@ -107,6 +107,9 @@ class Slicing(QObject):
         self.slicing_step_size = slice_step_size
         self.slice_index = slice_index
 
+        # optional callable(step) -> nearest labeled slice index or None (Page Up/Down)
+        self.find_labeled_slice = None
+
     def enable(self, enabled=True):
         self.enabled = enabled
 
@@ -162,6 +165,11 @@ class Slicing(QObject):
             self.move_slice_up()
         elif key == "Down":
             self.move_slice_down()
+        elif key in ("Prior", "Next") and self.find_labeled_slice is not None:
+            # Page Up/Down: jump to the next/previous labeled slice
+            index = self.find_labeled_slice(1 if key == "Prior" else -1)
+            if index is not None:
+                self.set_slice_index(index)
 
 from PyQt5.QtCore import QTimer
 
@@ -259,73 +267,13 @@ class SliceIndicator():
     def set_color(self, color):
         self.actor.GetProperty().SetColor(*color) 
 
-from reslicer import ReslicerWithImageActor
-from typing import List
-
-class SegmentationLayerReslicerList():
-
-    def __init__(self):
-        self._reslicers: List[ReslicerWithImageActor] = []
-    
-    def clear(self):
-        for reslicer in self._reslicers:
-            reslicer.clear()
-        self._reslicers.clear()
-
-    def get_reslicer_by_layer_name(self, name):
-        for reslicer in self._reslicers:
-            if reslicer.layer.get_name() == name:
-                return reslicer
-        return None
-
-    def add_reslicer(self, reslicer):
-        
-        # add list as parent
-        reslicer.parent_list = self
-
-        # add to the list
-        self._reslicers.append(reslicer)
-
-    
-    def remove_reslicer_by_layer_name(self,name):
-        reslicer = self.get_reslicer_by_layer_name(name)
-        if reslicer:
-
-            reslicer.parent_list = None
-
-            self._reslicers.remove(reslicer)
-
-            return reslicer
-        
-        return None
-        
-    def pop(self, name):
-        return self.remove_reslicer_by_layer_name(name)
-    
-    def get_reslicers(self):
-        return self._reslicers
-    
-    def get_layer_names(self):
-        return [reslicer.layer.get_name() for reslicer in self.get_reslicers()]
-
-
-    # def __getitem__(self, key):
-    #     return self.get_reslicer_by_layer_name(key)
-
-    # def __delitem__(self, key):
-    #     self.remove_reslicer_by_layer_name(key)
-
-    # def __setitem__(self, key, value):
-    #     # if exists, remove first
-    #     self.remove_reslicer_by_layer_name(key)
-
-    #     # add layer
-    #     self.add_reslicer(value)
-
-
-    
 import viewer2d
 import reslicer
+import composite_overlay
+import dirty_region
+import slice_cache
+import volume_pyramid
+import window_level_lut
 class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
     
     slice_changed = pyqtSignal(QObject)
@@ -339,26 +287,49 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
         self.slice_index = None
         self.slicing = Slicing(self.get_interactor())
         self.slicing.slice_changed.connect(self.on_slice_changed)
+        self.slicing.find_labeled_slice = self.next_labeled_slice
         self.slicing.enable(True)
 
-        self.segmentation_layer_reslicers = SegmentationLayerReslicerList()
+        # all segmentation layers are drawn by one overlay pipeline
+        self.overlay = composite_overlay.CompositeOverlay(axis, viewer=self)
+        for actor in self.overlay.get_actors():
+            self.get_renderer().AddActor(actor)
 
         self.slice_plane_object = SlicePlaneObject(slice_plane_color)
         self.slice_indicators_of_other_views = {}
 
+        # shared slice_cache.SliceCache / SlicePrefetcher, set by VTKViewer3D
+        self.slice_cache = None
+        self.prefetcher = None
+        self.prefetch_count = 8
+
+        # volume_pyramid.VolumePyramid set by VTKViewer3D: while scrolling or
+        # changing window/level, the level matching the screen pixel size is
+        # shown and refined to full resolution once input stops
+        self.pyramid = None
+        self.display_level = 0
+        self._level_reslicers = {}
+        self._coarse_slice = vtk.vtkImageData()
+        self.refine_delay_ms = 200
+        self.refine_timer = QTimer(self)
+        self.refine_timer.setSingleShot(True)
+        self.refine_timer.timeout.connect(self._refine)
+
     def clear(self):
         if self.vtk_image_3d == None:
             return 
 
         self.reslicer.clear()
         self.vtk_image_3d = None
+        self.transforms.set_volume_image(None)
         self.slice_index = None
-        
-        for seg_reslicer in self.segmentation_layer_reslicers.get_reslicers():
-            for actor in seg_reslicer.get_actors():
-                self.get_renderer().RemoveActor(actor)
 
-        self.segmentation_layer_reslicers.clear()
+        self.refine_timer.stop()
+        self.pyramid = None
+        self.display_level = 0
+        self._level_reslicers.clear()
+        
+        self.overlay.clear()
 
         # hide slice indicators
         for name, slice_indicator in self.slice_indicators_of_other_views.items():
@@ -373,9 +344,30 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
     def get_slice_index(self):
         return self.slicing.get_slice_index()
     
+    def next_labeled_slice(self, step=1):
+        """
+        Nearest slice after the current one (step > 0) or before it (step < 0)
+        that is labeled in any visible layer, or None.
+        """
+        if self.slice_index is None:
+            return None
+        best = None
+        for layer in self.overlay.get_layers():
+            if not layer.get_visible():
+                continue
+            occupancy = layer.get_slice_occupancy()
+            if occupancy is None:
+                continue
+            index = occupancy.next_labeled_slice(self.reslicer.axis, self.slice_index, step)
+            if index is not None and (best is None or (index < best if step > 0 else index > best)):
+                best = index
+        return best
+
     def _set_slice(self, slice):
         self.slice = slice
         self.vtk_image = slice
+        # also covers a new slice position written into the same reslice output
+        self.transforms.set_slice_image(slice)
 
     def _get_slice(self):
         return self.vtk_image
@@ -418,6 +410,103 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
          
         self.render()
 
+    def _get_base_slice(self, index):
+        """
+        The image slice at ``index``. Axial slices are views of the volume;
+        coronal and sagittal ones are copies and go through the slice cache.
+        """
+        cut = self.reslicer.slice_array_job(index)
+        if self.slice_cache is None or cut is None or self.reslicer.slice_is_zero_copy():
+            return self.reslicer.get_slice_image(index)
+        key = self._base_slice_key(index)
+        flat = self.slice_cache.get(key)
+        if flat is None:
+            flat = cut()
+            self.slice_cache.put(key, flat, flat.nbytes)
+        return self.reslicer.wrap_slice_array(index, flat)
+
+    def _base_slice_key(self, index):
+        image = self.reslicer.vtk_image
+        return ("base", self.reslicer.axis, index, id(image), image.GetMTime())
+
+    def _prefetch_slices(self, new_slice_index, old_slice_index):
+        """Queue the next slices in the scroll direction for the worker thread."""
+        if self.prefetcher is None or self.prefetch_count <= 0 or old_slice_index is None:
+            return
+        step = 1 if new_slice_index > old_slice_index else -1
+        lo, hi = self.reslicer.get_slice_index_min_max()
+        indices = [i for i in range(new_slice_index + step, new_slice_index + step * (self.prefetch_count + 1), step)
+                   if lo <= i <= hi]
+
+        jobs = []
+        if not self.reslicer.slice_is_zero_copy():
+            for index in indices:
+                key = self._base_slice_key(index)
+                cut = self.reslicer.slice_array_job(index)
+                if cut is None or self.slice_cache.contains(key):
+                    continue
+
+                def job(cut=cut):
+                    flat = cut()
+                    return flat, flat.nbytes
+                jobs.append((key, job))
+        jobs += self.overlay.prefetch_jobs(indices)
+        self.prefetcher.request(self, jobs)
+
+    def _interactive_level(self):
+        """Pyramid level matching the size of a screen pixel (0 = full resolution)."""
+        if self.pyramid is None:
+            return 0
+        height = self.get_render_window().GetSize()[1]
+        pixel_size = 2.0 * self.renderer.GetActiveCamera().GetParallelScale() / max(height, 1)
+        return self.pyramid.level_for_pixel_size(self.reslicer.axis, pixel_size)
+
+    def _get_coarse_slice(self, index, level):
+        """Slice of pyramid ``level`` containing slice ``index``, placed in that slice's plane."""
+        image = self.pyramid.level(level)
+        r = self._level_reslicers.get(level)
+        if r is None or r.vtk_image is not image:
+            r = self._level_reslicers[level] = reslicer.Reslicer(
+                self.reslicer.axis, image, background_value=self.reslicer.background_value)
+        level_slice = r.get_slice_image(self.pyramid.level_index(level, self.reslicer.axis, index))
+
+        coarse = self._coarse_slice
+        coarse.ShallowCopy(level_slice)
+        d = self.vtk_image_3d.GetDirectionMatrix()
+        normal = np.array([d.GetElement(i, self.reslicer.axis) for i in range(3)])
+        origin = np.array(coarse.GetOrigin())
+        plane_origin = np.array(self.reslicer.slice_geometry(index)[2])
+        coarse.SetOrigin(*(origin + normal * np.dot(plane_origin - origin, normal)))
+        return coarse
+
+    def _show_base_slice(self, index, level=0):
+        """Show image slice ``index``, from pyramid ``level`` > 0 until the refine timer fires."""
+        # picking, pixel values and painting always use the full-resolution slice;
+        # only the display pipeline gets the coarse one
+        self._set_slice(self._get_base_slice(index))
+        self._show_display_level(index, level)
+
+    def _show_display_level(self, index, level):
+        """Feed the window/level pipeline from pyramid ``level`` (0: the full-resolution slice)."""
+        if level > 0:
+            display = self._get_coarse_slice(index, level)
+            self.refine_timer.start(self.refine_delay_ms)
+        else:
+            display = self.vtk_image
+            self.refine_timer.stop()
+        self.display_level = level
+
+        self.window_level_filter.SetInputData(display)
+        self.window_level_filter.Update()
+
+    def _refine(self):
+        if self.display_level == 0 or self.vtk_image_3d is None or self.slice_index is None:
+            return
+        # the full-resolution slice is already cut (see _show_base_slice)
+        self._show_display_level(self.slice_index, 0)
+        self.update_slice_plane_object()
+        self.render()
+
     def on_slice_changed(self, new_slice_index, old_slice_index, sender):
         print(f'slice_index={new_slice_index}')
 
@@ -427,20 +516,16 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
         if self.slice_index == new_slice_index:
             return 
        
-        # get the center slice
-        new_slice = self.reslicer.get_slice_image(new_slice_index)
-    
-        self._set_slice(new_slice)
+        # get the new slice (coarse while scrolling, else cached or cut from the volume)
+        old_slice_index = self.slice_index
         self.slice_index = new_slice_index
-                
-        # Connect reader to window/level filter
-        self.window_level_filter.SetInputData(new_slice)
-        self.window_level_filter.Update()
+        self._show_base_slice(new_slice_index, self._interactive_level())
     
-        # update the segmentation reslicers
-        for reslicer in self.segmentation_layer_reslicers.get_reslicers():
-            if reslicer.layer.get_visible():
-                reslicer.set_slice_index_and_update_slice_actor(new_slice_index)
+        # update the segmentation overlay
+        self.overlay.update(new_slice_index)
+
+        # compute the slices further along the scroll direction in the background
+        self._prefetch_slices(new_slice_index, old_slice_index)
 
         # update slice plane object
         self.update_slice_plane_object()
@@ -466,10 +551,15 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
 
     def set_window_level(self, window, level):
         if self.window_level_filter:
+            # drags map the coarse slice; full resolution follows when idle
+            coarse = self._interactive_level()
+            if coarse > 0 and self.slice_index is not None:
+                self._show_display_level(self.slice_index, coarse)
+
             self.window_level_filter.SetWindow(window)
             self.window_level_filter.SetLevel(level)
             self.window_level_filter.Update()
-            self.get_render_window().Render()
+            self.render()
 
             self.update_slice_plane_object()
 
@@ -530,6 +620,7 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
     def set_vtk_image_3d(self, vtk_image_3d, window, level):
 
         self.vtk_image_3d = vtk_image_3d 
+        self.transforms.set_volume_image(vtk_image_3d)
 
         self.reslicer.set_vtk_image(vtk_image_3d)
         
@@ -555,31 +646,45 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
 
         self.reset_camera()
 
+    def rebind_vtk_image_3d(self):
+        """
+        Show vtk_image_3d again after it was changed in place (e.g. rotated):
+        the reslicer, window/level mapper, actors and overlay are kept and
+        only pick up the new geometry, starting at the center slice.
+        """
+        image = self.vtk_image_3d
+        if image is None:
+            return
+
+        self.refine_timer.stop()
+        self.display_level = 0
+        self._level_reslicers.clear()
+
+        self.transforms.set_volume_image(image)
+        self.reslicer.set_vtk_image(image)
+
+        slice, index = self.reslicer.get_slice_image_at_center()
+        self._set_slice(slice)
+        self.slice_index = index
+        self.slicing.set_slice_index(index)
+
+        self.window_level_filter.SetInputData(slice)
+        self.window_level_filter.Update()
+        self.overlay.update(index)
+
+        self.update_slice_plane_object()
+        self.reset_camera()
+
     def set_segmentation_layers(self, segmentaiton_layers):
         self.segmentaiton_layers = segmentaiton_layers
 
     def on_segmentation_layer_added(self, layer_name, sender):
         print(f'VTKViewer2DWithReslicer.on_segmentation_layer_added({layer_name})')
 
-        # seg item
         layer = self.segmentaiton_layers[layer_name]
-        seg3d = layer.get_image()
-        vtk_color = layer.get_vtk_color()
-        alpha = layer.get_alpha()
-        
-        # create a reslicer with actor
-        axis = self.reslicer.axis
-        slice_index = self.reslicer.slice_index 
-        seg_reslicer = reslicer.ReslicerWithImageActor(axis = axis, vtk_image=seg3d, background_value=0, fill_color=vtk_color, fill_alpha=alpha, border_line_color = vtk_color, viewer = self)
-        seg_reslicer.layer = layer # reference to the layer
-        seg_reslicer.set_slice_index_and_update_slice_actor(slice_index)
-        for actor in seg_reslicer.get_actors():
-            self.get_renderer().AddActor(actor)
-        
-        # add to segmentaion reslicer list        
-        #layer.reslicer = seg_reslicer # this would not work because layer can have multiple reslicers
-        self.segmentation_layer_reslicers.add_reslicer(seg_reslicer)
-                
+        self.overlay.add_layer(layer)
+        self.overlay.update(self.reslicer.slice_index)
+
         self.render_delayed(100)
 
         layer.visibility_changed.connect(self.on_layer_visibility_changed)
@@ -587,42 +692,42 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
         layer.color_changed.connect(self.on_layer_color_changed)
         layer.alpha_changed.connect(self.on_layer_alpha_changed)
         layer.image_changed.connect(self.on_layer_image_changed)
+        layer.storage_changed.connect(self.on_layer_storage_changed)
 
-    def update_slice_and_render(self, layer):
-        seg_reslicer = self.segmentation_layer_reslicers.get_reslicer_by_layer_name(layer.get_name())
+    def on_layer_storage_changed(self, sender):
+        layer = sender
+        if self.overlay.has_layer(layer) and layer.is_compact():
+            # drop our reference so the dense voxels can be freed
+            self.overlay.release_layer_image(layer)
 
-        if seg_reslicer:
-            seg_reslicer.set_slice_index_and_update_slice_actor(self.slice_index)
-            
-            # if active view, render right away, if not do delayed render.
-            if self.active:
-                self.render()
-            else: 
-                self.render_delayed(1000)
+    def update_slice_and_render(self, layer, dirty_extent=None):
+        # edits that do not touch the displayed slice leave this view unchanged
+        if not dirty_region.intersects_slice(dirty_extent, self.reslicer.axis, self.slice_index):
+            return
+
+        if self.overlay.has_layer(layer):
+            self.overlay.update(self.slice_index)
+
+            # the render scheduler renders the view under the cursor and the
+            # active view first and defers the rest to later frames if needed
+            self.request_render()
         
-    def on_segmentation_image_modified(self, layer, sender):
-        self.update_slice_and_render(layer)
+    def on_segmentation_image_modified(self, layer, sender, dirty_extent=None):
+        self.update_slice_and_render(layer, dirty_extent)
 
-    def on_layer_image_changed(self, sender):
+    def on_layer_image_changed(self, sender, dirty_extent=None):
         layer = sender
         print(f'VTKViewer2DWithReslicer.on_layer_image_changed({layer.get_name()})')
-        seg_reslicer = self.segmentation_layer_reslicers.get_reslicer_by_layer_name(layer.get_name())
-        if seg_reslicer is not None:
-            # Rebind if set_image() replaced the vtkImageData object.
-            new_image = layer.get_image()
-            if new_image is not None and seg_reslicer.vtk_image is not new_image:
-                seg_reslicer.set_vtk_image(new_image)
-        self.update_slice_and_render(layer)
+        # the overlay rebinds to a vtkImageData replaced by set_image() on its next update
+        self.update_slice_and_render(layer, dirty_extent)
 
     def on_segmentation_layer_removed(self, layer, sender):
         segmentation_list_manager = sender
         print(f'VTKViewer2DWithReslicer.on_segmentation_layer_removed({layer.get_name()})')
 
-        # remove 
-        seg_reslicer = self.segmentation_layer_reslicers.pop(layer.get_name())
-        if seg_reslicer:
-            for actor in seg_reslicer.get_actors():
-                self.get_renderer().RemoveActor(actor)
+        if self.overlay.has_layer(layer):
+            self.overlay.remove_layer(layer)
+            self.overlay.update(self.slice_index)
             self.render()
 
     def on_layer_visibility_changed(self, sender): 
@@ -630,24 +735,17 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
         new_visibility = sender.get_visible()
         print(f'Visibility changed to {new_visibility} for {layer_name}')
 
-        seg_reslicer = self.segmentation_layer_reslicers.get_reslicer_by_layer_name(layer_name)
-        
-        if seg_reslicer:
-            seg_reslicer.set_slice_index_and_update_slice_actor(self.slice_index)
-            for actor in seg_reslicer.get_actors():
-                actor.SetVisibility(new_visibility)
+        if self.overlay.has_layer(sender):
+            self.overlay.update(self.slice_index)
             self.render()
         else:
-            print(f'Layer {layer_name} not found in segmentation_layer_reslicers')
+            print(f'Layer {layer_name} not found in the segmentation overlay')
 
     def on_layer_name_changed(self, old_layer_name, sender):
         new_layer_name = sender.get_name()
         print(f'name changed from {old_layer_name} to {new_layer_name}')
 
-        # if old_layer_name in self.segmentation_layer_reslicers:
-        #     self.segmentation_layer_reslicers[new_layer_name] = self.segmentation_layer_reslicers.pop(old_layer_name)
-        # else:
-        #     print(f'Warning: layer {old_layer_name} not found in segmentation_layer_reslicers')
+        # the overlay holds the layer objects, so a rename needs no bookkeeping
 
     def on_layer_color_changed(self, sender):
         
@@ -657,9 +755,7 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
 
         print(f'layer [{name}] color changed to {vtk_color}')
         
-        seg_reslicer = self.segmentation_layer_reslicers.get_reslicer_by_layer_name(name)
-
-        seg_reslicer.set_color(vtk_color)
+        self.overlay.update(self.slice_index)
 
         self.render()
 
@@ -671,9 +767,7 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
 
         print(f'layer [{name}] alpha changed to {alpha}')
         
-        seg_reslicer = self.segmentation_layer_reslicers.get_reslicer_by_layer_name(name)
-
-        seg_reslicer.set_alpha(alpha)
+        self.overlay.update(self.slice_index)
 
         self.render()
 
@@ -685,21 +779,11 @@ class VTKViewer2DWithReslicer(viewer2d.VTKViewer2D):
 
         # event data on the 2d slice image
         event_data = super().get_mouse_event_coordiantes()
-                
-        import vtk_image_wrapper
-        slice_wrapper = vtk_image_wrapper.vtk_image_wrapper(self.vtk_image)
-        image_wrapper = vtk_image_wrapper.vtk_image_wrapper(self.vtk_image_3d)
-        
-        # convert from slice I to 3d image I
-        w_H_sliceI = slice_wrapper.get_w_H_I()
-        imageI_H_w = image_wrapper.get_I_H_w()
-        imageI_H_sliceI = imageI_H_w @ w_H_sliceI
-
-        # index on the slice
-        sliceI = np.array([event_data['image_index'][0],event_data['image_index'][1], 0.0, 1.0], dtype=float).reshape(4,1)
+        if 'image_index' not in event_data or self.vtk_image_3d is None:
+            return event_data
 
-        # index on the 3d image
-        imageI = (imageI_H_sliceI @ sliceI).flatten()
+        # index on the 3d image (slice I -> 3d image I, cached per slice)
+        imageI = self.transforms.slice_index_to_volume_index(event_data['image_index'])
 
         # override image_index
         event_data["image_index"] = np.rint(imageI[:3]).astype(int)
@@ -834,6 +918,7 @@ class VTKViewer3D(QWidget):
     
         self.rulers = []
         self.vtk_image = None
+        self.pyramid = None
 
         self.viewer_ax = VTKViewer2DWithReslicer(reslicer.AXIAL, name="Axial", slice_plane_color=[1, 0, 0],  parent=self) 
         self.viewer_cr = VTKViewer2DWithReslicer(reslicer.CORONAL, name="Coronal", slice_plane_color=[0, 1, 0], parent=self) 
@@ -850,6 +935,21 @@ class VTKViewer3D(QWidget):
 
         self.viewers_2d = [self.viewer_ax, self.viewer_cr, self.viewer_sg]
         self.viewers = [self.viewer_ax, self.viewer_cr, self.viewer_sg, self.viewer_surf]
+
+        # the slice views map window/level through one shared lookup table
+        self.window_level_table = window_level_lut.WindowLevelTable()
+        for v in self.viewers_2d:
+            v.window_level_table = self.window_level_table
+
+        # resliced base and overlay slices of all views share one LRU cache and prefetch worker
+        self.slice_cache = slice_cache.SliceCache(0)
+        self.slice_prefetcher = slice_cache.SlicePrefetcher(self.slice_cache)
+        for v in self.viewers_2d:
+            v.slice_cache = self.slice_cache
+            v.prefetcher = self.slice_prefetcher
+            v.overlay.cache = self.slice_cache
+        self.apply_slice_cache_settings_from_config()
+        self.apply_border_settings_from_config()
         
         # listen to view chnages from viewers
         for v in self.viewers_2d:
@@ -961,6 +1061,42 @@ class VTKViewer3D(QWidget):
                         print(f'setting the slice index to {new_slice_index} for viewer {v.name}')
                         v.slicing.set_slice_index(new_slice_index)
 
+    def apply_slice_cache_settings_from_config(self):
+        from config import get_config
+        conf = get_config()
+        self.slice_cache.set_max_bytes(int(conf.get("slice_cache_mb", 256)) * 1024 * 1024)
+        for v in self.viewers_2d:
+            v.prefetch_count = int(conf.get("slice_prefetch_count", 8))
+
+    def apply_border_settings_from_config(self):
+        from config import get_config
+        decimation = int(get_config().get("border_decimation_percent", 0)) / 100.0
+        for v in self.viewers_2d:
+            if v.overlay.borders.decimation != decimation:
+                v.overlay.borders.decimation = decimation
+                v.overlay.update(v.slice_index)
+                v.render()
+
+    def apply_surface_settings_from_config(self):
+        self.viewer_surf.apply_surface_settings_from_config()
+        self.viewer_surf.apply_volume_settings_from_config()
+
+    def get_render_stats(self):
+        """Per-view render times from the render scheduler (see LatencyStats.summary())."""
+        return self.viewer_ax.render_scheduler.timing_summary()
+
+    def get_slice_cache_stats(self):
+        """Hit rate and memory use of the slice cache (see SliceCache.stats())."""
+        return self.slice_cache.stats()
+
+    def get_surface_job_stats(self):
+        """Queue depth and job times of the surface job pool (see SurfaceJobPool.stats())."""
+        return self.viewer_surf.surface_job_pool.stats()
+
+    def get_volume_render_stats(self):
+        """Frame times of the 3D volume rendering (see VolumeRendering.stats())."""
+        return self.viewer_surf.volume_rendering.stats()
+
     def get_viewers_2d(self):
         return self.viewers_2d
 
@@ -1038,6 +1174,14 @@ class VTKViewer3D(QWidget):
         for v in self.viewers:
             v.clear()
 
+        for v in self.viewers_2d:
+            self.slice_prefetcher.cancel(v)
+        self.slice_cache.clear()
+
+        if self.pyramid is not None:
+            self.pyramid.stop()
+            self.pyramid = None
+
         self.vtk_image = None
 
         self.render()
@@ -1103,10 +1247,53 @@ class VTKViewer3D(QWidget):
         for v in self.viewers_2d:
             v.set_vtk_image_3d(vtk_image, window, level)
 
+        self._start_pyramid()
+
         #self.viewer_ax.set_slice_index(100)
         #self.viewer_cr.set_slice_index(100)
         #self.viewer_sg.set_slice_index(100)
 
+        self._show_image_properties()
+
+        self.viewer_surf.set_vtk_image(vtk_image)
+
+    def rebind_vtk_image(self):
+        """
+        The image was changed in place (orientation.reorient_image): rebind
+        the existing view pipelines to its new geometry instead of tearing
+        them down. Segmentation layers follow through their image_changed.
+        """
+        vtk_image = self.vtk_image
+        if vtk_image is None:
+            return
+
+        # cached and prefetched slices have the old layout
+        for v in self.viewers_2d:
+            self.slice_prefetcher.cancel(v)
+        self.slice_cache.clear()
+        if self.pyramid is not None:
+            self.pyramid.stop()
+
+        self._start_pyramid()
+        for v in self.viewers_2d:
+            v.rebind_vtk_image_3d()
+
+        self._show_image_properties()
+
+        # the outline follows the image through its pipeline
+        self.viewer_surf.get_renderer().ResetCamera()
+        self.viewer_surf.render()
+
+    def _start_pyramid(self):
+        # coarse copies for scrolling and window/level on large volumes, built in the background
+        self.pyramid = volume_pyramid.VolumePyramid(self.vtk_image)
+        self.pyramid.start()
+        for v in self.viewers_2d:
+            v.pyramid = self.pyramid
+        self.viewer_surf.set_volume_pyramid(self.pyramid)
+
+    def _show_image_properties(self):
+        vtk_image = self.vtk_image
 
         # display image properties
         dims = vtk_image.GetDimensions()
@@ -1125,8 +1312,6 @@ class VTKViewer3D(QWidget):
             for v in self.viewers_2d:
                 if v is not source_viewer:
                     v.update_slice_indicator(source_viewer)
-
-        self.viewer_surf.set_vtk_image(vtk_image)
         
     def set_segmentation_layers(self, segmentation_layers):
         self.segmentation_layers = segmentation_layers
@@ -1142,9 +1327,9 @@ class VTKViewer3D(QWidget):
         for v in self.viewers:
             v.on_segmentation_layer_added(layer.get_name(), sender)
 
-    def on_segmentation_image_modified(self, layer, sender):
+    def on_segmentation_image_modified(self, layer, sender, dirty_extent=None):
         for v in self.viewers:
-            v.on_segmentation_image_modified(layer, sender)            
+            v.on_segmentation_image_modified(layer, sender, dirty_extent)            
 
     def on_segmentation_layer_removed(self, layer, sender):
         for v in self.viewers:
@@ -1155,6 +1340,8 @@ class VTKViewer3D(QWidget):
             v.on_active_segmentation_layer_changed(sender)
 
     def set_window_level(self, window, level):
+        # the views share one lookup table: it is rebuilt once, then each view maps its slice
+        self.window_level_table.set_window_level(window, level)
         for v in self.viewers_2d:
             v.set_window_level(window, level)
 
@@ -0,0 +1,143 @@
+"""
+Lazily built 2x downsampled copies of a volume for interactive display.
+
+``VolumePyramid`` computes level k (2**k coarser along each axis, block
+means) on a background thread, each level from the previous one, down to
+levels whose smallest axis still has ``min_size`` voxels. A level is a
+vtkImageData covering the same world box as the full-resolution blocks it
+averages, so its slices can stand in for full-resolution slices while the
+user scrolls or drags window/level. Levels are for display only: edits and
+painting always go to the full-resolution volume.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import List, Optional
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+
+def downsample2(volume: np.ndarray) -> np.ndarray:
+    """
+    Mean of 2x2x2 blocks of a (z, y, x[, c]) array; odd axes repeat their
+    last plane. Works one output plane at a time to bound temporary memory.
+    """
+    nz, ny, nx = volume.shape[:3]
+    out = np.empty(((nz + 1) // 2, (ny + 1) // 2, (nx + 1) // 2) + volume.shape[3:], dtype=volume.dtype)
+    rows = np.minimum(np.arange(2 * out.shape[1]), ny - 1)
+    cols = np.minimum(np.arange(2 * out.shape[2]), nx - 1)
+    for z in range(out.shape[0]):
+        pair = volume[[2 * z, min(2 * z + 1, nz - 1)]]
+        if ny % 2 or nx % 2:
+            pair = pair[:, rows][:, :, cols]
+        block = pair.reshape((2, out.shape[1], 2, out.shape[2], 2) + volume.shape[3:])
+        mean = block.mean(axis=(0, 2, 4), dtype=np.float32)
+        if np.issubdtype(volume.dtype, np.integer):
+            mean = np.rint(mean)
+        out[z] = mean
+    return out
+
+
+class VolumePyramid:
+    def __init__(self, image, min_size: int = 32):
+        self.image = image
+        dims = image.GetDimensions()
+        self.max_level = 0
+        while min(d for d in dims if d > 1) >= 2 * min_size:
+            dims = [(d + 1) // 2 if d > 1 else d for d in dims]
+            self.max_level += 1
+
+        self._arrays: List[np.ndarray] = []  # levels 1.. as (z, y, x[, c]) arrays
+        self._images = {}  # level -> vtkImageData, wrapped on the UI thread
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Build the levels on a background thread."""
+        if self._thread is None and self.max_level > 0:
+            self._thread = threading.Thread(target=self._build, name="volume-pyramid", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped = True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every level is built (for tests)."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready_levels() == self.max_level
+
+    def _build(self) -> None:
+        scalars = self.image.GetPointData().GetScalars()
+        volume = numpy_support.vtk_to_numpy(scalars).reshape(self.image.GetDimensions()[::-1] + (-1,))
+        if volume.shape[3] == 1:
+            volume = volume[..., 0]
+        for _ in range(self.max_level):
+            if self._stopped:
+                return
+            volume = downsample2(volume)
+            with self._lock:
+                self._arrays.append(volume)
+
+    def ready_levels(self) -> int:
+        """Number of coarse levels built so far."""
+        with self._lock:
+            return len(self._arrays)
+
+    def level(self, k: int):
+        """vtkImageData of level ``k`` (0 = full resolution), or None while it is being built."""
+        if k == 0:
+            return self.image
+        with self._lock:
+            if k > len(self._arrays):
+                return None
+            array = self._arrays[k - 1]
+        image = self._images.get(k)
+        if image is None:
+            image = self._images[k] = self._wrap(k, array)
+        return image
+
+    def _wrap(self, k, array):
+        f = 2 ** k
+        spacing = np.array(self.image.GetSpacing())
+        lo = np.array(self.image.GetExtent()[::2])
+        d = self.image.GetDirectionMatrix()
+        direction = np.array([[d.GetElement(i, j) for j in range(3)] for i in range(3)])
+        # voxel centers of a level sit at the centers of the blocks they average
+        origin = np.array(self.image.GetOrigin()) + direction @ (spacing * (lo + (f - 1) / 2.0))
+
+        image = vtk.vtkImageData()
+        image.SetDimensions(array.shape[2], array.shape[1], array.shape[0])
+        image.SetSpacing(*(spacing * f))
+        image.SetOrigin(*origin)
+        image.SetDirectionMatrix(d)
+        scalars = self.image.GetPointData().GetScalars()
+        components = scalars.GetNumberOfComponents()
+        vtk_array = numpy_support.numpy_to_vtk(
+            array.reshape(-1, components) if components > 1 else array.reshape(-1),
+            deep=False, array_type=scalars.GetDataType())
+        vtk_array.SetName(scalars.GetName())
+        # the vtk array does not own the memory; _arrays keeps it alive
+        image.GetPointData().SetScalars(vtk_array)
+        return image
+
+    def level_index(self, k: int, axis: int, index: int) -> int:
+        """Index along ``axis`` of the level ``k`` slice containing full-resolution slice ``index``."""
+        return (index - self.image.GetExtent()[2 * axis]) // 2 ** k
+
+    def level_for_pixel_size(self, axis: int, pixel_size: float) -> int:
+        """
+        The coarsest built level whose in-plane voxels (for slices normal to
+        ``axis``) are no larger than ``pixel_size``, the world size of one
+        screen pixel; 0 means full resolution is needed.
+        """
+        spacing = self.image.GetSpacing()
+        voxel = max(s for a, s in enumerate(spacing) if a != axis)
+        k = 0
+        while k < self.ready_levels() and voxel * 2 ** (k + 1) <= pixel_size:
+            k += 1
+        return k
@@ -0,0 +1,192 @@
+"""
+CPU volume rendering of the base image in the 3D view.
+
+``VolumeRendering`` ray casts the image with vtkFixedPointVolumeRayCastMapper,
+which needs no GPU. While the camera moves it renders a coarse level of the
+image's VolumePyramid, the finest one with at most ``interactive_voxels``
+voxels along every axis; the full-resolution image comes back when the
+camera stops. Rendering can be cropped to the bounding box of the labeled
+voxels (``label_bounds``). Frame times are kept separately for interactive
+and still frames so defaults can be picked from real numbers.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+import vtk
+
+from paint_loop import LatencyStats
+
+CROP_MARGIN_VOXELS = 10
+
+
+def label_bounds(layers, margin_voxels: int = CROP_MARGIN_VOXELS):
+    """
+    World (x0, x1, y0, y1, z0, z1) box around the labeled voxels of
+    ``layers``, grown by ``margin_voxels``; None if nothing is labeled.
+    Assumes axis-aligned layer geometry, like the base image in the 3D view.
+    """
+    bounds = None
+    for layer in layers:
+        geometry = layer.get_geometry()
+        occupancy = layer.get_slice_occupancy()
+        if geometry is None or occupancy is None:
+            continue
+        spacing, origin = geometry.GetSpacing(), geometry.GetOrigin()
+        box = []
+        for axis in range(3):
+            labeled = occupancy.labeled_range(axis)
+            if labeled is None:
+                box = None
+                break
+            lo, hi = sorted(origin[axis] + spacing[axis] * (i + s * margin_voxels)
+                            for i, s in zip(labeled, (-1, 1)))
+            box += [lo, hi]
+        if box is None:
+            continue
+        if bounds is None:
+            bounds = box
+        else:
+            bounds = [min(a, b) if i % 2 == 0 else max(a, b) for i, (a, b) in enumerate(zip(bounds, box))]
+    return None if bounds is None else tuple(bounds)
+
+
+def _set_transfer_functions(volume_property, image) -> None:
+    lo, hi = image.GetScalarRange()
+    color = vtk.vtkColorTransferFunction()
+    opacity = vtk.vtkPiecewiseFunction()
+    if lo <= -500 and hi >= 300:
+        # CT in HU: faint skin, opaque bone
+        color.AddRGBPoint(-1000, 0.0, 0.0, 0.0)
+        color.AddRGBPoint(-500, 0.55, 0.25, 0.15)
+        color.AddRGBPoint(0, 0.88, 0.60, 0.50)
+        color.AddRGBPoint(300, 1.0, 0.94, 0.85)
+        color.AddRGBPoint(1200, 1.0, 1.0, 1.0)
+        opacity.AddPoint(-1000, 0.0)
+        opacity.AddPoint(-500, 0.0)
+        opacity.AddPoint(-200, 0.03)
+        opacity.AddPoint(150, 0.03)
+        opacity.AddPoint(300, 0.4)
+        opacity.AddPoint(1200, 0.8)
+    else:
+        # anything else: a grey ramp over the upper part of the range
+        color.AddRGBPoint(lo, 0.0, 0.0, 0.0)
+        color.AddRGBPoint(hi, 1.0, 1.0, 1.0)
+        opacity.AddPoint(lo, 0.0)
+        opacity.AddPoint(lo + 0.2 * (hi - lo), 0.0)
+        opacity.AddPoint(hi, 0.5)
+    volume_property.SetColor(color)
+    volume_property.SetScalarOpacity(opacity)
+
+
+class VolumeRendering:
+    def __init__(self, renderer, on_frame: Optional[Callable[[], None]] = None):
+        self.renderer = renderer
+        self.on_frame = on_frame  # on_frame() after each rendered frame with the volume shown
+        self.interactive_voxels = 128
+        self.still_times = LatencyStats()
+        self.interactive_times = LatencyStats()
+
+        self.mapper = vtk.vtkFixedPointVolumeRayCastMapper()
+        # interactive speed comes from the coarse level, not from sparser samples
+        self.mapper.AutoAdjustSampleDistancesOff()
+        self.mapper.SetCroppingRegionFlagsToSubVolume()
+
+        self.property = vtk.vtkVolumeProperty()
+        self.property.SetInterpolationTypeToLinear()
+        self.property.ShadeOn()
+        self.property.SetAmbient(0.3)
+        self.property.SetDiffuse(0.7)
+        self.property.SetSpecular(0.2)
+
+        self.volume = vtk.vtkVolume()
+        self.volume.SetMapper(self.mapper)
+        self.volume.SetProperty(self.property)
+        self.volume.SetVisibility(False)
+        self.volume.PickableOff()
+        renderer.AddVolume(self.volume)
+
+        self.image = None
+        self.pyramid = None
+        self.enabled = False
+        self.interacting = False
+        self.level = 0  # pyramid level of the mapper input
+        renderer.AddObserver("EndEvent", self._on_render_end)
+
+    def set_image(self, image, pyramid=None) -> None:
+        """Render ``image`` (None: nothing); coarse levels come from ``pyramid`` when built."""
+        self.image = image
+        self.pyramid = pyramid
+        if image is not None:
+            _set_transfer_functions(self.property, image)
+        self._update_input()
+
+    def set_enabled(self, enabled: bool) -> None:
+        self.enabled = bool(enabled)
+        self._update_input()
+
+    def set_interacting(self, interacting: bool) -> None:
+        self.interacting = bool(interacting)
+        self._update_input()
+
+    def set_crop_bounds(self, bounds) -> None:
+        """Render only inside world ``bounds`` (x0, x1, y0, y1, z0, z1); None renders everything."""
+        if bounds is None:
+            self.mapper.CroppingOff()
+        else:
+            self.mapper.SetCroppingRegionPlanes(*bounds)
+            self.mapper.CroppingOn()
+
+    def interactive_level(self) -> int:
+        """The finest built pyramid level with at most ``interactive_voxels`` voxels along every axis."""
+        if self.pyramid is None:
+            return 0
+        size = max(self.image.GetDimensions())
+        k = 0
+        while k < self.pyramid.ready_levels() and size > self.interactive_voxels:
+            k += 1
+            size = (size + 1) // 2
+        return k
+
+    def _update_input(self) -> None:
+        shown = self.enabled and self.image is not None
+        self.volume.SetVisibility(shown)
+        if not shown:
+            self.level = 0
+            self.mapper.RemoveAllInputs()
+            return
+        level = self.interactive_level() if self.interacting else 0
+        image = self.pyramid.level(level) if level else self.image
+        self.level = level
+        if self.mapper.GetInput() is not image:
+            self.mapper.SetInputData(image)
+
+    def _on_render_end(self, obj, event) -> None:
+        if not self.volume.GetVisibility():
+            return
+        seconds = self.renderer.GetLastRenderTimeInSeconds()
+        if seconds < 0:
+            return
+        (self.interactive_times if self.interacting else self.still_times).add(seconds * 1000.0)
+        if self.on_frame is not None:
+            self.on_frame()
+
+    def stats(self) -> dict:
+        """Frame times while the camera moves and when it stops (see LatencyStats.summary())."""
+        return {
+            "level": self.level,
+            "interactive": self.interactive_times.summary(),
+            "still": self.still_times.summary(),
+        }
+
+    def status_text(self) -> str:
+        s = self.stats()
+        parts = []
+        for name, times in (("moving", s["interactive"]), ("still", s["still"])):
+            if times["count"]:
+                parts.append(f"{name} {times['mean_ms']:.0f} ms")
+        text = "Volume rendering: " + (", ".join(parts) if parts else "no frames yet")
+        if self.interacting:
+            text += f" (pyramid level {s['level']})"
+        return text
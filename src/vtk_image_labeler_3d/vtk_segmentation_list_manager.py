@@ -18,6 +18,16 @@ import math
 from vtk_tools import from_vtk_color, to_vtk_color
 
 import reslicer 
+import brush_stencil
+import orientation
+import undo_stack
+import dirty_region
+import paint_loop
+import slice_occupancy
+import layer_statistics
+import brick_store
+import shared_labelmap
+from config import get_config
 
 class PaintBrush:
     def __init__(self, radius_in_pixel=20, pixel_spacing=(1.0, 1.0), color= (0,255,0), line_thickness= 1, brush_3d=False, viewer=None):
@@ -110,110 +120,70 @@ class PaintBrush:
         self.circle_lines.Modified()
         self.brush_source.Modified()
 
-    def paint(self, segmentation, x, y, z=0, value=1):
+    def paint(self, segmentation, x, y, z=0, value=1, where=None):
         import reslicer
         axis = self.viewer.reslicer.axis
 
         if self._brush_3d:
-            self.paint_3d(segmentation, x, y, z, value)
+            return self.paint_3d(segmentation, x, y, z, value, where=where)
         else:
             if axis == reslicer.AXIAL:
-                self.paint_ax(segmentation, x, y, z, value)
+                return self.paint_ax(segmentation, x, y, z, value, where=where)
             elif axis == reslicer.CORONAL:
-                self.paint_cr(segmentation, x, y, z, value)
+                return self.paint_cr(segmentation, x, y, z, value, where=where)
             elif axis == reslicer.SAGITTAL:
-                self.paint_sg(segmentation, x, y, z, value)
+                return self.paint_sg(segmentation, x, y, z, value, where=where)
             else:
                 raise Exception(f"Invalid axis: {self.viewer.axis}")
 
-    def paint_ax(self, segmentation, x, y, z, value=1):
-        """Draw a circle on the segmentation at (x, y) with the given radius."""
-        dims = segmentation.GetDimensions()
-        scalars = segmentation.GetPointData().GetScalars()
-        extent = segmentation.GetExtent()
+    def _paint_axis(self):
+        """Stencil axis for the current brush: the view normal, or None for the 3D brush."""
+        if self._brush_3d:
+            return None
+        axis = self.viewer.reslicer.axis
+        if axis not in (brush_stencil.AXIS_AXIAL, brush_stencil.AXIS_CORONAL, brush_stencil.AXIS_SAGITTAL):
+            raise Exception(f"Invalid axis: {axis}")
+        return axis
 
-        # radius in pixel space
-        radius_in_pixel = self.radius_in_pixel
-
-        for i in range(-radius_in_pixel, radius_in_pixel + 1):
-            for j in range(-radius_in_pixel, radius_in_pixel + 1):
-                for k in [0]:
-                
-                    # Check if the pixel is within the circle
-                    if ((i/radius_in_pixel)**2 + (j/radius_in_pixel)**2) <= 1.0:
-                        xi = x + i
-                        yj = y + j
-                        zk = z + k
-                        if extent[0] <= xi <= extent[1] and extent[2] <= yj <= extent[3] and extent[4] <= zk <= extent[5]:
-                            idx = (zk - extent[4]) *  (dims[0] * dims[1])+(yj - extent[2]) * dims[0] + (xi - extent[0])
-                            scalars.SetTuple1(idx, value)
-
-    def paint_cr(self, segmentation, x, y, z, value=1):
-        """Draw a circle on the segmentation at (x, y) with the given radius."""
-        dims = segmentation.GetDimensions()
-        scalars = segmentation.GetPointData().GetScalars()
-        extent = segmentation.GetExtent()
+    def paint_stroke(self, segmentation, start_index, end_index, value=1, where=None):
+        """
+        Paint the swept brush from image index start_index to end_index.
 
-        # radius in pixel space
-        radius_in_pixel = self.radius_in_pixel
-
-        for i in range(-radius_in_pixel, radius_in_pixel + 1):
-            for j in [0]:
-                for k in range(-radius_in_pixel, radius_in_pixel + 1):
-                
-                    # Check if the pixel is within the circle
-                    if ((i/radius_in_pixel)**2 + (k/radius_in_pixel)**2) <= 1.0:
-                        xi = x + i
-                        yj = y + j
-                        zk = z + k
-                        if extent[0] <= xi <= extent[1] and extent[2] <= yj <= extent[3] and extent[4] <= zk <= extent[5]:
-                            idx = (zk - extent[4]) *  (dims[0] * dims[1])+(yj - extent[2]) * dims[0] + (xi - extent[0])
-                            scalars.SetTuple1(idx, value)
-
-    def paint_sg(self, segmentation, x, y, z, value=1):
-        """Draw a circle on the segmentation at (x, y) with the given radius."""
-        dims = segmentation.GetDimensions()
-        scalars = segmentation.GetPointData().GetScalars()
-        extent = segmentation.GetExtent()
+        Gives a continuous stroke regardless of how far the mouse moved between
+        events. Returns the touched VTK extent or None.
+        """
+        return brush_stencil.paint_stroke_vtk_image(
+            segmentation, start_index, end_index, self.radius_in_pixel, value=value, axis=self._paint_axis(), where=where
+        )
 
-        # radius in pixel space
-        radius_in_pixel = self.radius_in_pixel
-
-        for i in [0]:
-            for j in range(-radius_in_pixel, radius_in_pixel + 1):
-                for k in range(-radius_in_pixel, radius_in_pixel + 1):
-                
-                    # Check if the pixel is within the circle
-                    if ((j/radius_in_pixel)**2 + (k/radius_in_pixel)**2) <= 1.0:
-                        xi = x + i
-                        yj = y + j
-                        zk = z + k
-                        if extent[0] <= xi <= extent[1] and extent[2] <= yj <= extent[3] and extent[4] <= zk <= extent[5]:
-                            idx = (zk - extent[4]) *  (dims[0] * dims[1])+(yj - extent[2]) * dims[0] + (xi - extent[0])
-                            scalars.SetTuple1(idx, value)
-
-
-    def paint_3d(self, segmentation, x, y, z, value=1):
-        """Draw a circle on the segmentation at (x, y) with the given radius."""
-        dims = segmentation.GetDimensions()
-        scalars = segmentation.GetPointData().GetScalars()
+    def stroke_bounds(self, segmentation, start_index, end_index):
+        """Array-index (z, y, x) box that paint_stroke(start_index, end_index) may touch."""
         extent = segmentation.GetExtent()
 
-        # radius in pixel space
-        radius_in_pixel = self.radius_in_pixel
-
-        for i in range(-radius_in_pixel, radius_in_pixel + 1):
-            for j in range(-radius_in_pixel, radius_in_pixel + 1):
-                for k in range(-radius_in_pixel, radius_in_pixel + 1):
-                
-                    # Check if the pixel is within the circle
-                    if ((i/radius_in_pixel)**2 + (j/radius_in_pixel)**2 + (k/radius_in_pixel)**2) <= 1.0:
-                        xi = x + i
-                        yj = y + j
-                        zk = z + k
-                        if extent[0] <= xi <= extent[1] and extent[2] <= yj <= extent[3] and extent[4] <= zk <= extent[5]:
-                            idx = (zk - extent[4]) *  (dims[0] * dims[1])+(yj - extent[2]) * dims[0] + (xi - extent[0])
-                            scalars.SetTuple1(idx, value)
+        def to_zyx(p):
+            return (p[2] - extent[4], p[1] - extent[2], p[0] - extent[0])
+
+        return brush_stencil.brush_bounds(to_zyx(start_index), to_zyx(end_index), self.radius_in_pixel, axis=self._paint_axis())
+
+    def _paint_stencil(self, segmentation, x, y, z, value, axis, where=None):
+        """Stamp the cached disk/sphere stencil; returns the touched VTK extent or None."""
+        return brush_stencil.paint_vtk_image(segmentation, x, y, z, self.radius_in_pixel, value=value, axis=axis, where=where)
+
+    def paint_ax(self, segmentation, x, y, z, value=1, where=None):
+        """Draw a circle on the segmentation at (x, y) in the axial (XY) plane."""
+        return self._paint_stencil(segmentation, x, y, z, value, brush_stencil.AXIS_AXIAL, where=where)
+
+    def paint_cr(self, segmentation, x, y, z, value=1, where=None):
+        """Draw a circle on the segmentation at (x, z) in the coronal (XZ) plane."""
+        return self._paint_stencil(segmentation, x, y, z, value, brush_stencil.AXIS_CORONAL, where=where)
+
+    def paint_sg(self, segmentation, x, y, z, value=1, where=None):
+        """Draw a circle on the segmentation at (y, z) in the sagittal (YZ) plane."""
+        return self._paint_stencil(segmentation, x, y, z, value, brush_stencil.AXIS_SAGITTAL, where=where)
+
+    def paint_3d(self, segmentation, x, y, z, value=1, where=None):
+        """Draw a sphere on the segmentation centered at (x, y, z)."""
+        return self._paint_stencil(segmentation, x, y, z, value, None, where=where)
 
        
 from PyQt5.QtCore import pyqtSignal, QObject
@@ -224,9 +194,10 @@ class SegmentationLayer(QObject):
     color_changed = pyqtSignal(QObject)
     name_changed = pyqtSignal(str, QObject)
     alpha_changed = pyqtSignal(QObject)
-    image_changed = pyqtSignal(QObject)
+    image_changed = pyqtSignal(QObject, object)  # (layer, dirty extent or None for whole volume)
+    storage_changed = pyqtSignal(QObject)  # compacted to / materialized from sparse storage
 
-    def __init__(self, segmentation, visible=True, color=np.array([255, 255, 128]), alpha=0.5, actor=None, name="") -> None:
+    def __init__(self, segmentation, visible=True, color=np.array([255, 255, 128]), alpha=0.5, actor=None, name="", labelmap=None, label_value=0) -> None:
         super().__init__()
 
         self._segmentation_image = segmentation
@@ -240,6 +211,22 @@ class SegmentationLayer(QObject):
 
         self._modified = False
 
+        # slice occupancy index, kept current by begin_edit()/end_edit() and
+        # rebuilt lazily when the image changed some other way
+        self._occupancy = None
+        self._occupancy_image = None
+        self._occupancy_mtime = None
+
+        # sparse storage while compacted (see compact()); _segmentation_image is then None
+        self._brick_store = None
+        self._compact_geometry = None
+
+        # view onto a shared labelmap (label mode); _segmentation_image is then unused
+        self._labelmap = labelmap
+        self._label_value = int(label_value)
+        if labelmap is not None and self._label_value == 0:
+            self._label_value = labelmap.allocate_label(self)
+
     def set_parent_list(self, list):
         self._parent_list = list
     
@@ -253,13 +240,191 @@ class SegmentationLayer(QObject):
         self._modified = flag
 
     def get_image(self):
+        if self._labelmap is not None:
+            return self._labelmap.image
+        if self._brick_store is not None:
+            self._materialize()
         return self._segmentation_image
     
     def set_image(self, image):
+        if self._labelmap is not None:
+            # write the (binary) image into this layer's label
+            others = self._labelmap.write_mask(self._label_value, brush_stencil.vtk_image_as_zyx_view(image))
+            self._modified = True
+            self.image_changed.emit(self, None)
+            self._emit_changed_labels(others, None)
+            return
+        if self._brick_store is not None:
+            self._brick_store = None
+            self._compact_geometry = None
+            self._segmentation_image = None
         if image is not self._segmentation_image:
             self._modified = True
             self._segmentation_image = image
-            self.image_changed.emit(self)
+            self.image_changed.emit(self, None)
+
+    # ----- shared labelmap -----
+
+    def get_labelmap(self):
+        return self._labelmap
+
+    def get_label_value(self):
+        return self._label_value
+
+    def paint_rule(self, erase=False):
+        """
+        (value, where) for brush and pencil writes into get_image(); where is
+        None or a callable giving the writable voxels of a region.
+        """
+        if self._labelmap is None:
+            return (0 if erase else 1), None
+        return self._labelmap.paint_rule(self._label_value, erase)
+
+    def get_edit_image(self):
+        """
+        Binary image for whole-volume tools to modify in place. Pass it to
+        apply_edit_image() afterwards; for a separate layer it is the layer
+        image itself.
+        """
+        if self._labelmap is None:
+            return self.get_image()
+        return self.read_image()
+
+    def apply_edit_image(self, image):
+        """Write an image from get_edit_image() back into the shared labelmap."""
+        if self._labelmap is None or image is self.get_image():
+            return
+        others = self._labelmap.write_mask(self._label_value, brush_stencil.vtk_image_as_zyx_view(image))
+        self._emit_changed_labels(others, None)
+
+    def _emit_changed_labels(self, labels, dirty_extent):
+        # other layers of the labelmap whose voxels an overwrite changed
+        for value in labels:
+            owner = self._labelmap.owner(value)
+            if owner is not None and owner is not self:
+                owner.image_changed.emit(owner, dirty_extent)
+
+    # ----- sparse storage -----
+
+    def is_compact(self):
+        return self._brick_store is not None
+
+    def storage_bytes(self):
+        """
+        (bytes held for this layer's voxels, bytes of its dense image); the
+        first is smaller while compact. (0, 0) for labelmap layers, whose
+        voxels the labelmap holds.
+        """
+        if self._brick_store is not None:
+            return self._brick_store.nbytes(), self._brick_store.dense_nbytes()
+        image = self._segmentation_image if self._labelmap is None else None
+        scalars = image.GetPointData().GetScalars() if image is not None else None
+        if scalars is None:
+            return 0, 0
+        nbytes = scalars.GetNumberOfValues() * scalars.GetDataTypeSize()
+        return nbytes, nbytes
+
+    def compact(self):
+        """
+        Move the voxels into a sparse brick store and release the dense image.
+        get_image() materializes a new dense image on the next access. Returns
+        False if the image cannot be stored sparsely (e.g. multi-component).
+        """
+        if self._brick_store is not None:
+            return True
+        image = self._segmentation_image
+        if image is None or self._labelmap is not None:
+            return False
+        try:
+            volume = brush_stencil.vtk_image_as_zyx_view(image)
+        except ValueError:
+            return False
+
+        # index the voxels now so occupancy/statistics stay available while compact
+        self.get_slice_occupancy()
+
+        geometry = vtk.vtkImageData()
+        geometry.CopyStructure(image)
+        scalars = image.GetPointData().GetScalars()
+        self._compact_geometry = (geometry, scalars.GetDataType(), scalars.GetName())
+        self._brick_store = brick_store.BrickStore.from_dense(volume)
+        self._segmentation_image = None
+        self._occupancy_image = None
+        self.storage_changed.emit(self)
+        return True
+
+    def _image_from_store(self):
+        geometry, data_type, name = self._compact_geometry
+        image = vtk.vtkImageData()
+        image.CopyStructure(geometry)
+        image.AllocateScalars(data_type, 1)
+        if name:
+            image.GetPointData().GetScalars().SetName(name)
+        self._brick_store.to_dense(out=brush_stencil.vtk_image_as_zyx_view(image))
+        image.Modified()
+        return image
+
+    def _materialize(self):
+        image = self._image_from_store()
+        self._brick_store = None
+        self._compact_geometry = None
+        self._segmentation_image = image
+        if self._occupancy is not None:
+            # same voxels: the index built before compacting is still current
+            self._occupancy_image = image
+            self._occupancy_mtime = image.GetMTime()
+        self.storage_changed.emit(self)
+
+    def read_image(self):
+        """
+        Dense image for read-only use (saving, export). A compact layer
+        returns a temporary image and stays compact; a labelmap layer returns
+        a new binary mask of its label.
+        """
+        if self._labelmap is not None:
+            return self._labelmap.mask_image(self._label_value)
+        if self._brick_store is None:
+            return self._segmentation_image
+        return self._image_from_store()
+
+    def get_geometry(self):
+        """vtkImageData with the layer geometry (scalars not guaranteed); does not materialize a compact layer."""
+        if self._brick_store is not None:
+            return self._compact_geometry[0]
+        return self.get_image()
+
+    def read_region(self, box):
+        """
+        Copy of the inclusive (z0, z1, y0, y1, x0, x1) array-index box of the
+        voxels; a 0/1 mask for labelmap layers. Compact layers stay compact.
+        """
+        if self._brick_store is not None:
+            return self._brick_store.read_region(box)
+        region = tuple(slice(box[2 * d], box[2 * d + 1] + 1) for d in range(3))
+        if self._labelmap is not None:
+            return (self._labelmap.volume()[region] == self._label_value).astype(np.uint8)
+        return brush_stencil.vtk_image_as_zyx_view(self._segmentation_image)[region].copy()
+
+    def reorient(self, operation):
+        """
+        Rotate or flip the voxels like the base image (orientation.py), in
+        place; a compact layer stays compact. Labelmap layers are reoriented
+        with their SharedLabelmap. image_changed is left to the caller, to
+        emit once every image has its new geometry.
+        """
+        if self._labelmap is not None:
+            return
+        if self._brick_store is not None:
+            geometry = self._compact_geometry[0]
+            volume = orientation.oriented_view(self._brick_store.to_dense(), operation)
+            self._brick_store = brick_store.BrickStore.from_dense(volume, self._brick_store.brick_size)
+            orientation.reorient_geometry(geometry, operation)
+            self._occupancy = slice_occupancy.SliceOccupancy.from_volume(volume, geometry.GetExtent())
+        elif self._segmentation_image is not None:
+            orientation.reorient_image(self._segmentation_image, operation)
+        else:
+            return
+        self._modified = True
 
     def set_name(self, name):
         
@@ -304,10 +469,96 @@ class SegmentationLayer(QObject):
     def get_alpha(self):
         return self._alpha
 
+    def _occupancy_is_current(self):
+        image = self._segmentation_image
+        return (
+            image is not None
+            and self._occupancy is not None
+            and image is self._occupancy_image
+            and image.GetMTime() == self._occupancy_mtime
+            and tuple(image.GetExtent()) == self._occupancy.whole_extent
+        )
+
+    def get_slice_occupancy(self):
+        """
+        Per-axis slice occupancy (slice_occupancy.SliceOccupancy) of the layer.
+        Rebuilt with one pass only if the image was changed without
+        begin_edit()/end_edit(); None if the image cannot be indexed.
+        """
+        if self._labelmap is not None:
+            return self._labelmap.occupancy(self._label_value)
+        if self._brick_store is not None:
+            return self._occupancy
+        image = self._segmentation_image
+        if image is None:
+            return None
+        if not self._occupancy_is_current():
+            try:
+                volume = brush_stencil.vtk_image_as_zyx_view(image)
+            except ValueError:
+                self._occupancy = None
+                return None
+            self._occupancy = slice_occupancy.SliceOccupancy.from_volume(volume, image.GetExtent())
+            self._occupancy_image = image
+            self._occupancy_mtime = image.GetMTime()
+        return self._occupancy
+
+    def begin_edit(self, box):
+        """
+        Call before writing the (z0, z1, y0, y1, x0, x1) array-index box in
+        place. Returns a token for end_edit(), or None if there is no current
+        index to maintain (it is then rebuilt on the next query).
+        """
+        if self._labelmap is not None:
+            return self._labelmap.begin_edit(box)
+        if not self._occupancy_is_current():
+            self._occupancy = None
+            return None
+        volume = brush_stencil.vtk_image_as_zyx_view(self._segmentation_image)
+        lo = [max(int(box[2 * d]), 0) for d in range(3)]
+        hi = [min(int(box[2 * d + 1]), volume.shape[d] - 1) for d in range(3)]
+        if any(h < l for l, h in zip(lo, hi)):
+            return None
+        clipped = (lo[0], hi[0], lo[1], hi[1], lo[2], hi[2])
+        region = tuple(slice(l, h + 1) for l, h in zip(lo, hi))
+        return (clipped, region, volume[region].copy())
+
+    def end_edit(self, token):
+        """
+        Apply the delta of an edit started with begin_edit(); call after
+        image.Modified(). Returns the other layers whose voxels the edit
+        changed (overwrites in a shared labelmap).
+        """
+        if self._labelmap is not None:
+            labels = self._labelmap.end_edit(token)
+            owners = [self._labelmap.owner(value) for value in labels]
+            return [owner for owner in owners if owner is not None and owner is not self]
+        if token is None or self._occupancy is None:
+            return []
+        box, region, before = token
+        after = brush_stencil.vtk_image_as_zyx_view(self._segmentation_image)[region]
+        self._occupancy.apply_delta(box, before, after)
+        self._occupancy_mtime = self._segmentation_image.GetMTime()
+        return []
+
+    def get_statistics(self):
+        """
+        Voxel count, physical volume, bounding box and centroid
+        (layer_statistics.LayerStatistics), derived from the slice occupancy
+        index so it follows edits without rescanning. None if not indexable.
+        """
+        occupancy = self.get_slice_occupancy()
+        if occupancy is None:
+            return None
+        return layer_statistics.from_occupancy(occupancy, self.get_geometry())
+
     @staticmethod
     def deep_copy(layer):
         import vtk_tools
-        return SegmentationLayer(segmentation=vtk_tools.deep_copy_image(layer.get_image()), 
+        image = layer.read_image()
+        if layer.get_labelmap() is None:
+            image = vtk_tools.deep_copy_image(image)
+        return SegmentationLayer(segmentation=image, 
                                                                         color=layer.get_color(),
                                                                         alpha=layer.get_alpha(),
                                                                         name=layer.get_name())
@@ -426,6 +677,8 @@ class SegmentationListItemWidget(QWidget):
 
         self._setup_ui()
 
+        layer.image_changed.connect(self.on_layer_image_changed)
+
     def _setup_ui(self):
         
         #main layout
@@ -559,6 +812,11 @@ class SegmentationListItemWidget(QWidget):
         self.alpha_slider.value_changed.connect(self.alpha_changed)
         layout.addWidget(self.alpha_slider)
 
+        # voxel count, volume, extent and centroid (refreshed while expanded)
+        self.statistics_label = QLabel()
+        self.statistics_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        layout.addWidget(self.statistics_label)
+
         widget.setLayout(layout)
         widget.setVisible(False)  # Initially collapsed
 
@@ -578,33 +836,51 @@ class SegmentationListItemWidget(QWidget):
         is_expanded = self.toggle_button.isChecked()
         self._update_toggle_button_icon()
         self.details_widget.setVisible(is_expanded)      
+        self.update_statistics()
 
         # Resize list item properly
         self.list_widget_item.setSizeHint(self.sizeHint())  # Use widget's own updated size
         self.list_widget.doItemsLayout()
 
 
+    def update_statistics(self):
+        if not self.toggle_button.isChecked():
+            return
+        stats = self.layer.get_statistics()
+        self.statistics_label.setText("Statistics unavailable" if stats is None else stats.summary())
+
+    def on_layer_image_changed(self, sender, dirty_extent=None):
+        self.update_statistics()
+
+    def on_segmentation_image_modified(self, layer, sender, dirty_extent=None):
+        if layer is self.layer:
+            self.update_statistics()
+
     def clear_layer_clicked(self):
         """Zero voxel values in-place; keep the same vtkImageData and geometry."""
-        image = self.layer.get_image()
+        image = self.layer.get_edit_image()
         if image is None:
             return
         scalars = image.GetPointData().GetScalars()
         if scalars is None:
             return
 
+        manager = getattr(self, "manager", None)
+        txn = manager.begin_undo_step(self.layer, "Clear layer") if manager is not None else None
+
         # Fill existing buffer so origin/spacing/direction and viewer
         # reslicer input pointers stay unchanged.
         scalars.Fill(0)
         scalars.Modified()
         image.Modified()
+        self.layer.apply_edit_image(image)
         self.layer.set_modified(True)
-        manager = getattr(self, "manager", None)
         if manager is not None:
+            manager.commit_undo_step(txn)
             manager._modified = True
         # Emit last so 3D surface refresh (image_changed -> timer 0) is not
         # overridden by the paint debounce path (layer_image_modified -> 1000ms).
-        self.layer.image_changed.emit(self.layer)
+        self.layer.image_changed.emit(self.layer, None)
 
     def duplicate_layer_clicked(self):
         layer_copy = SegmentationLayer.deep_copy(self.layer)
@@ -758,7 +1034,7 @@ class SegmentationListManager(QObject):
     # Signal to emit log messages
     log_message = pyqtSignal(str, str)  # Format: log_message(type, message)
     layer_added = pyqtSignal(str, QObject)
-    layer_image_modified = pyqtSignal(QObject, QObject)
+    layer_image_modified = pyqtSignal(QObject, QObject, object)  # (layer, sender, dirty extent or None)
     layer_removed = pyqtSignal(str, QObject)
 
     active_layer_changed = pyqtSignal(QObject)
@@ -791,6 +1067,8 @@ class SegmentationListManager(QObject):
         self._paint_target_layer = None
         self._closing_paint_tool = False
         self._brush_color_is_erase = None  # cache last brush color mode
+        self._last_paint_index = None  # (viewer, layer, image index) of the previous dab in the current stroke
+        self._paint_overwritten = {}  # id(layer) -> (layer, dirty extent) of labels overwritten by the current batch
 
         self.pencil_active = False
         self.pencil_erase_active = False
@@ -844,6 +1122,23 @@ class SegmentationListManager(QObject):
         self.threshold_tool_dialog = None
         self._threshold_target_layer_name = None
 
+        # Undo/redo history (changed bricks only, see undo_stack.py)
+        conf = get_config()
+        self.undo_stack = undo_stack.UndoStack(
+            ram_budget_bytes=int(conf.get("undo_memory_budget_mb", 256)) * 1024 * 1024,
+            max_steps=int(conf.get("undo_max_steps", 100)),
+            spill_dir=conf.get("temp_dir") or None,
+        )
+        self._paint_undo_txn = None  # open transaction of the current brush stroke
+
+        # labelmap shared by the layers created in labelmap mode (see shared_labelmap.py)
+        self.labelmap = None
+
+        # Mouse-move dabs are queued and applied/rendered once per display frame
+        self.paint_loop = paint_loop.PaintLoop(
+            self._apply_paint_dabs, interval_ms=int(conf.get("paint_frame_interval_ms", 16)), parent=self
+        )
+
         logger.info("SegmentationListManager initialized")
 
     def get_segmentation_layer_list(self) -> SegmentationLayerList:
@@ -1106,6 +1401,7 @@ class SegmentationListManager(QObject):
                 layer_name=name,
                 color_vtk=[c / 255.0 for c in color],
                 alpha=alpha,
+                shared=False,
             )
 
     def _refresh_scribble_target_layers(self, preferred_name=None):
@@ -1383,7 +1679,7 @@ class SegmentationListManager(QObject):
                 continue
             empty = self.create_empty_segmentation_image()
             layer.set_image(empty)
-            self.layer_image_modified.emit(layer, self)
+            self.layer_image_modified.emit(layer, self, None)
         self.print_status("Scribble overlays cleared")
 
     def run_scribble_graphcut(self):
@@ -1423,6 +1719,7 @@ class SegmentationListManager(QObject):
             self.scribble_sigma = float(self.scribble_sigma_spin.value())
             self.scribble_num_bins = int(self.scribble_bins_spin.value())
 
+        txn = self.begin_undo_step(target, "GraphCut")
         try:
             with qt_tools.busy_progress(
                 self.dock_widget,
@@ -1438,8 +1735,9 @@ class SegmentationListManager(QObject):
                     sigma=self.scribble_sigma,
                 )
             target.set_image(result)
+            self.commit_undo_step(txn)
             self._modified = True
-            self.layer_image_modified.emit(target, self)
+            self.layer_image_modified.emit(target, self, None)
             self.print_status(
                 f"Scribble GraphCut updated target layer '{target.get_name()}'"
             )
@@ -1604,7 +1902,7 @@ class SegmentationListManager(QObject):
             )
             return
 
-        image = target.get_image()
+        image = target.get_edit_image()
         if image is None:
             QMessageBox.warning(
                 self.dock_widget,
@@ -1623,12 +1921,20 @@ class SegmentationListManager(QObject):
                 title="Interpolation Tool",
                 label="Filling between slices...",
             ):
-                filled, info = fill_between_slices_vtk(image, axis=axis, label=0)
+                occupancy = target.get_slice_occupancy()
+                slice_counts = None
+                if occupancy is not None:
+                    # numpy (z, y, x) order
+                    slice_counts = [occupancy.counts(2), occupancy.counts(1), occupancy.counts(0)]
+                filled, info = fill_between_slices_vtk(image, axis=axis, label=0, slice_counts=slice_counts)
+                txn = self.begin_undo_step(target, "Fill between slices")
                 write_zyx_into_vtk_image(image, filled)
+                target.apply_edit_image(image)
+                self.commit_undo_step(txn)
             target.set_modified(True)
             self._modified = True
             # Emit image_changed last so 3D surface uses the prompt (0ms) refresh path.
-            target.image_changed.emit(target)
+            target.image_changed.emit(target, None)
             self.print_status(
                 f"Fill between slices applied to '{target.get_name()}' "
                 f"({info.get('axis_name', axis)}, +{info.get('voxels_added', 0)} voxels)"
@@ -1790,7 +2096,7 @@ class SegmentationListManager(QObject):
             )
             return
 
-        image = target.get_image()
+        image = target.get_edit_image()
         if image is None or image.GetPointData().GetScalars() is None:
             QMessageBox.warning(
                 self.dock_widget,
@@ -1810,8 +2116,11 @@ class SegmentationListManager(QObject):
                 title="Extract Largest Component",
                 label="Extracting largest connected component(s)...",
             ):
-                blob_images = vtk_tools.extract_largest_components(image, keep_n)
-                if not blob_images:
+                # label components only inside the labeled bounding box
+                stats = target.get_statistics()
+                whole = image.GetExtent()
+                crop = whole if stats is None else stats.extent
+                if crop is None:
                     QMessageBox.information(
                         self.dock_widget,
                         "Extract Largest Component",
@@ -1820,39 +2129,27 @@ class SegmentationListManager(QObject):
                     )
                     return
 
-                import numpy as np
-                from vtk.util import numpy_support
-
-                dims = image.GetDimensions()
-                combined = np.zeros(dims[::-1], dtype=np.uint8)
-                for blob in blob_images:
-                    arr = numpy_support.vtk_to_numpy(
-                        blob.GetPointData().GetScalars()
-                    ).reshape(dims[::-1])
-                    combined |= (arr > 0).astype(np.uint8)
+                volume = brush_stencil.vtk_image_as_zyx_view(image)
+                region = volume[dirty_region.to_zyx_slices(crop, whole)]
+                keep, kept = vtk_tools.largest_components_mask(region, keep_n)
 
                 # Preserve original label value when possible (binary labels become 1).
-                src_arr = numpy_support.vtk_to_numpy(
-                    image.GetPointData().GetScalars()
-                ).reshape(dims[::-1])
-                nonzero = src_arr[src_arr != 0]
+                nonzero = region[region != 0]
                 label_value = int(nonzero[0]) if nonzero.size else 1
-                out = np.zeros_like(src_arr)
-                out[combined > 0] = label_value
 
-                flat = out.reshape(-1, order="C")
-                vtk_array = numpy_support.numpy_to_vtk(
-                    num_array=flat, deep=True, array_type=image.GetPointData().GetScalars().GetDataType()
-                )
-                dst = image.GetPointData().GetScalars()
-                dst.DeepCopy(vtk_array)
-                dst.Modified()
+                txn = self.begin_undo_step(target, "Extract largest component")
+                edit = target.begin_edit(dirty_region.to_zyx_box(crop, whole))
+                region[~keep] = 0
+                region[keep] = label_value
+                image.GetPointData().GetScalars().Modified()
                 image.Modified()
+                target.end_edit(edit)
+                target.apply_edit_image(image)
+                self.commit_undo_step(txn)
 
-            kept = len(blob_images)
             target.set_modified(True)
             self._modified = True
-            target.image_changed.emit(target)
+            target.image_changed.emit(target, crop)
             self.print_status(
                 "Kept %d largest component(s) in '%s'" % (kept, target.get_name())
             )
@@ -2019,7 +2316,7 @@ class SegmentationListManager(QObject):
         if target is None or target.get_image() is None:
             self._binary_morph_baseline = None
             return
-        self._binary_morph_baseline = vtk_tools.deep_copy_image(target.get_image())
+        self._binary_morph_baseline = vtk_tools.deep_copy_image(target.read_image())
 
     def run_binary_morph_operation(self, operation):
         from PyQt5.QtWidgets import QMessageBox
@@ -2036,7 +2333,7 @@ class SegmentationListManager(QObject):
             )
             return
 
-        image = target.get_image()
+        image = target.get_edit_image()
         if image is None or image.GetPointData().GetScalars() is None:
             QMessageBox.warning(
                 self.dock_widget,
@@ -2067,13 +2364,16 @@ class SegmentationListManager(QObject):
                 src = vtk_out.GetPointData().GetScalars()
                 if src is None:
                     raise RuntimeError("Morphology produced no scalar data")
+                txn = self.begin_undo_step(target, "Binary %s" % operation)
                 dst.DeepCopy(src)
                 dst.Modified()
                 image.Modified()
+                target.apply_edit_image(image)
+                self.commit_undo_step(txn)
 
             target.set_modified(True)
             self._modified = True
-            target.image_changed.emit(target)
+            target.image_changed.emit(target, None)
             self.print_status(
                 "Binary %s (r=%d) applied to '%s'"
                 % (operation, radius, target.get_name())
@@ -2097,7 +2397,7 @@ class SegmentationListManager(QObject):
             )
             return
 
-        image = target.get_image()
+        image = target.get_edit_image()
         baseline = getattr(self, "_binary_morph_baseline", None)
         if image is None or baseline is None:
             QMessageBox.information(
@@ -2112,15 +2412,18 @@ class SegmentationListManager(QObject):
             src = baseline.GetPointData().GetScalars()
             if dst is None or src is None:
                 raise RuntimeError("Missing scalar data for reset")
+            txn = self.begin_undo_step(target, "Binary morphology reset")
             dst.DeepCopy(src)
             dst.Modified()
             image.Modified()
             # Keep geometry consistent if needed
             vtk_tools.copy_image_origin_spacing_direction_matrix(baseline, image)
+            target.apply_edit_image(image)
+            self.commit_undo_step(txn)
 
             target.set_modified(True)
             self._modified = True
-            target.image_changed.emit(target)
+            target.image_changed.emit(target, None)
             self.print_status(
                 "Binary morphology reset for '%s'" % target.get_name()
             )
@@ -2302,7 +2605,7 @@ class SegmentationListManager(QObject):
             return
 
         base = self.get_base_vtk_image()
-        image = target.get_image()
+        image = target.get_edit_image()
         if base is None:
             QMessageBox.warning(
                 self.dock_widget, "Threshold Tool", "Open an image in the viewer first."
@@ -2318,6 +2621,7 @@ class SegmentationListManager(QObject):
 
         lower = float(self.threshold_lower_spin.value())
         upper = float(self.threshold_upper_spin.value())
+        txn = self.begin_undo_step(target, "Threshold")
         try:
             with qt_tools.busy_progress(
                 self.dock_widget,
@@ -2327,9 +2631,11 @@ class SegmentationListManager(QObject):
                 n_fg = apply_threshold_to_layer(
                     base, image, lower=lower, upper=upper, foreground=1, background=0
                 )
+                target.apply_edit_image(image)
+            self.commit_undo_step(txn)
             target.set_modified(True)
             self._modified = True
-            target.image_changed.emit(target)
+            target.image_changed.emit(target, None)
             self.print_status(
                 f"Threshold applied to '{target.get_name()}' "
                 f"[{lower:g}, {upper:g}] -> {n_fg} voxels"
@@ -2410,14 +2716,16 @@ class SegmentationListManager(QObject):
                 return
 
             import vtk_tools
-            result = vtk_tools.perform_boolean_operation(layerA.get_image(), layerB.get_image(), op)
+            result = vtk_tools.perform_boolean_operation(layerA.read_image(), layerB.read_image(), op)
             if result is None:
                 self.print_status("Operation failed.")
                 return
 
+            txn = self.begin_undo_step(target_layer, "Boolean %s" % operation_combo.currentText())
             target_layer.set_image(result)
+            self.commit_undo_step(txn)
             self._modified = True
-            self.layer_image_modified.emit(target_layer, self)
+            self.layer_image_modified.emit(target_layer, self, None)
 
             self.print_status(
                 f"Boolean {op} applied to target layer '{target_name}' ({nameA} {op} {nameB})"
@@ -2459,6 +2767,7 @@ class SegmentationListManager(QObject):
         self._modified = False
         self.segmentation_layers.clear()
         self.list_widget.clear()
+        self.labelmap = None
 
         
 
@@ -2479,7 +2788,7 @@ class SegmentationListManager(QObject):
         for layer in self.segmentation_layers.get_layers():
             segmentation_file = f"{layer.get_name()}.mha"
             segmentation_path = os.path.join(data_dir, segmentation_file )
-            itkvtk.save_vtk_image_using_sitk(layer.get_image(), segmentation_path)
+            itkvtk.save_vtk_image_using_sitk(layer.read_image(), segmentation_path)
 
             # Add layer metadata to the workspace data
             segmentations.append({
@@ -2567,46 +2876,120 @@ class SegmentationListManager(QObject):
         
         self.left_button_is_pressed = False
         self.last_mouse_position = None
+        self._end_paint_stroke()
         
         print(f"Painbrush mode: {'enabled' if enabled else 'disabled'}")
 
-    def paint_at_mouse_position(self, v2d):
+    def _make_paint_dab(self, v2d):
+        """Resolve the dab under the cursor as (viewer, layer, image_index, value, label), or None."""
         event_data = v2d.get_mouse_event_coordiantes()
         if 'image_index' not in event_data:
-            return
+            return None
 
         image_index = event_data['image_index']
         if getattr(self, "scribble_active", False):
             layer = self.get_scribble_paint_layer()
             erase = bool(self.scribble_erase_active)
+            label = "Scribble"
         else:
             layer = self.get_paint_target_layer()
             erase = bool(self.erase_active)
+            label = "Erase" if erase else "Paint"
         if layer is None:
-            return
+            return None
 
         if not layer.get_visible():
             from PyQt5.QtWidgets import QMessageBox
             QMessageBox.warning(None, "Warning", "The layer being editted is not visible. Please turn it on first.")
-            return
+            return None
 
         value = 0 if erase else 1
-        v2d.paintbrush.paint(layer.get_image(), image_index[0], image_index[1], image_index[2], value)
+        return (v2d, layer, tuple(int(i) for i in image_index[:3]), value, label)
 
-        # flag vtkImageData as Modified to update the pipeline.
-        layer.get_image().Modified()
+    def queue_paint_at_mouse_position(self, v2d):
+        """Queue a dab under the cursor; queued dabs are applied once per display frame."""
+        dab = self._make_paint_dab(v2d)
+        if dab is not None:
+            self.paint_loop.queue(dab)
 
-        # flag manager data has been modified (for saving)
-        self._modified = True
+    def paint_at_mouse_position(self, v2d):
+        """Paint under the cursor right away (together with any queued dabs)."""
+        self.queue_paint_at_mouse_position(v2d)
+        self.paint_loop.flush()
+
+    def _apply_paint_dab(self, v2d, layer, image_index, value, label):
+        """Write one dab (swept from the previous one in the stroke); returns the dirty extent or None."""
+        last = self._last_paint_index
+        continuing = last is not None and last[0] is v2d and last[1] is layer
+        stroke_start = last[2] if continuing else image_index
+
+        # record the bricks under the brush before writing (one undo step per stroke)
+        txn = self._paint_undo_txn
+        if txn is None or txn.target is not layer:
+            self.commit_undo_step(txn)
+            txn = self._paint_undo_txn = self.begin_undo_step(layer, label, snapshot=False)
+        bounds = v2d.paintbrush.stroke_bounds(layer.get_image(), stroke_start, image_index)
+        if txn is not None:
+            txn.touch(bounds)
+        edit = layer.begin_edit(bounds)
+
+        # label-aware write in a shared labelmap
+        value, where = layer.paint_rule(erase=(value == 0))
+        if continuing:
+            # sweep from the previous dab so fast drags leave no gaps
+            dirty_extent = v2d.paintbrush.paint_stroke(layer.get_image(), stroke_start, image_index, value, where=where)
+        else:
+            dirty_extent = v2d.paintbrush.paint(layer.get_image(), image_index[0], image_index[1], image_index[2], value, where=where)
+        self._last_paint_index = (v2d, layer, image_index)
+
+        if dirty_extent is not None:
+            # flag vtkImageData as Modified to update the pipeline.
+            layer.get_image().Modified()
+            for other in layer.end_edit(edit):
+                # overwritten voxels of other labels
+                self._paint_overwritten[id(other)] = (
+                    other, dirty_region.union(self._paint_overwritten.get(id(other), (other, None))[1], dirty_extent)
+                )
+        return dirty_extent
+
+    def _apply_paint_dabs(self, dabs):
+        """PaintLoop batch callback: apply dabs, notify once per layer, return the render step."""
+        touched = {}  # id(layer) -> (layer, dirty extent)
+        self._paint_overwritten = {}
+        views = []
+        for v2d, layer, image_index, value, label in dabs:
+            dirty_extent = self._apply_paint_dab(v2d, layer, image_index, value, label)
+            if dirty_extent is None:
+                # brush entirely outside the volume; nothing changed
+                continue
+            previous = touched.get(id(layer), (layer, None))[1]
+            touched[id(layer)] = (layer, dirty_region.union(previous, dirty_extent))
+            if v2d not in views:
+                views.append(v2d)
 
-        # emit event (other views update; painted view renders immediately below)
-        self.layer_image_modified.emit(layer, self)
+        for layer, dirty_extent in list(touched.values()) + list(self._paint_overwritten.values()):
+            # flag manager data has been modified (for saving)
+            self._modified = True
+
+            # emit event (other views update; painted views render below)
+            self.layer_image_modified.emit(layer, self, dirty_extent)
+        self._paint_overwritten = {}
+
+        if not views:
+            return None
+
+        # Always refresh the painted view right away, outside the render
+        # scheduler's frame loop, so the latency measured is the real one;
+        # other views pick up the change on the scheduler's next frame.
+        def render():
+            for v in views:
+                v.render_now()
+        return render
+
+    def get_paint_latency_stats(self):
+        """Input-to-photon latency of painting (queue time to end of render), in ms."""
+        return self.paint_loop.latency.summary()
 
-        # Always refresh the view under the cursor right away. Opening the Paint
-        # Tool window can leave VTK views "inactive", which otherwise uses a
-        # 1000ms delayed render and feels very laggy while dragging.
-        v2d.render()
-        
     def _find_viewer_from_interactor(self, interactor):
         for v in self.vtk_viewer.get_viewers():
             if v.get_interactor() == interactor:
@@ -2630,6 +3013,7 @@ class SegmentationListManager(QObject):
         
         self.left_button_is_pressed = True
         self.last_mouse_position = v2d.get_interactor().GetEventPosition()
+        self._end_paint_stroke()
         
         target_layer = self.get_paint_target_layer()
         if self.left_button_is_pressed and v2d.paintbrush.enabled and target_layer is not None:
@@ -2655,33 +3039,12 @@ class SegmentationListManager(QObject):
             return
         
         paintbrush = v2d.paintbrush
-        renderer = v2d.get_renderer()
         if paintbrush.enabled:
             mouse_pos = interactor.GetEventPosition()
-            picker = vtk.vtkWorldPointPicker()
-            picker.Pick(mouse_pos[0], mouse_pos[1], 0, renderer)
-
-            # Get world position
-            world_pos = picker.GetPickPosition()
-
-            # camera
-            camera = renderer.GetActiveCamera()
-            import vtk_camera_wrapper, numpy as np
-            cam = vtk_camera_wrapper.vtk_camera_wrapper(camera)
-            w_H_camo = cam.get_w_H_o()
-            camo_H_w = cam.get_o_H_w()
 
-            # interaction point in camo
-            w_pt_interaction = np.append(np.array(world_pos), 1.0).reshape(4,1)
-            camo_pt_interaction = camo_H_w @ w_pt_interaction
-
-            # project to the camera near plane
-            clip_range = cam.get_clip_range()
-            z_near = clip_range[0]
-            camo_pt_interaction[2,0] = z_near+0.1
-
-            # projected interaction point in w
-            w_pt_on_near_plane =  (w_H_camo @ camo_pt_interaction).flatten()[:3]
+            # world point under the cursor, projected to the camera near plane (cached view transforms)
+            world_pos = v2d.transforms.display_to_world(mouse_pos[0], mouse_pos[1])
+            w_pt_on_near_plane = v2d.transforms.project_to_near_plane(world_pos, offset=0.1)
 
             # Update the brush position (ensure Z remains on the image plane + 0.1 to show on top of the image)
             paintbrush.get_actor().SetPosition(w_pt_on_near_plane[0], w_pt_on_near_plane[1], w_pt_on_near_plane[2])
@@ -2709,7 +3072,7 @@ class SegmentationListManager(QObject):
             target_layer = self.get_paint_target_layer()
             if self.left_button_is_pressed and paintbrush.enabled and target_layer is not None:
                 if target_layer.get_visible():
-                    self.paint_at_mouse_position(v2d)
+                    self.queue_paint_at_mouse_position(v2d)
         else:
             paintbrush.get_actor().SetVisibility(False)  # Hide the brush when not painting
        
@@ -2726,6 +3089,14 @@ class SegmentationListManager(QObject):
         
         self.left_button_is_pressed = False
         self.last_mouse_position = None
+        self._end_paint_stroke()
+
+    def _end_paint_stroke(self):
+        # apply dabs still waiting for the next frame, then close the undo step
+        self.paint_loop.flush()
+        self._last_paint_index = None
+        self.commit_undo_step(self._paint_undo_txn)
+        self._paint_undo_txn = None
 
     def create_checkable_button(self, label, checked, toolbar, on_toggled_fn):
         action = QAction(label)
@@ -3285,20 +3656,8 @@ class SegmentationListManager(QObject):
 
     def _project_world_in_front_of_slice(self, v2d, world_pos):
         """Shift a world point toward the camera so overlay lines draw above the slice."""
-        import numpy as np
-        import vtk_camera_wrapper
-
-        camera = v2d.get_renderer().GetActiveCamera()
-        cam = vtk_camera_wrapper.vtk_camera_wrapper(camera)
-        w_H_camo = cam.get_w_H_o()
-        camo_H_w = cam.get_o_H_w()
-
-        w_pt = np.append(np.array(world_pos, dtype=float), 1.0).reshape(4, 1)
-        camo_pt = camo_H_w @ w_pt
         # Same trick as the paintbrush cursor: pull to just in front of the near plane.
-        z_near = cam.get_clip_range()[0]
-        camo_pt[2, 0] = z_near + 0.1
-        return (w_H_camo @ camo_pt).flatten()[:3]
+        return v2d.transforms.project_to_near_plane(world_pos, offset=0.1)
 
     def _refresh_pencil_overlay(self):
         v2d = self._pencil_viewer
@@ -3496,26 +3855,46 @@ class SegmentationListManager(QObject):
             self._reset_pencil_drawing()
             return
 
-        value = 0 if self.pencil_erase_active else 1
-        self._fill_polygon_on_slice(
+        erase = bool(self.pencil_erase_active)
+        value, where = layer.paint_rule(erase=erase)
+        txn = self.begin_undo_step(layer, "Pencil erase" if erase else "Pencil fill", snapshot=False)
+        edit = None
+        if self._pencil_points_ijk:
+            # the fill stays on one slice: record just that slice
+            axis = int(self._pencil_axis)
+            coord = int(round(self._pencil_points_ijk[0][axis])) - layer.get_image().GetExtent()[2 * axis]
+            box = [0, 2**31 - 1] * 3
+            box[2 * (2 - axis)] = box[2 * (2 - axis) + 1] = coord
+            if txn is not None:
+                txn.touch(tuple(box))
+            edit = layer.begin_edit(tuple(box))
+        dirty_extent = self._fill_polygon_on_slice(
             layer.get_image(),
             self._pencil_points_ijk,
             self._pencil_axis,
             value,
+            where=where,
         )
-
-        layer.get_image().Modified()
-        self._modified = True
-        self.layer_image_modified.emit(layer, self)
+        self.commit_undo_step(txn)
+        if dirty_extent is not None:
+            layer.get_image().Modified()
+            others = layer.end_edit(edit)
+            self._modified = True
+            for changed in [layer] + others:
+                self.layer_image_modified.emit(changed, self, dirty_extent)
         v2d.render()
 
         n = len(self._pencil_points_ijk)
         self._reset_pencil_drawing()
-        mode = "erased" if value == 0 else "filled"
+        mode = "erased" if erase else "filled"
         self.print_status(f"Pencil: {mode} polygon ({n} points)")
 
-    def _fill_polygon_on_slice(self, segmentation, points_ijk, axis, value):
-        """Fill the polygon on the slice plane defined by axis using OpenCV."""
+    def _fill_polygon_on_slice(self, segmentation, points_ijk, axis, value, where=None):
+        """
+        Fill the polygon on the slice plane defined by axis using OpenCV; returns
+        the slice extent or None. where (see SegmentationLayer.paint_rule) limits
+        the voxels written.
+        """
         import cv2
         import numpy as np
         import reslicer
@@ -3542,7 +3921,9 @@ class SegmentationListManager(QObject):
             )
             mask = np.zeros((dims[1], dims[0]), dtype=np.uint8)
             cv2.fillPoly(mask, pts, 1)
-            vol[zi][mask > 0] = value
+            slice2d = vol[zi]
+            slice2d[self._writable(slice2d, mask, where)] = value
+            dirty_extent = (extent[0], extent[1], extent[2], extent[3], z, z)
 
         elif axis == reslicer.CORONAL:
             y = int(round(points_ijk[0][1]))
@@ -3556,7 +3937,8 @@ class SegmentationListManager(QObject):
             mask = np.zeros((dims[2], dims[0]), dtype=np.uint8)
             cv2.fillPoly(mask, pts, 1)
             slice2d = vol[:, yi, :]
-            slice2d[mask > 0] = value
+            slice2d[self._writable(slice2d, mask, where)] = value
+            dirty_extent = (extent[0], extent[1], y, y, extent[4], extent[5])
 
         elif axis == reslicer.SAGITTAL:
             x = int(round(points_ijk[0][0]))
@@ -3570,12 +3952,105 @@ class SegmentationListManager(QObject):
             mask = np.zeros((dims[2], dims[1]), dtype=np.uint8)
             cv2.fillPoly(mask, pts, 1)
             slice2d = vol[:, :, xi]
-            slice2d[mask > 0] = value
+            slice2d[self._writable(slice2d, mask, where)] = value
+            dirty_extent = (x, x, extent[2], extent[3], extent[4], extent[5])
         else:
             raise ValueError(f"Invalid axis: {axis}")
 
         scalars.Modified()
+        return dirty_extent
+
+    @staticmethod
+    def _writable(slice2d, mask, where):
+        selected = mask > 0
+        if where is not None:
+            selected &= where(slice2d)
+        return selected
+
 
+    ########################################################################
+    # Undo / Redo
+    ########################################################################
+    def _layer_volume_zyx(self, layer):
+        return brush_stencil.vtk_image_as_zyx_view(layer.get_image())
+
+    def begin_undo_step(self, layer, label, snapshot=True):
+        """
+        Start recording an edit of layer. With snapshot=True the whole layer is
+        copied now (for whole-volume tools); otherwise call txn.touch(box)
+        before each write. Returns None if the layer cannot be recorded.
+        """
+        if layer is None or layer.get_image() is None:
+            return None
+        try:
+            txn = self.undo_stack.begin(label, layer, lambda: self._layer_volume_zyx(layer))
+        except ValueError as e:
+            logger.warning(f"Undo disabled for '{layer.get_name()}': {e}")
+            return None
+        if snapshot:
+            txn.snapshot()
+        return txn
+
+    def commit_undo_step(self, txn):
+        if txn is None:
+            return None
+        try:
+            return self.undo_stack.commit(txn)
+        except ValueError as e:
+            logger.warning(f"Could not record undo step '{txn.label}': {e}")
+            return None
+
+    def _undo_redo(self, redo):
+        stack = self.undo_stack
+        label = stack.redo_label() if redo else stack.undo_label()
+        if label is None:
+            self.print_status("Nothing to redo" if redo else "Nothing to undo")
+            return
+        pending = stack.peek(redo)
+        edit = pending.target.begin_edit(pending.box())
+        try:
+            entry = stack.redo() if redo else stack.undo()
+        except ValueError as e:
+            # close the edit so the occupancy index matches whatever the voxels hold
+            pending.target.end_edit(edit)
+            self.print_status(str(e))
+            return
+
+        layer = entry.target
+        image = layer.get_image()
+        image.GetPointData().GetScalars().Modified()
+        image.Modified()
+        others = layer.end_edit(edit)
+        layer.set_modified(True)
+        self._modified = True
+
+        box = entry.box()
+        extent = image.GetExtent()
+        dirty_extent = (
+            box[4] + extent[0], box[5] + extent[0],
+            box[2] + extent[2], box[3] + extent[2],
+            box[0] + extent[4], box[1] + extent[4],
+        )
+        layer.image_changed.emit(layer, dirty_extent)
+        for other in others:
+            other.image_changed.emit(other, dirty_extent)
+        self.print_status(f"{'Redo' if redo else 'Undo'}: {label} ({layer.get_name()})")
+
+    def undo(self):
+        self._undo_redo(redo=False)
+
+    def redo(self):
+        self._undo_redo(redo=True)
+
+    def apply_undo_settings_from_config(self):
+        conf = get_config()
+        self.undo_stack.set_limits(
+            ram_budget_bytes=int(conf.get("undo_memory_budget_mb", 256)) * 1024 * 1024,
+            max_steps=int(conf.get("undo_max_steps", 100)),
+        )
+
+    def apply_paint_settings_from_config(self):
+        self.paint_loop.interval_ms = int(get_config().get("paint_frame_interval_ms", 16))
 
     def get_status_bar(self):
         return self._mainwindow.status_bar
@@ -3601,6 +4076,7 @@ class SegmentationListManager(QObject):
         layer_item_widget.list_widget_item = layer_item
         layer_item_widget.list_widget = self.list_widget
         layer_item_widget.manager = self
+        self.layer_image_modified.connect(layer_item_widget.on_segmentation_image_modified)
         
         layer_item.setSizeHint(layer_item_widget.sizeHint())
         self.list_widget.addItem(layer_item)
@@ -3629,12 +4105,63 @@ class SegmentationListManager(QObject):
 
         return len(dims) ==3 and dims[2] > 1
 
-    def add_layer(self, segmentation, layer_name, color_vtk=None, alpha=0.5):
+    def use_shared_labelmap(self):
+        """True if new layers are created as labels of the shared labelmap."""
+        return bool(get_config().get("shared_labelmap", False)) and self.get_base_image() is not None
+
+    def get_labelmap(self):
+        """The shared labelmap, created on first use with the base image geometry."""
+        if self.labelmap is None:
+            self.labelmap = shared_labelmap.SharedLabelmap.create_like(self.get_base_image())
+            self.apply_labelmap_settings_from_config()
+        return self.labelmap
 
+    def reorient_layers(self, operation):
+        """
+        Rotate or flip every layer and the shared labelmap in place, like the
+        base image. Returns the layers; the caller emits their image_changed
+        once the viewers are bound to the new geometry.
+        """
+        if self.labelmap is not None:
+            self.labelmap.reorient(operation)
+        layers = list(self.segmentation_layers.get_layers())
+        for layer in layers:
+            layer.reorient(operation)
+
+        # the edit history refers to the old voxel layout
+        self.undo_stack.clear()
+        if layers:
+            self._modified = True
+        return layers
+
+    def apply_labelmap_settings_from_config(self):
+        if self.labelmap is not None:
+            self.labelmap.protect_other_labels = bool(get_config().get("labelmap_protect_labels", False))
+
+    def add_layer(self, segmentation, layer_name, color_vtk=None, alpha=0.5, shared=None):
+        """
+        Add a layer. With shared=True (default: the 'shared_labelmap' setting)
+        the layer becomes a label of the shared labelmap and segmentation, if
+        given, is written into it as a binary mask.
+        """
         if color_vtk is None:
             color_vtk = to_vtk_color(color_rotator1.next())
 
-        layer = SegmentationLayer(segmentation=segmentation, color=from_vtk_color(color_vtk), alpha=alpha, name=layer_name)
+        if shared is None:
+            shared = self.use_shared_labelmap()
+        if shared:
+            labelmap = self.get_labelmap()
+            image = labelmap.image
+            layer = SegmentationLayer(segmentation=None, color=from_vtk_color(color_vtk), alpha=alpha, name=layer_name, labelmap=labelmap)
+            if labelmap.image is not image:
+                # promoted to uint16: views rebind to the new image
+                for other in self.segmentation_layers.get_layers():
+                    if other.get_labelmap() is labelmap:
+                        other.image_changed.emit(other, None)
+            if segmentation is not None:
+                layer.set_image(segmentation)
+        else:
+            layer = SegmentationLayer(segmentation=segmentation, color=from_vtk_color(color_vtk), alpha=alpha, name=layer_name)
 
         self.segmentation_layers.add_layer(layer)
 
@@ -3649,8 +4176,8 @@ class SegmentationListManager(QObject):
         # add layer data        
         layer_name = self.generate_unique_layer_name()
         
-        # empty segmentation
-        segmentation = self.create_empty_segmentation_image()
+        # empty segmentation (a new label needs no image of its own)
+        segmentation = None if self.use_shared_labelmap() else self.create_empty_segmentation_image()
 
         self.add_layer(
             segmentation=segmentation, 
@@ -3668,6 +4195,7 @@ class SegmentationListManager(QObject):
         
         # add widget for the added layer        
         self.add_layer_widget_item(layer)
+        layer.visibility_changed.connect(self._on_layer_visibility_changed_storage)
 
         # Select the last item in the list widget (to activate it)
         self.select_the_last_item_on_the_list()
@@ -3685,12 +4213,38 @@ class SegmentationListManager(QObject):
         if getattr(self, "threshold_tool_dialog", None) is not None:
             self._refresh_threshold_target_layers()
 
+    def _on_layer_visibility_changed_storage(self, layer):
+        if layer.get_visible() or not get_config().get("sparse_hidden_layers", False):
+            return
+        # after every view has handled the visibility change
+        from PyQt5.QtCore import QTimer
+        QTimer.singleShot(0, lambda: self.compact_layer_if_hidden(layer))
+
+    def compact_layer_if_hidden(self, layer):
+        """Move a hidden layer to sparse brick storage; it is made dense again on next use."""
+        if layer.get_visible() or layer.is_compact() or layer.get_parent_list() is not self.segmentation_layers:
+            return
+        if layer.compact():
+            held, dense = layer.storage_bytes()
+            logger.info(f"Layer '{layer.get_name()}' compacted: {held / 1e6:.1f} MB of {dense / 1e6:.1f} MB dense")
+
+    def compact_hidden_layers(self):
+        for layer in self.segmentation_layers.get_layers():
+            self.compact_layer_if_hidden(layer)
+
     def segmentation_layer_removed(self, layer, segmentation_layers):
         
+        self.undo_stack.remove_target(layer)
+
+        labelmap = layer.get_labelmap()
+        if labelmap is not None and labelmap.release_label(layer.get_label_value()) is not None:
+            self._modified = True
+
         # Remove from the list widget
         layer_name = layer.get_name()
         item, _ = self.find_list_widget_item_by_text(layer_name)
         if item is not None:
+            self.layer_image_modified.disconnect(self.list_widget.itemWidget(item).on_segmentation_image_modified)
             self.list_widget.takeItem(self.list_widget.row(item))
         else:
             logger.error(f'Internal error! List item of {layer_name} is not found!')
@@ -93,6 +93,22 @@ import numpy as np
 from skimage import measure
 from vtk.util import numpy_support
 
+def largest_components_mask(np_image: np.ndarray, top_n: int = 1):
+    """
+    Mask of the ``top_n`` largest 6-connected components of ``np_image``
+    (labeled like extract_largest_components) and the number kept. Pass a
+    crop around the labels (e.g. the layer statistics extent) to avoid
+    labeling the whole volume.
+    """
+    labeled = measure.label(np_image, connectivity=1)
+    sizes = np.bincount(labeled.ravel())
+    sizes[0] = 0
+    n = min(int(top_n), int(np.count_nonzero(sizes)))
+    if n <= 0:
+        return np.zeros(np_image.shape, dtype=bool), 0
+    keep = np.argsort(sizes, kind="stable")[::-1][:n]
+    return np.isin(labeled, keep), n
+
 def extract_largest_components(binary_image: vtk.vtkImageData, top_n: int = 3):
     # Step 1: Convert vtkImageData to numpy array
     dims = binary_image.GetDimensions()
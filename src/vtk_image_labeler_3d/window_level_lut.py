@@ -0,0 +1,121 @@
+"""
+Window/level as a uint8 lookup table.
+
+For 8- and 16-bit integer images, ``WindowLevelTable`` holds the gray level
+of every possible pixel value (65,536 entries for CT), rebuilt only when the
+window or level changes, so mapping a slice is a single gather. The three
+slice views share one table. ``WindowLevelMapper`` stands in for the
+vtkImageMapToWindowLevelColors calls the viewers make (SetInputData,
+SetWindow/SetLevel, Update, GetOutput) and writes into one reused
+single-component uint8 image. Other scalar types are mapped directly with
+the same formula.
+"""
+
+from __future__ import annotations
+
+from typing import Dict
+
+import numpy as np
+import vtk
+from vtk.util import numpy_support
+
+
+def map_values(values: np.ndarray, window: float, level: float) -> np.ndarray:
+    """uint8 gray levels of ``values``, as vtkImageMapToWindowLevelColors computes them."""
+    lower = level - window / 2.0
+    if window == 0:
+        return np.where(values >= lower, 255, 0).astype(np.uint8)
+    gray = np.floor((values.astype(np.float64) - lower) * (255.0 / window))
+    return np.clip(gray, 0, 255).astype(np.uint8)
+
+
+class WindowLevelTable:
+    def __init__(self, window: float = 1.0, level: float = 0.5):
+        self.window = float(window)
+        self.level = float(level)
+        self.version = 0  # bumped on every window/level change
+        self._tables: Dict[np.dtype, np.ndarray] = {}
+
+    def set_window_level(self, window: float, level: float) -> None:
+        window, level = float(window), float(level)
+        if (window, level) != (self.window, self.level):
+            self.window, self.level = window, level
+            self.version += 1
+            self._tables.clear()
+
+    @staticmethod
+    def has_table(dtype) -> bool:
+        dtype = np.dtype(dtype)
+        return np.issubdtype(dtype, np.integer) and dtype.itemsize <= 2
+
+    def table(self, dtype) -> np.ndarray:
+        """Gray level per pixel value of an 8/16-bit ``dtype``, indexed by the value's unsigned bit pattern."""
+        dtype = np.dtype(dtype)
+        table = self._tables.get(dtype)
+        if table is None:
+            unsigned = np.dtype(f"u{dtype.itemsize}")
+            values = np.arange(2 ** (8 * dtype.itemsize), dtype=unsigned).view(dtype)
+            table = self._tables[dtype] = map_values(values, self.window, self.level)
+        return table
+
+    def map(self, values: np.ndarray, out: np.ndarray) -> None:
+        """Write the gray levels of ``values`` into the uint8 array ``out`` (same shape)."""
+        if self.has_table(values.dtype):
+            np.take(self.table(values.dtype), values.view(f"u{values.dtype.itemsize}"), out=out)
+        else:
+            out[...] = map_values(values, self.window, self.level)
+
+
+class WindowLevelMapper:
+    def __init__(self, table: WindowLevelTable = None):
+        self.table = table if table is not None else WindowLevelTable()
+        self._input = None
+        self._output = vtk.vtkImageData()
+        self._output_array = None
+        self._mapped = None  # (input, input MTime, scalars MTime, table version) of the output
+
+    def SetInputData(self, image) -> None:
+        self._input = image
+
+    def GetInput(self):
+        return self._input
+
+    def SetWindow(self, window) -> None:
+        self.table.set_window_level(window, self.table.level)
+
+    def SetLevel(self, level) -> None:
+        self.table.set_window_level(self.table.window, level)
+
+    def GetWindow(self) -> float:
+        return self.table.window
+
+    def GetLevel(self) -> float:
+        return self.table.level
+
+    def GetOutput(self):
+        return self._output
+
+    def Update(self) -> None:
+        image = self._input
+        scalars = image.GetPointData().GetScalars() if image is not None else None
+        if scalars is None:
+            return
+        state = (image, image.GetMTime(), scalars.GetMTime(), self.table.version)
+        if state == self._mapped:
+            return
+
+        values = numpy_support.vtk_to_numpy(scalars)
+        out = self._output
+        if self._output_array is None or self._output_array.shape != values.shape:
+            self._output_array = np.empty(values.shape, dtype=np.uint8)
+            array = numpy_support.numpy_to_vtk(self._output_array, deep=False, array_type=vtk.VTK_UNSIGNED_CHAR)
+            out.GetPointData().SetScalars(array)
+        out.SetExtent(image.GetExtent())
+        out.SetSpacing(image.GetSpacing())
+        out.SetOrigin(image.GetOrigin())
+        out.SetDirectionMatrix(image.GetDirectionMatrix())
+
+        self.table.map(values, self._output_array)
+        out.GetPointData().GetScalars().Modified()
+        out.Modified()
+        self._mapped = state
@@ -0,0 +1,73 @@
+"""Sparse bricked label storage."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def test_round_trip_regions_slices_and_sparse_memory():
+    import brick_store
+
+    vol = np.zeros((70, 96, 50), dtype=np.uint8)
+    vol[0:32, 32:64, 0:32] = 4  # one whole uniform brick
+    vol[40:45, 10:70, 33:40] = 1
+    vol[69, 95, 49] = 2
+    store = brick_store.BrickStore.from_dense(vol)
+
+    assert store.brick_counts()["uniform"] == 1
+    assert store.nbytes() < vol.nbytes // 4
+    assert np.array_equal(store.to_dense(), vol)
+    assert np.array_equal(store.get_slice(2, 42), vol[42])
+    assert np.array_equal(store.get_slice(1, 20), vol[:, 20, :])
+    assert np.array_equal(store.get_slice(0, 49), vol[:, :, 49])
+
+    box = (30, 50, 5, 40, 20, 60)  # crosses brick borders, clipped in x
+    assert np.array_equal(store.read_region(box), vol[30:51, 5:41, 20:50])
+
+    patch = np.full((21, 36, 30), 3, dtype=np.uint8)
+    patch[::2] = 0
+    store.write_region(box, patch)
+    vol[30:51, 5:41, 20:50] = patch
+    assert np.array_equal(store.to_dense(), vol)
+
+    # clearing everything leaves no bricks behind
+    store.write_region((0, 69, 0, 95, 0, 49), np.zeros_like(vol))
+    assert store.brick_counts() == {"dense": 0, "uniform": 0}
+
+
+def test_layer_compacts_and_materializes_with_index():
+    import vtk
+    import brush_stencil
+    from vtk_segmentation_list_manager import SegmentationLayer
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(40, 30, 20)
+    image.SetSpacing(0.5, 0.5, 2.0)
+    image.SetOrigin(1.0, 2.0, 3.0)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)
+    vol = brush_stencil.vtk_image_as_zyx_view(image)
+    vol[:] = 0
+    vol[5:8, 10:12, 3:30] = 1
+    expected = vol.copy()
+    layer = SegmentationLayer(image, name="L")
+    assert layer.storage_bytes() == (40 * 30 * 20, 40 * 30 * 20)
+
+    assert layer.compact() and layer.is_compact()
+    held, dense = layer.storage_bytes()
+    assert dense == 40 * 30 * 20 and held < dense
+    assert layer.get_statistics().voxel_count == int(expected.sum())
+    assert np.array_equal(brush_stencil.vtk_image_as_zyx_view(layer.read_image()), expected)
+    assert layer.is_compact()
+
+    dense = layer.get_image()
+    assert not layer.is_compact()
+    assert dense.GetSpacing() == (0.5, 0.5, 2.0) and dense.GetOrigin() == (1.0, 2.0, 3.0)
+    assert np.array_equal(brush_stencil.vtk_image_as_zyx_view(dense), expected)
+    assert list(layer.get_slice_occupancy().labeled_slices(2)) == [5, 6, 7]
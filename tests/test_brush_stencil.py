@@ -0,0 +1,108 @@
+"""Brush stencil engine vs. the legacy per-voxel paint loop."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _legacy_mask(shape_zyx, center_xyz, radius, axis):
+    out = np.zeros(shape_zyx, dtype=np.uint8)
+    x, y, z = center_xyz
+    r_i = range(-radius, radius + 1) if axis != 0 else [0]
+    r_j = range(-radius, radius + 1) if axis != 1 else [0]
+    r_k = range(-radius, radius + 1) if axis != 2 else [0]
+    for i in r_i:
+        for j in r_j:
+            for k in r_k:
+                if ((i / radius) ** 2 + (j / radius) ** 2 + (k / radius) ** 2) <= 1.0:
+                    xi, yj, zk = x + i, y + j, z + k
+                    if 0 <= xi < shape_zyx[2] and 0 <= yj < shape_zyx[1] and 0 <= zk < shape_zyx[0]:
+                        out[zk, yj, xi] = 1
+    return out
+
+
+@pytest.mark.parametrize("axis", [0, 1, 2, None])
+@pytest.mark.parametrize("radius", [1, 3, 7])
+def test_stencil_matches_legacy_loop_including_clipping(axis, radius):
+    import brush_stencil
+
+    shape = (12, 14, 16)
+    for center in [(8, 7, 6), (0, 0, 0), (15, 13, 11)]:
+        vol = np.zeros(shape, dtype=np.uint8)
+        stencil = brush_stencil.get_stencil(radius, axis=axis)
+        brush_stencil.stamp_stencil(vol, stencil, center[::-1], 1)
+        legacy = _legacy_mask(shape, center, radius, -1 if axis is None else axis)
+        assert np.array_equal(vol, legacy)
+
+
+def test_paint_vtk_image_returns_touched_extent():
+    import vtk
+    import brush_stencil
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(20, 20, 10)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)
+    image.GetPointData().GetScalars().Fill(0)
+
+    extent = brush_stencil.paint_vtk_image(image, 1, 10, 5, 3, value=1, axis=2)
+    assert extent == (0, 4, 7, 13, 5, 5)
+    vol = brush_stencil.vtk_image_as_zyx_view(image)
+    assert vol[5, 10, 1] == 1 and vol[4].sum() == 0
+
+    assert brush_stencil.paint_vtk_image(image, 100, 100, 100, 3, axis=2) is None
+
+
+def test_stencil_is_cached_and_spacing_aware():
+    import brush_stencil
+
+    a = brush_stencil.get_stencil(5, axis=None)
+    assert a is brush_stencil.get_stencil(5, spacing=(1, 1, 1), axis=None)
+    assert not a.flags.writeable
+
+    # 1 x 1 x 2.5 mm voxels: a 5-voxel sphere spans only +/-2 slices in z
+    aniso = brush_stencil.get_stencil(5, spacing=(1.0, 1.0, 2.5), axis=None)
+    assert aniso.shape == (5, 11, 11)
+
+
+@pytest.mark.parametrize("axis", [2, None])
+def test_capsule_covers_segment_and_end_dabs(axis):
+    import brush_stencil
+
+    shape = (30, 40, 50)
+    p0, p1 = np.array((15, 5, 3)), np.array((15 if axis == 2 else 22, 33, 46))
+    capsule = np.zeros(shape, dtype=np.uint8)
+    box = brush_stencil.stamp_capsule(capsule, p0, p1, 4, 1, axis=axis)
+
+    stencil = brush_stencil.get_stencil(4, axis=axis)
+    for end in (p0, p1):
+        dab = np.zeros(shape, dtype=np.uint8)
+        brush_stencil.stamp_stencil(dab, stencil, end, 1)
+        assert np.all(capsule[dab == 1] == 1)
+
+    # no gaps along the path, and nothing painted far from it
+    for t in np.linspace(0.0, 1.0, 200):
+        assert capsule[tuple(np.rint(p0 + t * (p1 - p0)).astype(int))] == 1
+    pts = np.argwhere(capsule).astype(float)
+    d = (p1 - p0).astype(float)
+    t = np.clip(((pts - p0) @ d) / (d @ d), 0.0, 1.0)
+    dist = np.linalg.norm(pts - (p0 + t[:, None] * d), axis=1)
+    assert dist.max() <= 4.0 + 1.0
+
+    assert tuple(pts.min(0)) >= (box[0], box[2], box[4])
+    assert tuple(pts.max(0)) <= (box[1], box[3], box[5])
+
+
+def test_capsule_on_2d_brush_stays_on_slice():
+    import brush_stencil
+
+    vol = np.zeros((5, 20, 20), dtype=np.uint8)
+    brush_stencil.stamp_capsule(vol, (2, 3, 3), (2, 15, 15), 2, 1, axis=2)
+    assert vol[2].sum() > 0 and vol[[0, 1, 3, 4]].sum() == 0
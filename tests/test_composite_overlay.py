@@ -0,0 +1,94 @@
+"""All segmentation layers of a view composed into one overlay slice."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _mask_image(reference):
+    import vtk_tools
+
+    return vtk_tools.create_uchar_image_based_on_image(reference, 0)
+
+
+def test_layers_blend_into_one_rgba_slice_with_borders():
+    import vtk
+    import brush_stencil
+    import reslicer
+    from composite_overlay import CompositeOverlay
+    from shared_labelmap import SharedLabelmap
+    from vtk_segmentation_list_manager import SegmentationLayer
+    from vtk.util import numpy_support
+
+    reference = vtk.vtkImageData()
+    reference.SetDimensions(12, 10, 6)
+    reference.AllocateScalars(vtk.VTK_SHORT, 1)
+
+    below = SegmentationLayer(_mask_image(reference), color=np.array([255, 0, 0]), alpha=1.0, name="below")
+    above = SegmentationLayer(_mask_image(reference), color=np.array([0, 0, 255]), alpha=0.5, name="above")
+    brush_stencil.vtk_image_as_zyx_view(below.get_image())[2, 1:5, 1:5] = 1
+    brush_stencil.vtk_image_as_zyx_view(above.get_image())[2, 3:7, 3:7] = 1
+
+    lm = SharedLabelmap.create_like(reference)
+    labeled = SegmentationLayer(None, color=np.array([0, 255, 0]), alpha=1.0, name="labeled", labelmap=lm)
+    lm.volume()[2, 8, 8:11] = labeled.get_label_value()
+    lm.image.Modified()
+
+    overlay = CompositeOverlay(reslicer.AXIAL)
+    for layer in (below, above, labeled):
+        overlay.add_layer(layer)
+    overlay.update(2)
+
+    rgba = numpy_support.vtk_to_numpy(overlay.rgba_slice.GetPointData().GetScalars()).reshape(10, 12, 4)
+    assert rgba[1, 1].tolist() == [255, 0, 0, 255]
+    assert rgba[4, 4].tolist() == [127, 0, 128, 255]  # the later layer is blended over the earlier one
+    assert rgba[8, 9].tolist() == [0, 255, 0, 255]
+    assert rgba[0, 0, 3] == 0
+
+    borders = overlay.border_poly_data
+    colors = numpy_support.vtk_to_numpy(borders.GetCellData().GetScalars())
+    assert {tuple(c) for c in colors} == {(255, 0, 0), (0, 0, 255), (0, 255, 0)}
+    assert overlay.slice_actor.GetVisibility()
+
+    # hidden layers drop out; a slice without labels hides the overlay
+    above.set_visible(False)
+    overlay.update(2)
+    assert rgba[4, 4].tolist() == [255, 0, 0, 255]
+    overlay.update(3)
+    assert not overlay.slice_actor.GetVisibility() and not overlay.border_actor.GetVisibility()
+
+
+def test_nested_layers_keep_their_fill_and_border():
+    import vtk
+    import brush_stencil
+    import reslicer
+    from composite_overlay import CompositeOverlay
+    from vtk_segmentation_list_manager import SegmentationLayer
+    from vtk.util import numpy_support
+
+    reference = vtk.vtkImageData()
+    reference.SetDimensions(16, 16, 3)
+    reference.AllocateScalars(vtk.VTK_SHORT, 1)
+
+    inner = SegmentationLayer(_mask_image(reference), color=np.array([255, 0, 0]), alpha=1.0, name="gtv")
+    outer = SegmentationLayer(_mask_image(reference), color=np.array([0, 0, 255]), alpha=0.3, name="ptv")
+    brush_stencil.vtk_image_as_zyx_view(inner.get_image())[1, 6:10, 6:10] = 1
+    brush_stencil.vtk_image_as_zyx_view(outer.get_image())[1, 2:14, 2:14] = 1
+
+    overlay = CompositeOverlay(reslicer.AXIAL)
+    overlay.add_layer(inner)
+    overlay.add_layer(outer)
+    overlay.update(1)
+
+    rgba = numpy_support.vtk_to_numpy(overlay.rgba_slice.GetPointData().GetScalars()).reshape(16, 16, 4)
+    assert rgba[8, 8].tolist() == [179, 0, 76, 255]  # 30% of the outer layer over the inner one
+    assert rgba[3, 3].tolist() == [0, 0, 255, 76]
+    colors = numpy_support.vtk_to_numpy(overlay.border_poly_data.GetCellData().GetScalars())
+    assert {tuple(c) for c in colors} == {(255, 0, 0), (0, 0, 255)}
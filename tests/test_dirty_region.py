@@ -0,0 +1,37 @@
+"""Dirty-extent helpers used to skip unaffected view updates."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def test_union_and_slice_intersection():
+    import dirty_region
+
+    a = (2, 5, 3, 4, 10, 10)
+    b = (0, 1, 8, 9, 12, 14)
+    assert dirty_region.union(a, b) == (0, 5, 3, 9, 10, 14)
+    assert dirty_region.union(None, a) == a
+    assert dirty_region.union(None, a, whole_if_none=True) is None
+
+    assert dirty_region.intersects_slice(a, 2, 10)
+    assert not dirty_region.intersects_slice(a, 2, 11)
+    assert dirty_region.intersects_slice(a, 0, 4) and not dirty_region.intersects_slice(a, 0, 6)
+    # unknown region: every slice must update
+    assert dirty_region.intersects_slice(None, 1, 100)
+
+
+def test_to_zyx_slices_clips_to_whole_extent():
+    import numpy as np
+    import dirty_region
+
+    whole = (0, 9, 0, 7, 0, 5)
+    vol = np.zeros((6, 8, 10), dtype=np.uint8)
+    vol[dirty_region.to_zyx_slices((-3, 2, 6, 20, 5, 5), whole)] = 1
+    assert vol.sum() == 3 * 2 * 1
+    assert vol[5, 6:8, 0:3].all()
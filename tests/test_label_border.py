@@ -0,0 +1,96 @@
+"""Label borders extracted inside the labeled bounding box."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _label_slice():
+    import vtk
+    from vtk.util import numpy_support
+
+    image = vtk.vtkImageData()
+    image.SetExtent(2, 81, 5, 64, 7, 7)
+    image.SetSpacing(0.5, 0.5, 2.0)
+    image.SetOrigin(10.0, -4.0, 3.0)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_SHORT, 1)
+    image.GetPointData().GetScalars().Fill(0)
+    labels = numpy_support.vtk_to_numpy(image.GetPointData().GetScalars())
+    yy, xx = np.mgrid[:60, :80]
+    grid = labels.reshape(60, 80)
+    grid[(yy - 20) ** 2 + (xx - 30) ** 2 < 64] = 1
+    grid[(yy - 22) ** 2 + (xx - 37) ** 2 < 36] = 2
+    grid[0:3, 77:80] = 1  # touches the slice corner
+    return image, labels
+
+
+def _points(poly_data):
+    from vtk.util import numpy_support
+
+    points = numpy_support.vtk_to_numpy(poly_data.GetPoints().GetData())
+    used = np.unique(numpy_support.vtk_to_numpy(poly_data.GetLines().GetConnectivityArray()))
+    return {tuple(p) for p in np.round(points[used], 6)}
+
+
+def test_cropped_borders_match_full_slice_and_are_cached():
+    import vtk
+    from label_border import LabelBorders, labeled_box
+    from slice_cache import SliceCache
+    from vtk.util import numpy_support
+
+    image, labels = _label_slice()
+    table = np.array([[0, 0, 0, 0], [255, 0, 0, 255], [0, 0, 255, 255]], dtype=np.uint8)
+
+    assert labeled_box(labels, image.GetExtent()) == (2 + 22, 81, 5, 5 + 28, 7, 7)
+    assert labeled_box(np.zeros_like(labels), image.GetExtent()) is None
+
+    full = vtk.vtkSurfaceNets2D()
+    full.SetInputData(image)
+    full.SmoothingOff()
+    full.SetNumberOfLabels(2)
+    full.SetLabel(0, 1)
+    full.SetLabel(1, 2)
+    full.Update()
+
+    borders = LabelBorders()
+    cache = SliceCache(1 << 20)
+    out = borders.extract(image, labels, [1, 2], table, cache=cache, key="slice")
+    assert _points(out) == _points(full.GetOutput())
+    colors = numpy_support.vtk_to_numpy(out.GetCellData().GetScalars())
+    assert {tuple(c) for c in colors} == {(255, 0, 0), (0, 0, 255)}
+
+    # revisiting the slice does not recontour
+    assert borders.extract(image, labels, [1, 2], table, cache=cache, key="slice") is out
+
+    # decimated borders have fewer points but keep their colors
+    borders.decimation = 0.8
+    simplified = borders.extract(image, labels, [1, 2], table, cache=cache, key="slice")
+    assert simplified is not out
+    assert len(_points(simplified)) < len(_points(out))
+    colors = numpy_support.vtk_to_numpy(simplified.GetCellData().GetScalars())
+    assert {tuple(c) for c in colors} == {(255, 0, 0), (0, 0, 255)}
+
+
+def test_each_slice_is_contoured_again():
+    from label_border import LabelBorders
+    from vtk.util import numpy_support
+
+    image, labels = _label_slice()
+    table = np.array([[0, 0, 0, 0], [255, 0, 0, 255], [0, 0, 255, 255]], dtype=np.uint8)
+    borders = LabelBorders()
+    first = borders.extract(image, labels, [1, 2], table)
+    count = first.GetNumberOfCells()
+
+    # the next slice, same size and box, without label 2
+    other = np.where(labels == 2, 1, labels).astype(labels.dtype)
+    second = borders.extract(image, other, [1, 2], table)
+    colors = numpy_support.vtk_to_numpy(second.GetCellData().GetScalars())
+    assert {tuple(c) for c in colors} == {(255, 0, 0)}
+    assert first.GetNumberOfCells() == count
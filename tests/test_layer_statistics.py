@@ -0,0 +1,49 @@
+"""Layer statistics derived from the slice occupancy index."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def test_statistics_match_direct_computation():
+    import vtk
+    import brush_stencil
+    import layer_statistics
+    import slice_occupancy
+
+    image = vtk.vtkImageData()
+    image.SetExtent(0, 19, 0, 14, 2, 11)
+    image.SetSpacing(0.5, 0.8, 2.0)
+    image.SetOrigin(-10.0, 4.0, 7.0)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)
+    vol = brush_stencil.vtk_image_as_zyx_view(image)
+    vol[:] = 0
+    vol[1:4, 2:9, 5:7] = 1
+    vol[7, 12, 15] = 3
+
+    occ = slice_occupancy.SliceOccupancy.from_volume(vol, image.GetExtent())
+    stats = layer_statistics.from_occupancy(occ, image)
+
+    zyx = np.argwhere(vol != 0)
+    assert stats.voxel_count == len(zyx)
+    assert np.isclose(stats.volume_mm3, len(zyx) * 0.5 * 0.8 * 2.0)
+    assert stats.extent == (5, 15, 2, 12, 1 + 2, 7 + 2)
+
+    xyz = zyx[:, ::-1] + np.array([0, 0, 2])
+    assert np.allclose(stats.centroid_index, xyz.mean(axis=0))
+    expected_world = np.array(image.GetOrigin()) + xyz.mean(axis=0) * np.array(image.GetSpacing())
+    assert np.allclose(stats.centroid_world, expected_world)
+
+    assert stats.crop_extent(margin=2, whole_extent=image.GetExtent()) == (3, 17, 0, 14, 2, 11)
+
+    vol[:] = 0
+    occ.rebuild(vol)
+    empty = layer_statistics.from_occupancy(occ, image)
+    assert empty.is_empty() and empty.extent is None and empty.crop_extent(1) is None
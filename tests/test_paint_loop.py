@@ -0,0 +1,67 @@
+"""Frame-paced paint dab queue."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def test_dabs_are_batched_per_frame_and_latency_recorded():
+    from PyQt5.QtWidgets import QApplication
+    import paint_loop
+
+    app = QApplication.instance() or QApplication([])
+
+    batches = []
+    renders = []
+
+    def apply_batch(dabs):
+        batches.append(list(dabs))
+        return lambda: renders.append(len(dabs))
+
+    loop = paint_loop.PaintLoop(apply_batch, interval_ms=1000)
+    for i in range(5):
+        loop.queue(i)
+    assert batches == [] and loop.has_pending()
+
+    loop.flush()
+    assert batches == [[0, 1, 2, 3, 4]] and renders == [5]
+    assert loop.latency.summary()["count"] == 5
+    assert not loop.has_pending()
+
+    loop.flush()  # nothing pending: no extra render
+    assert renders == [5]
+
+    loop.interval_ms = 0
+    loop.queue("late")
+    app.processEvents()
+    for _ in range(20):
+        if len(batches) == 2:
+            break
+        app.processEvents()
+    assert batches[-1] == ["late"]
+
+
+def test_preferences_show_the_latency_and_set_the_interval(tmp_path, monkeypatch):
+    from PyQt5.QtWidgets import QApplication
+    import config
+    import paint_loop
+    from preferences_dialog import PreferencesDialog
+
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "_config", None)
+
+    stats = paint_loop.LatencyStats()
+    for ms in (10.0, 20.0):
+        stats.add(ms)
+    dialog = PreferencesDialog(paint_latency=stats.summary())
+    assert "mean 15.0 ms" in dialog.paint_latency_label.text()
+    assert dialog.values()["paint_frame_interval_ms"] == 16
+    dialog.paint_interval_spin.setValue(8)
+    assert dialog.values()["paint_frame_interval_ms"] == 8
+    assert "no strokes yet" in PreferencesDialog().paint_latency_label.text()
@@ -0,0 +1,70 @@
+"""Application-wide render scheduling."""
+
+from __future__ import annotations
+
+import sys
+import time
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+class _Window:
+    def __init__(self, name, log, cost_s):
+        self.name, self.log, self.cost_s = name, log, cost_s
+
+    def Render(self):
+        time.sleep(self.cost_s)
+        self.log.append(self.name)
+
+
+class _View:
+    def __init__(self, name, log, active=False, cost_s=0.0):
+        self.name = name
+        self.active = active
+        self.render_window = _Window(name, log, cost_s)
+
+
+def test_dirty_views_render_once_per_frame_by_priority_within_budget():
+    from PyQt5.QtWidgets import QApplication
+    from render_scheduler import RenderScheduler
+
+    app = QApplication.instance() or QApplication([])
+    log = []
+    axial, coronal, sagittal = _View("ax", log), _View("cr", log, active=True), _View("sg", log)
+    scheduler = RenderScheduler(interval_ms=1000, budget_ms=1000)
+
+    for view in (axial, sagittal, coronal, axial, sagittal):
+        scheduler.mark_dirty(view)
+    scheduler.set_focus_view(sagittal)
+    scheduler.run_frame()
+    # at most once each: the view under the cursor, the active view, then the rest
+    assert log == ["sg", "cr", "ax"]
+    assert not any(scheduler.is_dirty(v) for v in (axial, coronal, sagittal))
+
+    # a delayed request waits for its time; an immediate render clears it
+    log.clear()
+    scheduler.mark_dirty(axial, delay_ms=60_000)
+    scheduler.run_frame()
+    assert log == [] and scheduler.is_dirty(axial)
+    scheduler.render_now(axial)
+    assert log == ["ax"] and not scheduler.is_dirty(axial)
+
+    # views beyond the frame budget carry over to the next frame
+    log.clear()
+    slow = [_View(f"slow{i}", log, cost_s=0.02) for i in range(3)]
+    scheduler.budget_ms = 5
+    for view in slow:
+        scheduler.mark_dirty(view)
+    scheduler.run_frame()
+    assert log == ["slow0"]
+    scheduler.run_frame()
+    assert log == ["slow0", "slow1"]
+    scheduler.flush()
+    assert len(log) == 3
+
+    timings = scheduler.timing_summary()
+    assert timings["ax"]["count"] == 2
+    assert timings["slow0"]["mean_ms"] >= 15.0
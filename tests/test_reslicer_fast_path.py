@@ -0,0 +1,76 @@
+"""Axis-aligned slices cut from the volume array match vtkImageReslice."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _image(extent, direction=None, components=1):
+    import vtk
+    from vtk.util import numpy_support
+
+    image = vtk.vtkImageData()
+    image.SetExtent(*extent)
+    image.SetSpacing(0.5, 0.7, 2.0)
+    image.SetOrigin(10.0, -5.0, 3.0)
+    if direction is not None:
+        image.SetDirectionMatrix(*direction)
+    image.AllocateScalars(vtk.VTK_SHORT, components)
+    values = numpy_support.vtk_to_numpy(image.GetPointData().GetScalars())
+    values[...] = np.arange(values.size).reshape(values.shape)
+    return image
+
+
+def _as_tuple(slice_image):
+    from vtk.util import numpy_support
+
+    d = slice_image.GetDirectionMatrix()
+    return (
+        slice_image.GetExtent(),
+        np.round(slice_image.GetSpacing(), 6).tolist(),
+        np.round(slice_image.GetOrigin(), 6).tolist(),
+        np.round([d.GetElement(i, j) for i in range(3) for j in range(3)], 6).tolist(),
+        numpy_support.vtk_to_numpy(slice_image.GetPointData().GetScalars()).tolist(),
+    )
+
+
+def test_fast_slices_match_reslice():
+    import reslicer
+
+    flip_xy = (-1, 0, 0, 0, -1, 0, 0, 0, 1)
+    swap_xy = (0, -1, 0, 1, 0, 0, 0, 0, 1)
+    oblique = (0.8, -0.6, 0, 0.6, 0.8, 0, 0, 0, 1)
+    for direction in (None, flip_xy, swap_xy, oblique):
+        for extent in ((0, 9, 0, 7, 0, 5), (2, 11, 3, 10, 1, 6)):
+            for components in (1, 3):
+                image = _image(extent, direction, components)
+                for axis in (reslicer.AXIAL, reslicer.CORONAL, reslicer.SAGITTAL):
+                    fast = reslicer.Reslicer(axis, image, background_value=-1)
+                    slow = reslicer.Reslicer(axis, image, background_value=-1)
+                    slow.fast_path_enabled = False
+                    lo, hi = fast.get_slice_index_min_max()
+                    for index in range(lo, hi + 1):
+                        result = fast.get_slice_image(index)
+                        assert (result is fast._fast_slice) == (direction is not oblique)
+                        assert fast.slice_index == index
+                        assert _as_tuple(result) == _as_tuple(slow.get_slice_image(index))
+
+
+def test_axial_slice_shares_volume_memory():
+    import reslicer
+    from vtk.util import numpy_support
+
+    image = _image((0, 9, 0, 7, 0, 5))
+    r = reslicer.Reslicer(reslicer.AXIAL, image, background_value=-1)
+    r.get_slice_image(2)
+    volume = numpy_support.vtk_to_numpy(image.GetPointData().GetScalars()).reshape(6, 8, 10)
+    assert np.shares_memory(r._fast_slice_array, volume)
+    # outside the volume the reslice fills the slice with the background
+    assert r.get_slice_image(9) is not r._fast_slice
@@ -0,0 +1,60 @@
+"""Hatch-fill overlay built from NumPy arrays."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def test_hatch_segments_cover_exactly_the_selected_diagonals():
+    from reslicer import hatch_line_segments
+
+    rows, cols = np.indices((30, 40))
+    mask = ((rows - 12) ** 2 + (cols - 15) ** 2 < 80) | ((rows > 20) & (cols > 30))
+    mask[12, 15] = False  # a hole splits some runs
+
+    segments = hatch_line_segments(mask, 3)
+    covered = np.zeros_like(mask)
+    for (c0, r0), (c1, r1) in segments:
+        n = int(round(c1 - c0))
+        assert n == int(round(r1 - r0)) and n >= 1  # 45 degrees in index space
+        r, c = int(r0 + 0.5), int(c0 + 0.5)
+        assert (c - r) % 3 == 0
+        assert mask[r + np.arange(n), c + np.arange(n)].all()
+        covered[r + np.arange(n), c + np.arange(n)] = True
+    assert np.array_equal(covered, mask & ((cols - rows) % 3 == 0))
+    assert hatch_line_segments(np.zeros((4, 4), dtype=bool), 3).shape == (0, 2, 2)
+
+
+def test_hatch_actor_is_one_line_polydata_on_the_slice():
+    import vtk
+    import brush_stencil
+    import reslicer
+    import vtk_tools
+
+    reference = vtk.vtkImageData()
+    reference.SetDimensions(40, 30, 6)
+    reference.SetSpacing(0.5, 0.5, 2.0)
+    reference.SetOrigin(-10.0, 5.0, 1.0)
+    reference.AllocateScalars(vtk.VTK_SHORT, 1)
+    mask = vtk_tools.create_uchar_image_based_on_image(reference, 0)
+    brush_stencil.vtk_image_as_zyx_view(mask)[3, 5:25, 10:30] = 1
+
+    r = reslicer.ReslicerWithContourPolyActor(reslicer.AXIAL, mask, background_value=0, vtk_color=(0, 1, 0))
+    r.hatch_spacing = 1.5  # every third pixel diagonal
+    r.set_slice_index_and_update_slice_actor(3)
+    hatch = r.hatch_poly_data
+    assert hatch.GetNumberOfLines() == len(range(-12, 24 + 1, 3))  # column - row spans -14..24
+    x0, x1, y0, y1, z0, z1 = hatch.GetBounds()
+    assert -10.0 + 0.5 * 9.5 <= x0 and x1 <= -10.0 + 0.5 * 29.5
+    assert 5.0 + 0.5 * 4.5 <= y0 and y1 <= 5.0 + 0.5 * 24.5
+    assert z0 == z1 == 1.0 + 2.0 * 3
+
+    r.set_slice_index_and_update_slice_actor(0)
+    assert r.hatch_poly_data.GetNumberOfPoints() == 0
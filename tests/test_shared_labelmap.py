@@ -0,0 +1,96 @@
+"""Layers as labels of one shared labelmap."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _reference_image():
+    import vtk
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(20, 16, 12)
+    image.SetExtent(0, 19, 4, 19, 0, 11)
+    image.SetSpacing(1.0, 1.0, 2.0)
+    image.AllocateScalars(vtk.VTK_SHORT, 1)
+    return image
+
+
+def test_paint_rules_occupancy_and_export():
+    import brush_stencil
+    import slice_occupancy
+    from shared_labelmap import SharedLabelmap
+
+    lm = SharedLabelmap.create_like(_reference_image())
+    a = lm.allocate_label("A")
+    b = lm.allocate_label("B")
+    vol = lm.volume()
+    assert lm.occupancy(a).voxel_count() == 0
+
+    stencil = np.ones((1, 5, 5), dtype=bool)
+    box = (3, 3, 0, 15, 0, 19)
+
+    def stamp(center, value, erase=False):
+        token = lm.begin_edit(box)
+        write, where = lm.paint_rule(value, erase=erase)
+        brush_stencil.stamp_stencil(vol, stencil, center, write, where=where)
+        lm.image.Modified()
+        return lm.end_edit(token)
+
+    assert stamp((3, 5, 5), a) == [a]
+    # overwrite: B takes A's voxels where they overlap
+    assert sorted(stamp((3, 5, 8), b)) == [a, b]
+    assert (vol[3, 3:8, 6:8] == b).all()
+
+    # protect: A keeps away from B
+    lm.protect_other_labels = True
+    stamp((3, 5, 5), a)
+    assert (vol[3, 3:8, 6:8] == b).all() and (vol[3, 3:8, 3:6] == a).all()
+
+    # erase clears only the layer's own label
+    stamp((3, 5, 5), a, erase=True)
+    assert not (vol == a).any() and (vol[3, 3:8, 6:8] == b).all()
+
+    # the delta-maintained index matches a rebuild per label
+    for value in (a, b):
+        expected = slice_occupancy.SliceOccupancy.from_volume(vol == value, lm.image.GetExtent())
+        for axis in (0, 1, 2):
+            assert np.array_equal(lm.occupancy(value).counts(axis), expected.counts(axis))
+
+    # export is the labelmap itself when the values already match
+    assert lm.export_labels({a: a, b: b}) is lm.image
+    out = brush_stencil.vtk_image_as_zyx_view(lm.export_labels({b: 7}))
+    assert np.array_equal(out, np.where(vol == b, 7, 0))
+
+
+def test_layers_share_one_labelmap():
+    import brush_stencil
+    import vtk_tools
+    from shared_labelmap import SharedLabelmap
+    from vtk_segmentation_list_manager import SegmentationLayer
+
+    lm = SharedLabelmap.create_like(_reference_image())
+    first = SegmentationLayer(None, name="first", labelmap=lm)
+    second = SegmentationLayer(None, name="second", labelmap=lm)
+    assert first.get_image() is second.get_image() is lm.image
+    assert first.get_label_value() != second.get_label_value()
+
+    mask = vtk_tools.create_uchar_image_based_on_image(lm.image, 0)
+    brush_stencil.vtk_image_as_zyx_view(mask)[2:5, 1:4, 1:4] = 1
+    changed = []
+    second.image_changed.connect(lambda layer, extent: changed.append(layer))
+    first.set_image(mask)
+    second.set_image(mask)  # overwrites first
+    assert changed[-1] is second and first.get_statistics().is_empty()
+    assert second.get_statistics().voxel_count == 27
+
+    # read_image() is a binary mask of the layer's own label
+    binary = brush_stencil.vtk_image_as_zyx_view(second.read_image())
+    assert binary.max() == 1 and binary.sum() == 27
@@ -0,0 +1,120 @@
+"""LRU slice cache and background prefetch."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def test_lru_eviction_and_stats():
+    from slice_cache import SliceCache
+
+    cache = SliceCache(300)
+    for key in "abc":
+        cache.put(key, key.upper(), 100)
+    assert cache.get("a") == "A"  # a is now the most recently used
+    cache.put("d", "D", 100)
+    assert not cache.contains("b") and cache.contains("a")
+    assert cache.get("b") is None
+
+    cache.put("huge", "X", 1000)  # larger than the cache: not kept
+    assert not cache.contains("huge")
+
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["bytes"] == 300
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["hit_rate"] == 0.5
+    assert stats["evictions"] == 1
+
+    cache.set_max_bytes(100)
+    assert cache.stats()["entries"] == 1 and cache.contains("d")
+
+
+def test_prefetcher_fills_the_cache():
+    from slice_cache import SliceCache, SlicePrefetcher
+
+    cache = SliceCache(1 << 20)
+    prefetcher = SlicePrefetcher(cache)
+    try:
+        jobs = [(i, lambda i=i: (np.full(4, i), 32)) for i in range(5)]
+        prefetcher.request("view", jobs)
+        # a newer request replaces the queued jobs of the same view
+        prefetcher.request("view", jobs[3:])
+        assert prefetcher.wait_idle()
+        assert cache.contains(3) and cache.contains(4)
+        assert cache.get(4).tolist() == [4, 4, 4, 4]
+        assert cache.stats()["prefetched"] >= 2
+    finally:
+        prefetcher.stop()
+
+
+def test_prefetched_overlay_slices_match_direct_composition():
+    import vtk
+    import brush_stencil
+    import reslicer
+    import vtk_tools
+    from composite_overlay import CompositeOverlay
+    from slice_cache import SliceCache, SlicePrefetcher
+    from vtk_segmentation_list_manager import SegmentationLayer
+    from vtk.util import numpy_support
+
+    reference = vtk.vtkImageData()
+    reference.SetDimensions(12, 10, 6)
+    reference.AllocateScalars(vtk.VTK_SHORT, 1)
+    layer = SegmentationLayer(
+        vtk_tools.create_uchar_image_based_on_image(reference, 0), color=np.array([255, 0, 0]), alpha=1.0
+    )
+    brush_stencil.vtk_image_as_zyx_view(layer.get_image())[:, 2:6, 3:8] = 1
+
+    def rgba(overlay):
+        return numpy_support.vtk_to_numpy(overlay.rgba_slice.GetPointData().GetScalars()).copy()
+
+    direct = CompositeOverlay(reslicer.CORONAL)
+    direct.add_layer(layer)
+
+    cached = CompositeOverlay(reslicer.CORONAL)
+    cached.add_layer(layer)
+    cached.cache = SliceCache(1 << 20)
+    prefetcher = SlicePrefetcher(cached.cache)
+    try:
+        prefetcher.request(cached, cached.prefetch_jobs([3, 4, 5]))
+        assert prefetcher.wait_idle()
+    finally:
+        prefetcher.stop()
+    assert cached.cache.stats()["prefetched"] == 3
+
+    for index in (3, 4, 5):
+        direct.update(index)
+        cached.update(index)
+        assert np.array_equal(rgba(direct), rgba(cached))
+    assert cached.cache.stats()["hits"] == 3
+
+    # an edit changes the layer MTime, so the stale entry is not used
+    brush_stencil.vtk_image_as_zyx_view(layer.get_image())[:, 2:6, 3:8] = 0
+    layer.get_image().Modified()
+    cached.update(4)
+    assert not cached.slice_actor.GetVisibility() or not rgba(cached)[:, 3].any()
+
+
+def test_preferences_show_the_cache_use(tmp_path, monkeypatch):
+    from PyQt5.QtWidgets import QApplication
+    import config
+    from preferences_dialog import PreferencesDialog
+    from slice_cache import SliceCache
+
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(config, "_config", None)
+
+    cache = SliceCache(1 << 20)
+    cache.put("a", object(), 1000)
+    cache.get("a")
+    cache.get("b")
+    dialog = PreferencesDialog(slice_cache=str(cache))
+    assert dialog.slice_cache_label.text() == f"Cache use: {cache}"
+    assert "hit rate 50% (1/2)" in dialog.slice_cache_label.text()
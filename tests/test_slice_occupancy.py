@@ -0,0 +1,74 @@
+"""Per-axis slice occupancy index of label volumes."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def test_queries_and_delta_match_full_rebuild():
+    import slice_occupancy
+
+    extent = (0, 29, 10, 29, 5, 24)  # x, y, z extent; y and z do not start at 0
+    vol = np.zeros((20, 20, 30), dtype=np.uint8)
+    vol[2, 3:6, 4:9] = 1
+    vol[9, 10, 10] = 1
+    occ = slice_occupancy.SliceOccupancy.from_volume(vol, extent)
+
+    assert occ.voxel_count() == 16
+    assert list(occ.labeled_slices(2)) == [7, 14]
+    assert occ.is_slice_empty(2, 8) and not occ.is_slice_empty(2, 7)
+    assert occ.is_slice_empty(2, 100)
+    assert occ.next_labeled_slice(2, 7) == 14
+    assert occ.next_labeled_slice(2, 14, step=-1) == 7
+    assert occ.next_labeled_slice(2, 14) is None
+    assert occ.has_gaps(2) and list(occ.gap_slices(2)) == list(range(8, 14))
+    assert list(occ.gap_slices(0)) == [9]
+
+    # erase part of one slice and paint another, feeding only the edited box
+    box = (2, 9, 3, 10, 4, 10)
+    region = tuple(slice(box[2 * d], box[2 * d + 1] + 1) for d in range(3))
+    before = vol[region].copy()
+    vol[2, 3:6, 4:6] = 0
+    vol[5, 7, 7:9] = 2
+    occ.apply_delta(box, before, vol[region])
+
+    expected = slice_occupancy.SliceOccupancy.from_volume(vol, extent)
+    for axis in (0, 1, 2):
+        assert np.array_equal(occ.counts(axis), expected.counts(axis))
+    assert occ.labeled_range(2) == (7, 14)
+
+
+def test_layer_index_follows_edits_and_untracked_writes():
+    import vtk
+    import brush_stencil
+    from vtk_segmentation_list_manager import SegmentationLayer
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(16, 12, 10)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)
+    vol = brush_stencil.vtk_image_as_zyx_view(image)
+    vol[:] = 0
+    layer = SegmentationLayer(image, name="L")
+
+    assert layer.get_slice_occupancy().voxel_count() == 0
+
+    box = (3, 3, 0, 11, 0, 15)
+    edit = layer.begin_edit(box)
+    assert edit is not None
+    vol[3, 2:4, 5] = 1
+    image.Modified()
+    layer.end_edit(edit)
+    occ = layer.get_slice_occupancy()
+    assert list(occ.labeled_slices(2)) == [3]
+
+    # a write without begin_edit()/end_edit() is picked up by a rebuild
+    vol[7, 0, 0] = 1
+    image.Modified()
+    assert list(layer.get_slice_occupancy().labeled_slices(2)) == [3, 7]
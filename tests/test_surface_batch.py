@@ -0,0 +1,100 @@
+"""Surfaces of many layers from one multi-label pass."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _image(volume):
+    import vtk
+    import brush_stencil
+
+    nz, ny, nx = volume.shape
+    image = vtk.vtkImageData()
+    image.SetExtent(0, nx - 1, 0, ny - 1, 0, nz - 1)
+    image.SetSpacing(0.8, 0.8, 2.0)
+    image.SetOrigin(10.0, -5.0, 0.0)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)
+    brush_stencil.vtk_image_as_zyx_view(image)[...] = volume
+    return image
+
+
+def _layer(volume, name):
+    from vtk_segmentation_list_manager import SegmentationLayer
+
+    return SegmentationLayer(segmentation=_image(volume.astype(np.uint8)), name=name)
+
+
+def test_layers_share_one_pass_and_overlaps_are_left_over():
+    from PyQt5.QtWidgets import QApplication
+    from surface_batch import combine_layers, label_surfaces
+
+    app = QApplication.instance() or QApplication([])
+    shape = (20, 24, 28)
+    a, b, c = np.zeros(shape, bool), np.zeros(shape, bool), np.zeros(shape, bool)
+    a[4:10, 4:12, 4:12] = True
+    b[4:10, 14:20, 14:24] = True
+    c[8:12, 10:16, 10:16] = True  # overlaps a
+    layers = [_layer(a, "a"), _layer(b, "b"), _layer(c, "c"), _layer(np.zeros(shape), "empty")]
+
+    combined = combine_layers(layers)
+    assert combined.leftover == [layers[2]]
+    assert [layer.get_name() for layer in combined.layers.values()] == ["a", "b", "empty"]
+    assert (combined.volume == 1).sum() == a.sum() and (combined.volume == 2).sum() == b.sum()
+
+    meshes = label_surfaces(combined.volume, combined.frame, sorted(combined.layers))
+    assert meshes[3] == {}
+    for value, mask in ((1, a), (2, b)):
+        assert len(meshes[value]) == 1  # both blocks fit in one brick
+        mesh = next(iter(meshes[value].values()))
+        assert mesh.GetNumberOfCells() > 0
+        # each mesh lies around its own block, in world coordinates
+        xmin, xmax, ymin, ymax, zmin, zmax = mesh.GetBounds()
+        z, y, x = np.nonzero(mask)
+        assert 10.0 + 0.8 * (x.min() - 1) <= xmin and xmax <= 10.0 + 0.8 * (x.max() + 1)
+        assert -5.0 + 0.8 * (y.min() - 1) <= ymin and ymax <= -5.0 + 0.8 * (y.max() + 1)
+        assert mesh.GetPointData().GetNormals() is not None
+    assert label_surfaces(combined.volume, combined.frame, [1, 2], lambda: True) is None
+
+
+def test_batch_meshes_are_brick_meshes_and_edits_stay_local():
+    from PyQt5.QtWidgets import QApplication
+    from vtk.util import numpy_support
+    import brush_stencil
+    from surface_batch import combine_layers, label_surfaces
+    from surface_bricks import BrickSurfaces, contour_bricks
+
+    app = QApplication.instance() or QApplication([])
+    z, y, x = np.mgrid[0:30, 0:40, 0:50]
+    a = ((z - 14) / 10.0) ** 2 + ((y - 20) / 15.0) ** 2 + ((x - 22) / 18.0) ** 2 <= 1.0
+    b = np.zeros(a.shape, bool)
+    b[20:28, 30:38, 40:48] = True
+    layers = [_layer(a, "a"), _layer(b, "b")]
+    combined = combine_layers(layers)
+    meshes = label_surfaces(combined.volume, combined.frame, [1, 2], brick_size=16)
+
+    # the per-layer brick path builds the same meshes
+    layer = layers[0]
+    reference = BrickSurfaces(brick_size=16)
+    reference.apply(contour_bricks(reference.plan(layer.get_geometry(), layer.read_region)))
+    assert sorted(meshes[1]) == sorted(reference.meshes)
+    for key, mesh in meshes[1].items():
+        for array in (lambda m: m.GetPoints().GetData(), lambda m: m.GetPolys().GetConnectivityArray(),
+                      lambda m: m.GetPointData().GetNormals()):
+            assert np.array_equal(numpy_support.vtk_to_numpy(array(mesh)),
+                                  numpy_support.vtk_to_numpy(array(reference.meshes[key])))
+
+    # adopted, they let an edit recontour only the bricks it touches
+    bricks = BrickSurfaces(brick_size=16)
+    bricks.adopt(combined.frame, meshes[1])
+    assert bricks.poly_data.GetNumberOfCells() == reference.poly_data.GetNumberOfCells()
+    brush_stencil.vtk_image_as_zyx_view(layer.get_image())[3:6, 25:31, 40:45] = 1
+    jobs = bricks.plan(layer.get_geometry(), layer.read_region, None, (40, 44, 25, 30, 3, 5))
+    assert [job.key for job in jobs] == [(0, 1, 2)]
@@ -0,0 +1,100 @@
+"""Brick-wise surface extraction of segmentation layers."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _mask_image(volume):
+    import vtk
+    import brush_stencil
+
+    nz, ny, nx = volume.shape
+    image = vtk.vtkImageData()
+    image.SetExtent(2, 2 + nx - 1, 0, ny - 1, 0, nz - 1)
+    image.SetSpacing(0.7, 0.9, 1.5)
+    image.SetOrigin(-4.0, 3.0, 1.0)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)
+    brush_stencil.vtk_image_as_zyx_view(image)[...] = volume
+    return image
+
+
+def _triangles_and_area(poly):
+    from vtk.util import numpy_support
+
+    points = numpy_support.vtk_to_numpy(poly.GetPoints().GetData())
+    triangles = numpy_support.vtk_to_numpy(poly.GetPolys().GetConnectivityArray()).reshape(-1, 3)
+    a, b, c = (points[triangles[:, i]] for i in range(3))
+    return len(triangles), 0.5 * np.linalg.norm(np.cross(b - a, c - a), axis=1).sum()
+
+
+def _full_contour(image):
+    import vtk
+
+    contour = vtk.vtkDiscreteMarchingCubes()
+    contour.SetInputData(image)
+    contour.SetValue(0, 1)
+    contour.Update()
+    return _triangles_and_area(contour.GetOutput())
+
+
+def _run(bricks, jobs):
+    from surface_bricks import contour_brick
+
+    bricks.apply([(job.key, job.generation, contour_brick(job)) for job in jobs])
+
+
+def test_brick_boxes_share_border_points():
+    from surface_bricks import brick_counts, brick_point_box, bricks_in_box
+
+    shape = (10, 33, 40)
+    assert brick_counts(shape, 16) == (1, 2, 3)
+    assert brick_point_box((0, 1, 2), shape, 16) == (0, 9, 16, 32, 32, 39)
+    # a point on a brick border belongs to the bricks on both sides
+    assert bricks_in_box(shape, (3, 3, 16, 16, 5, 5), 16) == [(0, 0, 0), (0, 1, 0)]
+    assert bricks_in_box(shape, (3, 3, 20, 20, 33, 39), 16) == [(0, 1, 2)]
+
+
+def test_bricks_match_whole_volume_and_update_locally():
+    import brush_stencil
+    import slice_occupancy
+    from surface_bricks import BrickSurfaces
+
+    z, y, x = np.mgrid[0:30, 0:40, 0:50]
+    volume = (((z - 14) / 10.0) ** 2 + ((y - 20) / 15.0) ** 2 + ((x - 22) / 18.0) ** 2 <= 1.0).astype(np.uint8)
+    image = _mask_image(volume)
+    view = brush_stencil.vtk_image_as_zyx_view(image)
+
+    def read_region(box):
+        return view[box[0]:box[1] + 1, box[2]:box[3] + 1, box[4]:box[5] + 1].copy()
+
+    bricks = BrickSurfaces(brick_size=16)
+    occupancy = slice_occupancy.SliceOccupancy.from_volume(view, image.GetExtent())
+    jobs = bricks.plan(image, read_region, occupancy)
+    assert 0 < len(jobs) < 2 * 3 * 4  # bricks outside the labeled slices need no job
+    _run(bricks, jobs)
+    count, area = _triangles_and_area(bricks.poly_data)
+    full_count, full_area = _full_contour(image)
+    assert count == full_count and np.isclose(area, full_area)
+
+    # a local edit recontours only the bricks around it
+    view[3:6, 25:31, 40:45] = 1
+    image.Modified()
+    dirty = (2 + 40, 2 + 44, 25, 30, 3, 5)  # (x0, x1, y0, y1, z0, z1)
+    superseded = bricks.plan(image, read_region, None, dirty)
+    jobs = bricks.plan(image, read_region, None, dirty)
+    assert len(jobs) == 1 and jobs[0].key == (0, 1, 2)
+    _run(bricks, jobs)
+    mesh = bricks.meshes[(0, 1, 2)]
+    _run(bricks, superseded)  # results of an earlier plan arriving late are ignored
+    assert bricks.meshes[(0, 1, 2)] is mesh
+    count, area = _triangles_and_area(bricks.poly_data)
+    full_count, full_area = _full_contour(image)
+    assert count == full_count and np.isclose(area, full_area)
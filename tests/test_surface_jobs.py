@@ -0,0 +1,46 @@
+"""Bounded surface job pool with supersede and cancellation."""
+
+from __future__ import annotations
+
+import sys
+import threading
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def test_one_pending_job_per_owner_and_cancellation():
+    from PyQt5.QtWidgets import QApplication
+    from surface_jobs import SurfaceJobPool
+
+    app = QApplication.instance() or QApplication([])
+    pool = SurfaceJobPool(workers=1)
+    delivered = []
+    started = threading.Event()
+    gate = threading.Event()
+
+    def blocking(is_cancelled):
+        started.set()
+        while not gate.wait(0.01):
+            if is_cancelled():
+                return "cancelled"
+        return "first"
+
+    pool.submit("a", blocking, delivered.append)
+    assert started.wait(5)
+    # the running job of "a" is told to stop; only the last request of "a" is kept
+    pool.submit("a", lambda is_cancelled: "second", delivered.append)
+    pool.submit("b", lambda is_cancelled: "other", delivered.append)
+    pool.submit("a", lambda is_cancelled: "third", delivered.append)
+    assert pool.queue_depth() == 2 and pool.running_count() == 1
+
+    assert pool.wait_idle(10)
+    app.processEvents()
+    # "a" keeps its place ahead of "b"; cancelled and superseded jobs deliver nothing
+    assert delivered == ["third", "other"]
+    stats = pool.stats()
+    assert stats["queued"] == 0 and stats["job_times"]["count"] == 2
+    assert pool.status_text().startswith("3D surfaces: 0 queued, 0 running")
+    pool.stop()
@@ -0,0 +1,68 @@
+"""Reduced surface meshes for camera interaction."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _sphere(resolution):
+    import vtk
+
+    sphere = vtk.vtkSphereSource()
+    sphere.SetThetaResolution(resolution)
+    sphere.SetPhiResolution(resolution)
+    sphere.Update()
+    return sphere.GetOutput()
+
+
+def test_budget_is_shared_in_proportion():
+    from surface_lod import triangle_targets
+
+    assert triangle_targets({"a": 300, "b": 100}, 1000) == {"a": None, "b": None}
+    assert triangle_targets({"a": 300, "b": 100}, 0) == {"a": None, "b": None}
+    assert triangle_targets({"a": 3000, "b": 1000}, 1000) == {"a": 750, "b": 250}
+
+
+def test_lod_is_decimated_to_the_target():
+    from surface_lod import build_lod
+
+    mesh = _sphere(100)
+    count = mesh.GetNumberOfPolys()
+    smoothed, lod = build_lod(mesh, count // 10, smoothing=False)
+    assert smoothed is None
+    assert 0.5 * count // 10 <= lod.GetNumberOfPolys() <= 1.5 * count // 10
+    assert lod.GetPointData().GetNormals() is not None
+
+    smoothed, lod = build_lod(mesh, None, smoothing=True)
+    assert lod is None and smoothed.GetNumberOfPolys() == count
+    assert build_lod(mesh, count // 10, smoothing=True, is_cancelled=lambda: True) is None
+    assert build_lod(mesh, count, smoothing=False) == (None, None)
+
+
+def test_finished_meshes_ask_the_view_for_a_frame():
+    from PyQt5.QtWidgets import QApplication
+    import vtk
+    from segmentation_layer_surface import SegmentationLayerSurface
+    from vtk_segmentation_list_manager import SegmentationLayer
+
+    app = QApplication.instance() or QApplication([])
+    image = vtk.vtkImageData()
+    image.SetDimensions(8, 8, 8)
+    image.AllocateScalars(vtk.VTK_UNSIGNED_CHAR, 1)
+    image.GetPointData().GetScalars().Fill(0)
+
+    class Window:
+        def Render(self):
+            raise AssertionError("rendered outside the render scheduler")
+
+    frames = []
+    surface = SegmentationLayerSurface(SegmentationLayer(image, name="a"), render_window=Window(), build=False,
+                                       render=lambda: frames.append(1))
+    surface.on_surface_ready([])
+    surface.on_lod_ready((None, None), surface._lod_key)
+    assert len(frames) == 2
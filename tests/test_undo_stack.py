@@ -0,0 +1,186 @@
+"""Brick-based undo/redo history."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _volume():
+    vol = np.zeros((40, 70, 100), dtype=np.uint8)
+    vol[5:10, 5:10, 5:10] = 1
+    return vol
+
+
+def test_touch_records_only_changed_bricks_and_round_trips():
+    import undo_stack
+
+    vol = _volume()
+    original = vol.copy()
+    stack = undo_stack.UndoStack()
+
+    txn = stack.begin("Paint", "layer", lambda: vol)
+    txn.touch((0, 39, 0, 69, 60, 99))  # two bricks wide in x, only one gets painted
+    vol[20:25, 40:45, 70:75] = 1
+    entry = stack.commit(txn)
+    assert len(entry.bricks) == 1
+    assert entry.box() == (0, 31, 32, 63, 64, 95)
+    painted = vol.copy()
+
+    stack.undo()
+    assert np.array_equal(vol, original)
+    stack.redo()
+    assert np.array_equal(vol, painted)
+    assert not stack.can_redo()
+
+
+def test_snapshot_diff_and_unchanged_edit_is_not_recorded():
+    import undo_stack
+
+    vol = _volume()
+    stack = undo_stack.UndoStack()
+
+    txn = stack.begin("Threshold", "layer", lambda: vol)
+    txn.snapshot()
+    assert stack.commit(txn) is None and not stack.can_undo()
+
+    txn = stack.begin("Threshold", "layer", lambda: vol)
+    txn.snapshot()
+    vol[:] = 0
+    vol[35:, 65:, 97:] = 2
+    entry = stack.commit(txn)
+    assert set(entry.bricks) == {(0, 0, 0), (1, 2, 3)}
+
+    stack.undo()
+    assert np.array_equal(vol, _volume())
+
+
+def test_budget_spills_old_steps_to_disk(tmp_path):
+    import undo_stack
+
+    vol = _volume()
+    stack = undo_stack.UndoStack(ram_budget_bytes=0, max_steps=3, spill_dir=str(tmp_path))
+    rng = np.random.default_rng(0)
+    states = [vol.copy()]
+    for i in range(5):
+        txn = stack.begin(f"step {i}", "layer", lambda: vol)
+        txn.snapshot()
+        vol[rng.integers(0, 40), :, :] = rng.integers(0, 255, size=(70, 100))
+        stack.commit(txn)
+        states.append(vol.copy())
+
+    # most recent step stays in RAM, older ones are on disk; max_steps trims the rest
+    assert stack._undo[-1].ram_bytes() > 0
+    assert all(e.ram_bytes() == 0 for e in stack._undo[:-1])
+    for expected in states[-2:-5:-1]:
+        stack.undo()
+        assert np.array_equal(vol, expected)
+    assert not stack.can_undo()
+
+
+def test_failed_undo_keeps_the_step():
+    import pytest
+    import undo_stack
+
+    vol = _volume()
+    target = {"volume": vol}
+    stack = undo_stack.UndoStack()
+    txn = stack.begin("Paint", "layer", lambda: target["volume"])
+    txn.touch((0, 10, 0, 10, 0, 10))
+    vol[0:3, 0:3, 0:3] = 7
+    stack.commit(txn)
+
+    # the layer was replaced by a volume of another shape: the step cannot apply
+    target["volume"] = np.zeros((10, 10, 10), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        stack.undo()
+    assert stack.can_undo() and not stack.can_redo()
+
+    target["volume"] = vol
+    stack.undo()
+    assert np.array_equal(vol, _volume())
+    target["volume"] = np.zeros((10, 10, 10), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        stack.redo()
+    assert stack.can_redo() and not stack.can_undo()
+
+
+def test_spill_file_space_is_reclaimed(tmp_path, monkeypatch):
+    import undo_stack
+
+    monkeypatch.setattr(undo_stack, "SPILL_DEAD_BYTES", 0)
+    vol = _volume()
+    stack = undo_stack.UndoStack(ram_budget_bytes=0, max_steps=2, spill_dir=str(tmp_path))
+    rng = np.random.default_rng(1)
+    states = [vol.copy()]
+    for i in range(6):
+        txn = stack.begin(f"step {i}", "layer", lambda: vol)
+        txn.snapshot()
+        vol[rng.integers(0, 40), :, :] = rng.integers(0, 255, size=(70, 100))
+        stack.commit(txn)
+        states.append(vol.copy())
+
+    # steps trimmed by max_steps leave no dead bytes behind
+    live = sum(e.spilled_bytes() for e in stack._undo + stack._redo)
+    assert live > 0 and stack.spill_file_bytes() == live
+    stack.undo()
+    assert np.array_equal(vol, states[-2])
+
+    # a new edit drops the redo branch; compacted blobs still read back
+    txn = stack.begin("branch", "layer", lambda: vol)
+    txn.snapshot()
+    vol[0] = 9
+    stack.commit(txn)
+    assert stack.spill_file_bytes() == sum(e.spilled_bytes() for e in stack._undo)
+    stack.undo()
+    stack.undo()
+    assert np.array_equal(vol, states[-3])
+
+    stack.clear()
+    assert stack.spill_file_bytes() == 0
+
+
+def test_failed_undo_closes_the_layer_edit():
+    import undo_stack
+    from vtk_segmentation_list_manager import SegmentationListManager
+
+    class Layer:
+        def __init__(self):
+            self.volume = _volume()
+            self.open_edits = 0
+
+        def begin_edit(self, box):
+            self.open_edits += 1
+            return box
+
+        def end_edit(self, token):
+            self.open_edits -= 1
+            return []
+
+    class Manager:
+        _undo_redo = SegmentationListManager._undo_redo
+
+        def __init__(self, stack):
+            self.undo_stack = stack
+            self.messages = []
+
+        def print_status(self, msg):
+            self.messages.append(msg)
+
+    layer = Layer()
+    stack = undo_stack.UndoStack()
+    txn = stack.begin("Paint", layer, lambda: layer.volume)
+    txn.touch((0, 10, 0, 10, 0, 10))
+    layer.volume[0:3, 0:3, 0:3] = 7
+    stack.commit(txn)
+
+    layer.volume = np.zeros((10, 10, 10), dtype=np.uint8)  # the step cannot apply
+    manager = Manager(stack)
+    manager._undo_redo(redo=False)
+    assert layer.open_edits == 0 and manager.messages and stack.can_undo()
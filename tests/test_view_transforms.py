@@ -0,0 +1,84 @@
+"""Cached view transforms vs. VTK's own coordinate conversions."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _renderer():
+    import vtk
+
+    renderer = vtk.vtkRenderer()
+    window = vtk.vtkRenderWindow()
+    window.SetOffScreenRendering(1)
+    window.SetSize(400, 300)
+    window.AddRenderer(renderer)
+    camera = renderer.GetActiveCamera()
+    camera.SetParallelProjection(True)
+    camera.SetPosition(10, 20, -100)
+    camera.SetFocalPoint(10, 20, 50)
+    camera.SetViewUp(0, -1, 0)
+    camera.SetParallelScale(80)
+    camera.SetClippingRange(1, 500)
+    return renderer, window
+
+
+def _vtk_display_to_world(renderer, x, y):
+    renderer.SetDisplayPoint(x, y, 0.5)
+    renderer.DisplayToWorld()
+    w = renderer.GetWorldPoint()
+    return np.array(w[:3]) / w[3]
+
+
+def test_display_to_world_matches_vtk_and_follows_camera():
+    import view_transforms
+
+    renderer, window = _renderer()
+    cache = view_transforms.ViewTransformCache(renderer)
+    for x, y in [(0, 0), (200, 150), (399, 10), (37, 250)]:
+        expected = _vtk_display_to_world(renderer, x, y)
+        got = cache.display_to_world(x, y)
+        assert np.allclose(got[:2], expected[:2]) and np.isclose(got[2], 50.0)
+
+    # camera ModifiedEvent invalidates the cached projection
+    renderer.GetActiveCamera().SetParallelScale(40)
+    assert np.allclose(cache.display_to_world(37, 250)[:2], _vtk_display_to_world(renderer, 37, 250)[:2])
+
+
+def test_slice_and_volume_index_mapping():
+    import vtk
+    import view_transforms
+
+    renderer, window = _renderer()
+    volume = vtk.vtkImageData()
+    volume.SetDimensions(30, 40, 50)
+    volume.SetSpacing(0.5, 0.5, 2.0)
+    volume.SetOrigin(-5.0, -10.0, 0.0)
+
+    # axial slice 7 of the volume, as a 2D image in the same world frame
+    slice_image = vtk.vtkImageData()
+    slice_image.SetDimensions(30, 40, 1)
+    slice_image.SetSpacing(0.5, 0.5, 1.0)
+    slice_image.SetOrigin(-5.0, -10.0, 14.0)
+
+    cache = view_transforms.ViewTransformCache(renderer)
+    cache.set_slice_image(slice_image)
+    cache.set_volume_image(volume)
+
+    assert np.allclose(cache.world_to_slice_index((0.0, 0.0, 14.0)), (10.0, 20.0, 0.0))
+    assert np.allclose(cache.slice_index_to_volume_index((10, 20)), (10.0, 20.0, 7.0))
+
+    # picking lands on the slice plane
+    assert np.isclose(cache.display_to_world(200, 150)[2], 14.0)
+
+    slice_image.SetOrigin(-5.0, -10.0, 16.0)
+    cache.set_slice_image(slice_image)
+    assert np.allclose(cache.slice_index_to_volume_index((10, 20)), (10.0, 20.0, 8.0))
+
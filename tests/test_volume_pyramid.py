@@ -0,0 +1,146 @@
+"""Downsampled volume pyramid for interactive display."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def test_downsample2_averages_blocks_and_repeats_odd_edges():
+    from volume_pyramid import downsample2
+
+    rng = np.random.default_rng(3)
+    volume = rng.integers(-1000, 2000, size=(5, 6, 7)).astype(np.int16)
+    out = downsample2(volume)
+    assert out.shape == (3, 3, 4) and out.dtype == np.int16
+
+    padded = np.pad(volume, ((0, 1), (0, 0), (0, 1)), mode="edge").astype(np.float64)
+    expected = padded.reshape(3, 2, 3, 2, 4, 2).mean(axis=(1, 3, 5))
+    assert np.array_equal(out, np.rint(expected).astype(np.int16))
+
+
+def test_levels_cover_the_volume_and_match_screen_pixels():
+    import vtk
+    import reslicer
+    from volume_pyramid import VolumePyramid
+    from vtk.util import numpy_support
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(64, 48, 40)
+    image.SetSpacing(0.5, 0.5, 1.0)
+    image.SetOrigin(-3.0, 2.0, 7.0)
+    image.AllocateScalars(vtk.VTK_SHORT, 1)
+    volume = numpy_support.vtk_to_numpy(image.GetPointData().GetScalars()).reshape(40, 48, 64)
+    volume[...] = np.arange(64)[None, None, :] * 10
+
+    pyramid = VolumePyramid(image, min_size=8)
+    assert pyramid.max_level == 2
+    assert pyramid.level(1) is None  # not built yet
+    pyramid.start()
+    assert pyramid.wait(timeout=30)
+
+    level = pyramid.level(1)
+    assert level.GetDimensions() == (32, 24, 20)
+    assert level.GetSpacing() == (1.0, 1.0, 2.0)
+    # the first voxel sits at the center of the block it averages
+    assert np.allclose(level.GetOrigin(), (-3.0 + 0.25, 2.0 + 0.25, 7.0 + 0.5))
+    assert level.GetPointData().GetScalars().GetValue(1) == np.rint((20 + 30) / 2)
+
+    # level slices are cut like full-resolution ones
+    r = reslicer.Reslicer(reslicer.AXIAL, level, background_value=0)
+    z = pyramid.level_index(1, reslicer.AXIAL, 13)
+    assert z == 6
+    coarse = numpy_support.vtk_to_numpy(r.get_slice_image(z).GetPointData().GetScalars())
+    expected = np.rint(volume[12:14].reshape(2, 24, 2, 32, 2).mean(axis=(0, 2, 4)))
+    assert np.array_equal(coarse.reshape(24, 32), expected)
+
+    # axial pixels are 0.5 mm: a 1.2 mm screen pixel fits level 1, 2.0 mm level 2
+    assert pyramid.level_for_pixel_size(reslicer.AXIAL, 0.9) == 0
+    assert pyramid.level_for_pixel_size(reslicer.AXIAL, 1.2) == 1
+    assert pyramid.level_for_pixel_size(reslicer.AXIAL, 2.0) == 2
+    # coronal slices have 1 mm pixels along z
+    assert pyramid.level_for_pixel_size(reslicer.CORONAL, 1.2) == 0
+
+
+def test_coarse_display_keeps_full_resolution_slice_for_picking():
+    import vtk
+    import reslicer
+    import view_transforms
+    import viewer2d
+    import window_level_lut
+    from viewer3d import VTKViewer2DWithReslicer
+    from volume_pyramid import VolumePyramid
+    from vtk.util import numpy_support
+
+    volume = np.arange(64 * 64 * 64, dtype=np.int16).reshape(64, 64, 64) % 1000
+    image = vtk.vtkImageData()
+    image.SetDimensions(64, 64, 64)
+    image.SetSpacing(1.0, 1.0, 2.0)
+    image.GetPointData().SetScalars(numpy_support.numpy_to_vtk(volume.reshape(-1), deep=True))
+    pyramid = VolumePyramid(image, min_size=8)
+    pyramid.start()
+    assert pyramid.wait(10)
+
+    renderer = vtk.vtkRenderer()
+    window = vtk.vtkRenderWindow()
+    window.SetOffScreenRendering(1)
+    window.SetSize(400, 300)
+    window.AddRenderer(renderer)
+    # a coronal view looking at voxel (x, y, z) = (10, 30, 20) from the screen center
+    camera = renderer.GetActiveCamera()
+    camera.SetParallelProjection(True)
+    camera.SetFocalPoint(10.0, 30.0, 40.0)
+    camera.SetPosition(10.0, -70.0, 40.0)
+    camera.SetViewUp(0, 0, 1)
+    camera.SetParallelScale(40)
+    camera.SetClippingRange(1, 500)
+
+    class Timer:
+        def start(self, ms):
+            self.active = True
+
+        def stop(self):
+            self.active = False
+
+    class SliceView:
+        # the slice-display and picking code of the 2D view, without a render window
+        _set_slice = VTKViewer2DWithReslicer._set_slice
+        _get_base_slice = VTKViewer2DWithReslicer._get_base_slice
+        _get_coarse_slice = VTKViewer2DWithReslicer._get_coarse_slice
+        _show_base_slice = VTKViewer2DWithReslicer._show_base_slice
+        _show_display_level = VTKViewer2DWithReslicer._show_display_level
+        get_mouse_event_coordiantes = viewer2d.VTKViewer2D.get_mouse_event_coordiantes
+
+    view = SliceView()
+    view.reslicer = reslicer.Reslicer(1, image)
+    view.vtk_image_3d = image
+    view.slice_cache = None
+    view.pyramid = pyramid
+    view._level_reslicers = {}
+    view._coarse_slice = vtk.vtkImageData()
+    view.refine_timer = Timer()
+    view.refine_delay_ms = 200
+    view.window_level_filter = window_level_lut.WindowLevelMapper()
+    view.transforms = view_transforms.ViewTransformCache(renderer)
+    view.transforms.set_volume_image(image)
+    view.interactor = vtk.vtkGenericRenderWindowInteractor()
+    view.interactor.SetRenderWindow(window)
+    view.interactor.SetEventInformation(200, 150)
+
+    # scrolling shows pyramid level 2 while the mouse moves over the view
+    view._show_base_slice(30, 2)
+    assert view.display_level == 2 and view.refine_timer.active
+    assert view.window_level_filter.GetInput() is view._coarse_slice
+    event_data = view.get_mouse_event_coordiantes()
+    x, y, z = np.rint(view.transforms.slice_index_to_volume_index(event_data["image_index"])[:3]).astype(int)
+    assert (x, y, z) == (10, 30, 20)
+    assert event_data["pixel_value"] == volume[z, y, x]
+
+    view._show_display_level(30, 0)
+    assert view.window_level_filter.GetInput() is view.vtk_image and not view.refine_timer.active
@@ -0,0 +1,76 @@
+"""CPU volume rendering of the base image with a coarse level while the camera moves."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _image(volume, spacing=(1.0, 1.0, 1.0), origin=(0.0, 0.0, 0.0)):
+    import vtk
+    from vtk.util import numpy_support
+
+    nz, ny, nx = volume.shape
+    image = vtk.vtkImageData()
+    image.SetDimensions(nx, ny, nz)
+    image.SetSpacing(spacing)
+    image.SetOrigin(origin)
+    image.GetPointData().SetScalars(numpy_support.numpy_to_vtk(volume.reshape(-1), deep=True))
+    return image
+
+
+def test_label_bounds_cover_the_labeled_voxels_of_all_layers():
+    from PyQt5.QtWidgets import QApplication
+    from vtk_segmentation_list_manager import SegmentationLayer
+    from volume_render import label_bounds
+
+    app = QApplication.instance() or QApplication([])
+    a, b = np.zeros((20, 30, 40), np.uint8), np.zeros((20, 30, 40), np.uint8)
+    a[5:8, 10:12, 3:6] = 1
+    b[12:15, 4:6, 30:33] = 1
+    layers = [SegmentationLayer(_image(m, (0.5, 1.0, 2.0), (10.0, 0.0, -5.0)), name=n) for m, n in ((a, "a"), (b, "b"))]
+
+    assert label_bounds(layers, margin_voxels=0) == (10.0 + 0.5 * 3, 10.0 + 0.5 * 32, 4.0, 11.0, -5.0 + 2 * 5, -5.0 + 2 * 14)
+    assert label_bounds(layers, margin_voxels=1)[:2] == (10.0 + 0.5 * 2, 10.0 + 0.5 * 33)
+    assert label_bounds([SegmentationLayer(_image(np.zeros((4, 4, 4), np.uint8)), name="empty")]) is None
+
+
+def test_coarse_level_while_interacting_and_frame_times():
+    import vtk
+    from volume_pyramid import VolumePyramid
+    from volume_render import VolumeRendering
+
+    z, y, x = np.mgrid[0:64, 0:64, 0:64]
+    image = _image(((z - 32) ** 2 + (y - 32) ** 2 + (x - 32) ** 2 < 400).astype(np.int16) * 1000 - 1000)
+    pyramid = VolumePyramid(image, min_size=8)
+    pyramid.start()
+    assert pyramid.wait(10)
+
+    # no frames are rendered here: the sandbox has no OpenGL context
+    rendering = VolumeRendering(vtk.vtkRenderer())
+    rendering.interactive_voxels = 20
+    rendering.set_image(image, pyramid)
+    assert not rendering.volume.GetVisibility()
+
+    rendering.set_enabled(True)
+    assert rendering.volume.GetVisibility() and rendering.mapper.GetInput() is image
+    rendering.set_crop_bounds((16, 48, 16, 48, 16, 48))
+    assert rendering.mapper.GetCropping()
+
+    rendering.set_interacting(True)
+    assert rendering.level == 2  # 64 -> 32 -> 16 voxels per axis
+    assert rendering.mapper.GetInput() is pyramid.level(2)
+    rendering.interactive_times.add(12.0)
+    assert rendering.status_text() == "Volume rendering: moving 12 ms (pyramid level 2)"
+    rendering.set_interacting(False)
+    assert rendering.mapper.GetInput() is image and rendering.level == 0
+
+    rendering.set_crop_bounds(None)
+    rendering.set_enabled(False)
+    assert not rendering.volume.GetVisibility() and not rendering.mapper.GetCropping()
@@ -0,0 +1,83 @@
+"""Window/level through a uint8 lookup table."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+PKG_DIR = Path(__file__).resolve().parents[1] / "src" / "vtk_image_labeler_3d"
+if str(PKG_DIR) not in sys.path:
+    sys.path.insert(0, str(PKG_DIR))
+
+
+def _image(values):
+    import vtk
+    from vtk.util import numpy_support
+
+    image = vtk.vtkImageData()
+    image.SetDimensions(values.shape[1], values.shape[0], 1)
+    image.GetPointData().SetScalars(numpy_support.numpy_to_vtk(values.reshape(-1), deep=True))
+    return image
+
+
+def test_table_matches_vtk_window_level_colors():
+    import vtk
+    from vtk.util import numpy_support
+    from window_level_lut import WindowLevelMapper
+
+    rng = np.random.default_rng(5)
+    values = rng.integers(-1024, 3072, size=(40, 50)).astype(np.int16)
+    image = _image(values)
+
+    reference = vtk.vtkImageMapToWindowLevelColors()
+    reference.SetInputData(image)
+    mapper = WindowLevelMapper()
+    mapper.SetInputData(image)
+    for window, level in ((400, 40), (1500, -600), (2000, 1000)):
+        reference.SetWindow(window)
+        reference.SetLevel(level)
+        reference.Update()
+        mapper.SetWindow(window)
+        mapper.SetLevel(level)
+        mapper.Update()
+        expected = numpy_support.vtk_to_numpy(reference.GetOutput().GetPointData().GetScalars())[:, 0]
+        got = numpy_support.vtk_to_numpy(mapper.GetOutput().GetPointData().GetScalars())
+        assert got.dtype == np.uint8
+        assert np.abs(got.astype(int) - expected.astype(int)).max() <= 1
+
+
+def test_table_is_rebuilt_only_when_window_level_changes():
+    from vtk.util import numpy_support
+    from window_level_lut import WindowLevelMapper, WindowLevelTable, map_values
+
+    table = WindowLevelTable(400, 40)
+    lut = table.table(np.int16)
+    assert lut.shape == (65536,)
+    table.set_window_level(400, 40)
+    assert table.table(np.int16) is lut and table.version == 0
+    table.set_window_level(400, 50)
+    assert table.table(np.int16) is not lut and table.version == 1
+
+    # float images are mapped with the same formula, without a table
+    floats = np.linspace(-500.0, 500.0, 12).reshape(3, 4)
+    out = np.empty(floats.shape, dtype=np.uint8)
+    table.map(floats, out)
+    assert np.array_equal(out, map_values(floats, 400, 50))
+
+    # an unchanged input and window/level is not mapped again
+    values = np.arange(-100, 100, dtype=np.int16).reshape(10, 20)
+    image = _image(values)
+    mapper = WindowLevelMapper(table)
+    mapper.SetInputData(image)
+    mapper.Update()
+    output = numpy_support.vtk_to_numpy(mapper.GetOutput().GetPointData().GetScalars())
+    output[:] = 7
+    mapper.Update()
+    assert (output == 7).all()
+
+    # a shared table change remaps the views using it
+    table.set_window_level(200, 0)
+    mapper.Update()
+    assert np.array_equal(output, map_values(values.reshape(-1), 200, 0))